@@ -0,0 +1,80 @@
+# benchmarks/entity_extractor_bench.py
+"""
+Micro-benchmark of entity_extractor over a corpus of real questions: the example
+questions quoted in the prompt descriptions of config.Settings.prompt_config plus
+starter and follow-up questions seen in chat.
+
+Usage (from the api/ folder):
+    python benchmarks/entity_extractor_bench.py --repeat 200 --show 5
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("X_API_KEY", "bench")
+os.environ.setdefault("URL_CUSTOM_LLM", "http://127.0.0.1")
+os.environ.setdefault("TOKEN_CUSTOM_LLM", "bench")
+
+from config import settings  # noqa: E402
+from entity_extractor import init_entity_extractor  # noqa: E402
+
+EXTRA_QUESTIONS = [
+    "Bagaimana performansi unit CFU WIB pada periode Juli 2025?",
+    "Bagaimana trend Revenue unit DWS untuk periode Januari 2025 sampai Juli 2025?",
+    "Produk apa yang tidak tercapai pada unit TELIN?",
+    "Mengapa performansi EBITDA unit TELIN tercapai?",
+    "kalau dws revenue l3 legacy juni 2025?",
+    "ebitdanya gimana tuh?",
+    "untuk juli 2024 ke oktober 2024 gimana tuh",
+    "Berapa External Revenue unit TSAT bulan lalu?",
+    "Bagaimana net income telkomsat 202503?",
+    "Tampilkan trend perbandingaan actual, target dan prev year untuk COE unit TIF untuk periode Maret 2025 sampai Juni 2025",
+]
+
+
+def build_corpus():
+    questions = list(EXTRA_QUESTIONS)
+    for entry in settings.prompt_config:
+        questions.extend(re.findall(r"'([^']+\?)'", entry.get("prompt_description", "")))
+
+    corpus = []
+    for question in questions:
+        for div in ("DWS", "TELIN", "TIF") if "[unit]" in question else (None,):
+            filled = question.replace("[bulan tahun]", "Mei 2025").replace("[tahun]", "2025")
+            corpus.append(filled.replace("[unit]", div) if div else filled)
+    return corpus
+
+
+def main(repeat: int, show: int):
+    t0 = time.perf_counter()
+    extractor = init_entity_extractor()
+    build_ms = (time.perf_counter() - t0) * 1000
+
+    corpus = build_corpus()
+    samples = []
+    for _ in range(repeat):
+        for question in corpus:
+            t0 = time.perf_counter()
+            extractor.extract(question, reference_period=202507)
+            samples.append((time.perf_counter() - t0) * 1_000_000)
+
+    samples.sort()
+    print(f"matcher build: {build_ms:.2f}ms, corpus: {len(corpus)} questions x {repeat}")
+    print(
+        f"extract: mean={statistics.mean(samples):.1f}us  p50={samples[len(samples) // 2]:.1f}us  "
+        f"p99={samples[int(len(samples) * 0.99)]:.1f}us"
+    )
+    for question in corpus[:show]:
+        print(f"- {question}\n  {extractor.extract(question, reference_period=202507)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--show", type=int, default=5)
+    args = parser.parse_args()
+    main(args.repeat, args.show)
@@ -0,0 +1,70 @@
+# benchmarks/insight_row_budget_bench.py
+"""
+Insight generation on large results with and without the row budget, against the stub LLM.
+
+Rows are synthetic product breakdowns (see table_encoding_report.py). The stub charges
+a prefill delay per 1000 prompt tokens, so the latency follows the prompt size like a
+real model server. Each row count is run with settings.insight_row_budget=0 (every row
+sent) and with the configured budget (top/bottom rows, subtotals and total).
+
+Usage (from the api/ folder):
+    python benchmarks/insight_row_budget_bench.py --rows 50 100 200 500 --prefill-ms 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("X_API_KEY", "bench")
+os.environ.setdefault("URL_CUSTOM_LLM", "http://127.0.0.1")
+os.environ.setdefault("TOKEN_CUSTOM_LLM", "bench")
+
+from loguru import logger  # noqa: E402
+
+from benchmarks.stub_llm import StubLLMConfig, start_stub_server  # noqa: E402
+from benchmarks.table_encoding_report import PROMPT_NAME, QUESTION, _rows  # noqa: E402
+from config import settings  # noqa: E402
+from llm_metrics import estimate_tokens  # noqa: E402
+import llm_engine  # noqa: E402
+import routes  # noqa: E402
+
+
+async def main(row_counts, prefill_ms: float):
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    budget = settings.insight_row_budget
+    prompt_chars = []
+
+    def responder(payload):
+        prompt_chars.append(sum(len(m["content"]) for m in payload["messages"]))
+        return "Insight."
+
+    server, url, _ = start_stub_server(StubLLMConfig(responder=responder, prefill_per_1k_tokens=prefill_ms / 1000))
+    llm_engine.URL_CUSTOM_LLM = url
+    instruction_prompt = settings.get_prompt_by_name(PROMPT_NAME)
+    print(f"{'rows':>5} {'row budget':<12}{'prompt tok':>11}{'latency':>10}")
+    try:
+        for count in row_counts:
+            rows = _rows(count)
+            for row_budget in (0, budget):
+                settings.insight_row_budget = row_budget
+                t0 = time.perf_counter()
+                await routes.generate_insight("cfu_performance_data", list(rows[0].keys()), rows, QUESTION,
+                                              instruction_prompt, {"wants_simplified_numbers": True})
+                elapsed = (time.perf_counter() - t0) * 1000
+                label = f"{row_budget} rows" if row_budget else "off"
+                print(f"{count:>5} {label:<12}{estimate_tokens(prompt_chars[-1]):>11}{elapsed:>8.0f}ms")
+    finally:
+        settings.insight_row_budget = budget
+        server.shutdown()
+        await llm_engine.close_llm_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[50, 100, 200, 500])
+    parser.add_argument("--prefill-ms", type=float, default=200.0, help="stub prefill time per 1000 prompt tokens")
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.prefill_ms))
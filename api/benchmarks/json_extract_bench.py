@@ -0,0 +1,97 @@
+# benchmarks/json_extract_bench.py
+"""
+Micro-benchmark of JSON extraction from LLM responses: the previous brace-counting
+_safe_json_loads against llm_output.extract_json_object.
+
+The corpus holds responses in the shapes the planning, intent, selection and agent
+calls return (bare JSON, fenced JSON, prose around it, braces inside strings) plus
+noisy outputs full of stray braces, where the old scanner re-parses a growing
+candidate from the first brace every time its count returns to zero. Each case is
+also checked for correctness (same object as the reference).
+
+Usage (from the api/ folder):
+    python benchmarks/json_extract_bench.py --repeat 200 --noise 2000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_output import extract_json_object  # noqa: E402
+
+PLAN = {
+    "completed_query": "Bagaimana performansi unit DWS pada periode Juli 2025?",
+    "wants_text": True, "wants_chart": False, "wants_table": True, "wants_simplified_numbers": True,
+    "table_name": "cfu_performance_data", "prompt": "CFU Monthly Performance Analysis",
+}
+INTENT = {"wants_text": True, "wants_chart": True, "wants_table": False, "wants_simplified_numbers": True}
+SELECTION = {"table_name": "cfu_performance_data", "prompt": "CFU Trend Analysis"}
+AGENT = {"action": "Continue", "action_input": "Tampilkan revenue {DWS} per bulan", "final_answer": ""}
+
+
+def _corpus(noise: int):
+    """(name, response text, expected object) triples."""
+    cases = [
+        ("plan bare", json.dumps(PLAN), PLAN),
+        ("plan fenced", f"```json\n{json.dumps(PLAN, indent=2)}\n```", PLAN),
+        ("intent prose", f"Berikut hasil analisis intent:\n{json.dumps(INTENT)}\nSemoga membantu.", INTENT),
+        ("selection think", f"<think>Pertanyaan tentang trend {{periode}}.</think>\n{json.dumps(SELECTION)}", SELECTION),
+        ("agent brace in string", json.dumps(AGENT), AGENT),
+        ("placeholders then json", "Format: {table_name} dan {prompt}.\n" + json.dumps(SELECTION), SELECTION),
+    ]
+    placeholders = " ".join("{x}" for _ in range(noise // 4))
+    cases.append((f"{noise} chars of {{x}} placeholders", f"{placeholders}\n{json.dumps(PLAN)}", PLAN))
+    closing = "{" + "x} " * (noise // 3)
+    cases.append((f"{noise} chars of unbalanced braces", f"{closing}\n{json.dumps(PLAN)}", PLAN))
+    return cases
+
+
+def _legacy_safe_json_loads(text_or_obj):
+    """The brace-counting parser routes.py used before llm_output.extract_json_object."""
+    if isinstance(text_or_obj, dict):
+        return text_or_obj
+    s = text_or_obj.strip()
+    first_brace = s.find("{")
+    if first_brace == -1:
+        return None
+    brace_count = 1
+    for i in range(first_brace + 1, len(s)):
+        if s[i] == "{":
+            brace_count += 1
+        elif s[i] == "}":
+            brace_count -= 1
+        if brace_count == 0:
+            try:
+                return json.loads(s[first_brace: i + 1])
+            except json.JSONDecodeError:
+                brace_count = 1
+                continue
+    return None
+
+
+def _time(parse, text: str, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        parse(text)
+    return (time.perf_counter() - t0) / repeat * 1e6
+
+
+def main(repeat: int, noise: int):
+    print(f"{'case':<34}{'legacy µs':>11}{'new µs':>9}  legacy ok  new ok")
+    for name, text, expected in _corpus(noise):
+        legacy_ok = _legacy_safe_json_loads(text) == expected
+        new_ok = extract_json_object(text) == expected
+        legacy = _time(_legacy_safe_json_loads, text, repeat)
+        new = _time(extract_json_object, text, repeat)
+        print(f"{name:<34}{legacy:>11.1f}{new:>9.1f}  {str(legacy_ok):<9}  {new_ok}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--noise", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.repeat, args.noise)
@@ -0,0 +1,97 @@
+# benchmarks/llm_balancer_bench.py
+"""
+Client-side load balancing over several stub LLM replicas, one of them slow.
+
+Compares blind round robin (what a proxy in front of the replicas does) with the
+"least_outstanding" and "ewma" strategies of llm_endpoints, then breaks one
+replica to show passive ejection and readmission by the prober.
+
+Usage (from the api/ folder):
+    python benchmarks/llm_balancer_bench.py --calls 300 --concurrency 12 --slow-ms 600
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("X_API_KEY", "bench")
+os.environ.setdefault("URL_CUSTOM_LLM", "http://127.0.0.1")
+os.environ.setdefault("TOKEN_CUSTOM_LLM", "bench")
+
+from benchmarks.stub_llm import StubLLMConfig, start_stub_server  # noqa: E402
+from config import settings  # noqa: E402
+import llm_endpoints  # noqa: E402
+import llm_engine  # noqa: E402
+
+PAYLOAD = {
+    "model": "telkom-ai-instruct",
+    "messages": [{"role": "system", "content": "benchmark"}],
+    "max_tokens": 16, "temperature": 0, "stream": False,
+}
+
+
+async def _run(urls: str, calls: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    samples, errors = [], 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            t0 = time.perf_counter()
+            result = await llm_engine.make_async_api_call(urls, "bench", PAYLOAD, stage="generate_sql")
+            samples.append(time.perf_counter() - t0)
+            errors += isinstance(result, dict)
+
+    await asyncio.gather(*(one() for _ in range(calls)))
+    ms = sorted(s * 1000 for s in samples)
+    return ms[len(ms) // 2], ms[int(0.99 * (len(ms) - 1))], errors
+
+
+def _fresh_pool(urls: str, strategy: str):
+    llm_endpoints._pools.clear()
+    settings.llm_balancer_strategy = strategy
+    pool = llm_endpoints.get_endpoint_pool(urls, "bench")
+    if strategy == "round_robin":
+        cycle = itertools.cycle(pool.endpoints)
+        pool.pick = lambda exclude=None: next(cycle)
+    return pool
+
+
+async def main(calls: int, concurrency: int, fast_ms: float, slow_ms: float):
+    settings.llm_hedge_enabled = False
+    settings.llm_endpoint_eject_seconds = 0.2
+    stubs = [start_stub_server(StubLLMConfig(latency=ms / 1000)) for ms in (fast_ms, fast_ms, slow_ms)]
+    urls = ",".join(url for _, url, _ in stubs)
+    try:
+        for strategy in ("round_robin", "least_outstanding", "ewma"):
+            pool = _fresh_pool(urls, strategy)
+            p50, p99, errors = await _run(urls, calls, concurrency)
+            share = [e.requests for e in pool.endpoints]
+            print(f"{strategy:<18} p50={p50:7.1f}ms  p99={p99:7.1f}ms  errors={errors}  requests per replica={share}")
+
+        pool = _fresh_pool(urls, "ewma")
+        stubs[0][2].status_code = 503
+        p50, p99, errors = await _run(urls, calls // 3, concurrency)
+        print(f"replica 0 down     p50={p50:7.1f}ms  p99={p99:7.1f}ms  errors={errors}  "
+              f"ejected={[e.ejected for e in pool.endpoints]}")
+        stubs[0][2].status_code = 200
+        await asyncio.sleep(settings.llm_endpoint_eject_seconds * 2)
+        await llm_engine.probe_ejected_endpoints()
+        print(f"after probe        ejected={[e.ejected for e in pool.endpoints]}")
+    finally:
+        for server, _, _ in stubs:
+            server.shutdown()
+        await llm_engine.close_llm_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=12)
+    parser.add_argument("--fast-ms", type=float, default=60.0)
+    parser.add_argument("--slow-ms", type=float, default=600.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.concurrency, args.fast_ms, args.slow_ms))
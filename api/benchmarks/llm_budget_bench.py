@@ -0,0 +1,80 @@
+# benchmarks/llm_budget_bench.py
+"""
+Adaptive max_tokens budgets against the stub LLM.
+
+select_table calls are answered with completions of 20-60 tokens and, now and then,
+an outlier longer than the learned budget. The report shows the max_tokens sent
+before and after the budget is learned, the truncation retries and the budget
+reloaded from disk as after a restart.
+
+Usage (from the api/ folder):
+    python benchmarks/llm_budget_bench.py --calls 200 --outlier-rate 0.02
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("X_API_KEY", "bench")
+os.environ.setdefault("URL_CUSTOM_LLM", "http://127.0.0.1")
+os.environ.setdefault("TOKEN_CUSTOM_LLM", "bench")
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+
+from loguru import logger  # noqa: E402
+
+from benchmarks.stub_llm import StubLLMConfig, start_stub_server  # noqa: E402
+from config import settings  # noqa: E402
+import llm_budget  # noqa: E402
+import llm_engine  # noqa: E402
+from llm_metrics import set_llm_prompt_name  # noqa: E402
+
+PROMPT_NAME = "CFU Monthly Performance Analysis"
+
+
+async def main(calls: int, outlier_rate: float):
+    logger.remove()
+    logger.add(sys.stderr, level="ERROR")
+    sent = []
+
+    def responder(payload):
+        sent.append(payload["max_tokens"])
+        # Same question, same answer: a retry gets the same completion as the first attempt
+        rng = random.Random(payload["messages"][0]["content"])
+        tokens = 600 if rng.random() < outlier_rate else rng.randint(20, 60)
+        return "x" * tokens * 4
+
+    server, url, _ = start_stub_server(StubLLMConfig(responder=responder))
+    llm_engine.URL_CUSTOM_LLM = url
+    settings.llm_budget_path = os.path.join(tempfile.mkdtemp(), "llm_budgets.json")
+    llm_budget.load_token_budgets()
+    set_llm_prompt_name(PROMPT_NAME)
+    try:
+        for i in range(calls):
+            await llm_engine.telkomllm_select_table("{tables_list}{prompt_list}{user_query}", "", "", f"question {i}")
+    finally:
+        server.shutdown()
+        await llm_engine.close_llm_client()
+
+    stats = llm_budget.get_token_budgets().stats()[f"select_table/{PROMPT_NAME}"]
+    print(f"max_tokens sent: first call={sent[0]}  last call={sent[-1]}  "
+          f"mean={sum(sent) / len(sent):.0f} over {len(sent)} requests")
+    print(f"learned budget={stats['max_tokens']}  truncations={stats['truncations']}  "
+          f"retried with the full budget={stats['truncation_retries']}")
+
+    reloaded = llm_budget.TokenBudgets(settings.llm_budget_window, settings.llm_budget_min_samples,
+                                       settings.llm_budget_percentile, settings.llm_budget_headroom,
+                                       settings.llm_budget_min_tokens)
+    reloaded.load(settings.llm_budget_path)
+    print(f"budget after reload from {settings.llm_budget_path}: "
+          f"{reloaded.budget('select_table', PROMPT_NAME, settings.llm_stage_profiles['select_table']['max_tokens'])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--outlier-rate", type=float, default=0.02)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.outlier_rate))
@@ -0,0 +1,97 @@
+# benchmarks/llm_cache_bench.py
+"""
+Read latency of the on-disk LLM cache and concurrent use by several worker processes.
+
+A temporary cache is filled with completions of routing/SQL size, then every process
+(standing in for a uvicorn worker) reads random keys and writes a share of new ones at
+the same time. The report shows the read latency percentiles per process, errors (for
+example "database is locked") and the effect of a compaction run with a byte limit.
+
+Usage (from the api/ folder):
+    python benchmarks/llm_cache_bench.py --entries 5000 --workers 4 --reads 5000
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("X_API_KEY", "bench")
+os.environ.setdefault("URL_CUSTOM_LLM", "http://127.0.0.1")
+os.environ.setdefault("TOKEN_CUSTOM_LLM", "bench")
+
+from loguru import logger  # noqa: E402
+
+from llm_cache import LLMResponseCache, cache_key  # noqa: E402
+
+TTL = 3600
+MAX_BYTES = 1 << 30
+
+
+def _payload(i: int):
+    return {"model": "bench", "messages": [{"role": "system", "content": f"question {i}"}], "temperature": 0}
+
+
+def _value(i: int) -> str:
+    return f"SELECT l2, real_mtd FROM cfu_performance_data WHERE div = 'DWS' AND period = 2025{i % 12 + 1:02d};" * 3
+
+
+def _worker(path: str, entries: int, reads: int, write_share: float, seed: int, results):
+    logger.remove()
+    cache = LLMResponseCache(path, TTL, MAX_BYTES)
+    rng = random.Random(seed)
+    latencies = []
+    for _ in range(reads):
+        i = rng.randrange(entries * 2)
+        key = cache_key("generate_sql", _payload(i))
+        t0 = time.perf_counter()
+        value = cache.get(key)
+        latencies.append(time.perf_counter() - t0)
+        if value is None and rng.random() < write_share:
+            cache.put(key, "generate_sql", _value(i))
+    latencies.sort()
+    results.put((seed, latencies, cache.errors, cache.hits))
+
+
+def main(entries: int, workers: int, reads: int, write_share: float):
+    path = os.path.join(tempfile.mkdtemp(), "llm_cache.db")
+    cache = LLMResponseCache(path, TTL, MAX_BYTES)
+    for i in range(entries):
+        cache.put(cache_key("generate_sql", _payload(i)), "generate_sql", _value(i))
+
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=_worker, args=(path, entries, reads, write_share, seed, results))
+             for seed in range(workers)]
+    t0 = time.perf_counter()
+    for p in procs:
+        p.start()
+    collected = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - t0
+    for seed, latencies, errors, hits in sorted(collected):
+        pct = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000  # noqa: E731
+        print(f"worker {seed}: p50={pct(0.5):.3f}ms p99={pct(0.99):.3f}ms max={latencies[-1] * 1000:.2f}ms "
+              f"hits={hits}/{len(latencies)} errors={errors}")
+    print(f"{workers * reads} reads in {elapsed:.2f}s across {workers} processes")
+
+    before = cache.stats()
+    cache.max_bytes = before["bytes"] // 2
+    t0 = time.perf_counter()
+    deleted = cache.compact()
+    after = cache.stats()
+    print(f"compaction to {cache.max_bytes} bytes: {before['entries']} -> {after['entries']} entries "
+          f"({deleted} removed) in {(time.perf_counter() - t0) * 1000:.0f}ms, file {os.path.getsize(path)} bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--reads", type=int, default=5000)
+    parser.add_argument("--write-share", type=float, default=0.5, help="share of misses written back")
+    args = parser.parse_args()
+    main(args.entries, args.workers, args.reads, args.write_share)
@@ -0,0 +1,82 @@
+# benchmarks/llm_client_bench.py
+"""
+Compare a fresh httpx.AsyncClient per LLM call (the old behaviour) against the
+shared pooled client from llm_engine.
+
+The stub adds --handshake-ms once per new connection to stand in for the
+TCP+TLS setup cost of the real endpoint.
+
+Usage (from the api/ folder):
+    python benchmarks/llm_client_bench.py --calls 50 --handshake-ms 40
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("X_API_KEY", "bench")
+os.environ.setdefault("URL_CUSTOM_LLM", "http://127.0.0.1")
+os.environ.setdefault("TOKEN_CUSTOM_LLM", "bench")
+
+import httpx  # noqa: E402
+
+from benchmarks.stub_llm import StubLLMConfig, start_stub_server  # noqa: E402
+import llm_engine  # noqa: E402
+
+PAYLOAD = {
+    "model": "telkom-ai-instruct",
+    "messages": [{"role": "system", "content": "benchmark"}],
+    "max_tokens": 16, "temperature": 0, "stream": False,
+}
+
+
+async def _per_call_client(url: str) -> float:
+    t0 = time.perf_counter()
+    async with httpx.AsyncClient(timeout=120.0, verify=False) as client:
+        response = await client.post(url, json=PAYLOAD, headers={"x-api-key": "bench"})
+        response.json()
+    return time.perf_counter() - t0
+
+
+async def _shared_client(url: str) -> float:
+    t0 = time.perf_counter()
+    await llm_engine.make_async_api_call(url, "bench", PAYLOAD, stage="select_table")
+    return time.perf_counter() - t0
+
+
+def _summary(label: str, samples):
+    ms = sorted(s * 1000 for s in samples)
+    p95 = ms[int(0.95 * (len(ms) - 1))]
+    print(f"{label:<18} mean={statistics.mean(ms):8.2f}ms  p50={statistics.median(ms):8.2f}ms  p95={p95:8.2f}ms")
+    return statistics.mean(ms)
+
+
+async def main(calls: int, handshake_ms: float, latency_ms: float):
+    server, url, cfg = start_stub_server(StubLLMConfig(latency=latency_ms / 1000, handshake=handshake_ms / 1000))
+    try:
+        per_call = [await _per_call_client(url) for _ in range(calls)]
+        conns_before = cfg.connections
+
+        await llm_engine.init_llm_client()
+        shared = [await _shared_client(url) for _ in range(calls)]
+        await llm_engine.close_llm_client()
+
+        print(f"{calls} sequential calls, handshake={handshake_ms}ms, server latency={latency_ms}ms")
+        old_mean = _summary("client per call", per_call)
+        new_mean = _summary("shared client", shared)
+        print(f"connections opened: per-call={conns_before}, shared={cfg.connections - conns_before}")
+        print(f"saved per request: {old_mean - new_mean:.2f}ms")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--handshake-ms", type=float, default=40.0)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.handshake_ms, args.latency_ms))
@@ -0,0 +1,85 @@
+# benchmarks/llm_hedge_bench.py
+"""
+Tail latency of a routing call (select_table) with and without hedging and
+retries, against the stub LLM with injected slow responses and 503 errors.
+
+Usage (from the api/ folder):
+    python benchmarks/llm_hedge_bench.py --calls 300 --slow-rate 0.05 --slow-ms 2000 --failure-rate 0.05
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("X_API_KEY", "bench")
+os.environ.setdefault("URL_CUSTOM_LLM", "http://127.0.0.1")
+os.environ.setdefault("TOKEN_CUSTOM_LLM", "bench")
+
+from benchmarks.stub_llm import StubLLMConfig, start_stub_server  # noqa: E402
+from config import settings  # noqa: E402
+import llm_engine  # noqa: E402
+
+PAYLOAD = {
+    "model": "telkom-ai-instruct",
+    "messages": [{"role": "system", "content": "benchmark"}],
+    "max_tokens": 16, "temperature": 0, "stream": False,
+}
+
+
+def _responder(base_ms: float, slow_rate: float, slow_ms: float):
+    def respond(body):
+        time.sleep((slow_ms if random.random() < slow_rate else base_ms * random.uniform(0.8, 1.2)) / 1000)
+        return "ok"
+    return respond
+
+
+async def _run(url: str, calls: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    samples, errors = [], 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            t0 = time.perf_counter()
+            result = await llm_engine.make_async_api_call(url, "bench", PAYLOAD, stage="select_table")
+            samples.append(time.perf_counter() - t0)
+            errors += isinstance(result, dict)
+
+    await asyncio.gather(*(one() for _ in range(calls)))
+    ms = sorted(s * 1000 for s in samples)
+    pick = lambda q: ms[int(q * (len(ms) - 1))]  # noqa: E731
+    return pick(0.5), pick(0.95), pick(0.99), errors
+
+
+async def main(calls: int, concurrency: int, base_ms: float, slow_rate: float, slow_ms: float, failure_rate: float):
+    server, url, cfg = start_stub_server(
+        StubLLMConfig(responder=_responder(base_ms, slow_rate, slow_ms), failure_rate=failure_rate)
+    )
+    try:
+        for label, hedge, retries in (("baseline", False, 0), ("retry+hedge", True, settings.llm_retry_attempts)):
+            settings.llm_hedge_enabled = hedge
+            settings.llm_retry_attempts = retries
+            llm_engine._attempt_latency.clear()
+            # Warm-up fills the latency histogram that sets the hedging delay
+            await _run(url, settings.llm_hedge_min_samples, concurrency)
+            p50, p95, p99, errors = await _run(url, calls, concurrency)
+            print(f"{label:<12} p50={p50:7.1f}ms  p95={p95:7.1f}ms  p99={p99:7.1f}ms  errors={errors}/{calls}")
+    finally:
+        server.shutdown()
+        await llm_engine.close_llm_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--base-ms", type=float, default=80.0)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-ms", type=float, default=2000.0)
+    parser.add_argument("--failure-rate", type=float, default=0.05)
+    args = parser.parse_args()
+    settings.llm_hedge_min_delay = 0.05
+    asyncio.run(main(args.calls, args.concurrency, args.base_ms, args.slow_rate, args.slow_ms, args.failure_rate))
@@ -0,0 +1,112 @@
+# benchmarks/llm_scheduler_bench.py
+"""
+Load test of the outbound LLM concurrency governor against the stub LLM.
+
+A burst of interactive (select_table) and background (generate_topic) calls is
+fired at once with a small concurrency cap; the report shows queue time per
+lane, how many calls were rejected with 429 and the peak number of calls the
+stub saw in flight.
+
+Usage (from the api/ folder):
+    python benchmarks/llm_scheduler_bench.py --interactive 40 --background 40 --max-concurrency 8
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("X_API_KEY", "bench")
+os.environ.setdefault("URL_CUSTOM_LLM", "http://127.0.0.1")
+os.environ.setdefault("TOKEN_CUSTOM_LLM", "bench")
+
+from fastapi import HTTPException  # noqa: E402
+
+from benchmarks.stub_llm import StubLLMConfig, start_stub_server  # noqa: E402
+import llm_engine  # noqa: E402
+import llm_scheduler  # noqa: E402
+from llm_scheduler import LLMScheduler  # noqa: E402
+
+PAYLOAD = {
+    "model": "telkom-ai-instruct",
+    "messages": [{"role": "system", "content": "benchmark"}],
+    "max_tokens": 16, "temperature": 0, "stream": False,
+}
+
+
+class _InFlight:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+
+    def responder(self, latency: float):
+        def respond(body):
+            with self.lock:
+                self.current += 1
+                self.peak = max(self.peak, self.current)
+            time.sleep(latency)
+            with self.lock:
+                self.current -= 1
+            return "ok"
+        return respond
+
+
+async def _call(url: str, stage: str):
+    t0 = time.perf_counter()
+    try:
+        await llm_engine.make_async_api_call(url, "bench", PAYLOAD, stage=stage)
+        return "ok", time.perf_counter() - t0
+    except HTTPException as e:
+        return str(e.status_code), time.perf_counter() - t0
+
+
+async def main(interactive: int, background: int, max_concurrency: int, background_quota: int,
+               latency_ms: float, background_deadline: float):
+    in_flight = _InFlight()
+    server, url, cfg = start_stub_server(StubLLMConfig(responder=in_flight.responder(latency_ms / 1000)))
+    llm_scheduler._scheduler = LLMScheduler(
+        max_concurrency=max_concurrency,
+        lane_quotas={"interactive": max_concurrency, "background": background_quota},
+        lane_priorities={"interactive": 0, "background": 1},
+        queue_deadlines={"interactive": 60.0, "background": background_deadline},
+    )
+    try:
+        # Warm up the service time estimate
+        await _call(url, "select_table")
+        calls = [_call(url, "generate_topic") for _ in range(background)]
+        calls += [_call(url, "select_table") for _ in range(interactive)]
+        results = await asyncio.gather(*calls)
+    finally:
+        server.shutdown()
+        await llm_engine.close_llm_client()
+
+    for label, chunk in (("background", results[:background]), ("interactive", results[background:])):
+        statuses = {}
+        for status, _ in chunk:
+            statuses[status] = statuses.get(status, 0) + 1
+        ok = sorted(elapsed for status, elapsed in chunk if status == "ok")
+        p95 = ok[int(0.95 * (len(ok) - 1))] * 1000 if ok else 0.0
+        print(f"{label:<12} {statuses}  p95 latency={p95:.0f}ms")
+
+    stats = llm_scheduler.get_llm_scheduler_stats()
+    for lane, lane_stats in stats["lanes"].items():
+        queue = lane_stats["queue_seconds"] or {}
+        print(f"{lane:<12} queue p50={queue.get('p50', 0):.3f}s p95={queue.get('p95', 0):.3f}s "
+              f"admitted={lane_stats['admitted']} rejected={lane_stats['rejected']}")
+    print(f"peak in flight at the stub: {in_flight.peak} (cap {max_concurrency})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--interactive", type=int, default=40)
+    parser.add_argument("--background", type=int, default=40)
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--background-quota", type=int, default=2)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--background-deadline", type=float, default=0.5)
+    args = parser.parse_args()
+    asyncio.run(main(args.interactive, args.background, args.max_concurrency, args.background_quota,
+                     args.latency_ms, args.background_deadline))
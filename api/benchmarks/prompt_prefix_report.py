@@ -0,0 +1,110 @@
+# benchmarks/prompt_prefix_report.py
+"""
+Report the byte-identical prefix that LLM requests of the same stage share, i.e.
+the part of the prompt a prefix-caching inference server can reuse between
+requests.
+
+Every telkomllm_* function is called twice with different questions, chat
+history and (where the stage takes one) instruction prompt. The payloads are
+captured at the stub LLM, so the prompts are assembled by the real code path.
+
+Usage (from the api/ folder):
+    python benchmarks/prompt_prefix_report.py
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("X_API_KEY", "bench")
+os.environ.setdefault("URL_CUSTOM_LLM", "http://127.0.0.1")
+os.environ.setdefault("TOKEN_CUSTOM_LLM", "bench")
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+
+from benchmarks.stub_llm import StubLLMConfig, start_stub_server  # noqa: E402
+from config import settings  # noqa: E402
+from llm_metrics import estimate_tokens  # noqa: E402
+import llm_engine  # noqa: E402
+from lib.prompt import (  # noqa: E402
+    agent_prompt, generate_insight_prompt, generate_sql_prompt, generate_topic_prompt, greeting_and_general_prompt,
+    planning_prompt, recognize_components_prompt, recommendation_question_prompt, select_table_and_prompt_prompt,
+    sql_fix_prompt,
+)
+from routes import _build_selection_lists  # noqa: E402
+
+COLUMNS = ["div", "period", "l2", "l3", "l4", "l5", "real_mtd", "target_mtd", "ach_mtd", "mom", "real_ytd", "yoy"]
+FIRST_ROW = {"div": "DWS", "period": 202507, "l2": "REVENUE", "l3": "-", "l4": "-", "l5": "-", "real_mtd": 1.2e12}
+REQUESTS = [
+    {
+        "query": "Bagaimana performansi unit DWS pada periode Juli 2025?",
+        "history": "User: Halo\nAssistant: Halo, ada yang bisa saya bantu?",
+        "prompt_name": "CFU Monthly Performance Analysis",
+        "rows": [{"div": "DWS", "period": 202507, "l2": "REVENUE", "real_mtd": 1.2e12}],
+    },
+    {
+        "query": "Tampilkan trend EBITDA unit TELIN Januari 2025 sampai Juni 2025",
+        "history": "User: Berapa revenue TELIN?\nAssistant: Revenue TELIN Rp1.034,2 Miliar.",
+        "prompt_name": "CFU Trend Analysis",
+        "rows": [{"div": "TELIN", "period": 202501, "l2": "EBITDA", "real_mtd": 3.4e11}],
+    },
+]
+
+
+def _stage_calls(request):
+    tables_list, prompt_list = _build_selection_lists()
+    instruction_prompt = settings.get_prompt_by_name(request["prompt_name"])
+    query, history = request["query"], request["history"]
+    return {
+        "main_agent": llm_engine.telkomllm_main_agent(agent_prompt, query, history, ""),
+        "intent": llm_engine.telkomllm_recognize_intent(recognize_components_prompt, query),
+        "plan": llm_engine.telkomllm_plan(planning_prompt, query, history, tables_list, prompt_list),
+        "select_table": llm_engine.telkomllm_select_table(select_table_and_prompt_prompt, tables_list, prompt_list, query),
+        "generate_sql": llm_engine.telkomllm_generate_sql(generate_sql_prompt, "cfu_performance_data", COLUMNS,
+                                                          FIRST_ROW, query, instruction_prompt),
+        "fix_sql": llm_engine.telkomllm_fix_sql(sql_fix_prompt, COLUMNS, f"SELECT * FROM x -- {query}", "no such table: x"),
+        "infer_sql": llm_engine.telkomllm_infer_sql(
+            generate_insight_prompt.replace("{number_format_instruction}", "Gunakan format sederhana."),
+            query, "cfu_performance_data", instruction_prompt, COLUMNS, request["rows"]),
+        "generate_topic": llm_engine.telkomllm_generate_topic(generate_topic_prompt, history),
+        "recommendation": llm_engine.telkomllm_generate_recommendation_question(recommendation_question_prompt, history),
+        "greeting": llm_engine.telkomllm_greeting_and_general(
+            greeting_and_general_prompt.replace("{current_time}", f"Friday, 17 October 2025, 09:{len(query):02d} WIB"), query),
+    }
+
+
+def _common_prefix(a: str, b: str) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+async def main():
+    captured = {}
+
+    def responder(payload):
+        captured.setdefault(current_stage[0], []).append(payload["messages"][0]["content"])
+        return "{}"
+
+    current_stage = [None]
+    server, url, _ = start_stub_server(StubLLMConfig(responder=responder))
+    llm_engine.URL_CUSTOM_LLM = url
+    try:
+        for request in REQUESTS:
+            for stage, call in _stage_calls(request).items():
+                current_stage[0] = stage
+                await call
+    finally:
+        server.shutdown()
+        await llm_engine.close_llm_client()
+
+    print(f"{'stage':<16}{'prompt tok':>12}{'shared tok':>12}{'shared':>9}")
+    for stage, (first, second) in captured.items():
+        shared = _common_prefix(first, second)
+        total = max(len(first), len(second))
+        print(f"{stage:<16}{estimate_tokens(total):>12}{estimate_tokens(shared):>12}{shared / total:>9.1%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
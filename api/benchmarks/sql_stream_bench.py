@@ -0,0 +1,93 @@
+# benchmarks/sql_stream_bench.py
+"""
+Streamed SQL generation with early termination, against the stub LLM.
+
+The stub answers generate_sql with a fenced SQL statement followed by an explanation,
+streamed in chunks with a fixed delay per chunk; a non-streamed answer waits as long
+as the whole stream would take. The same questions are run with
+settings.sql_streaming_enabled off (full completion) and on (stream cut at the
+statement end); the report shows latency, the chunks the stub generated and the
+per-request saving estimated by sql_stream.
+
+Usage (from the api/ folder):
+    python benchmarks/sql_stream_bench.py --requests 10 --chunk-delay-ms 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("X_API_KEY", "bench")
+os.environ.setdefault("URL_CUSTOM_LLM", "http://127.0.0.1")
+os.environ.setdefault("TOKEN_CUSTOM_LLM", "bench")
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+
+from loguru import logger  # noqa: E402
+
+from benchmarks.stub_llm import StubLLMConfig, start_stub_server  # noqa: E402
+from config import settings  # noqa: E402
+import llm_engine  # noqa: E402
+import routes  # noqa: E402
+from sql_stream import get_sql_stream_stats  # noqa: E402
+
+COMPLETION = (
+    "```sql\n"
+    "SELECT period, l2, real_mtd, PRINTF('%.2f%%', ach_mtd) AS ach_mtd\n"
+    "FROM cfu_performance_data\n"
+    "WHERE div = 'DWS' AND period = 202507 AND l2 IN ('REVENUE', 'EBITDA');\n"
+    "```\n\n"
+    "Penjelasan: query ini mengambil realisasi dan pencapaian bulan Juli 2025 untuk unit DWS. "
+    "Kolom ach_mtd diformat sebagai persentase dengan dua desimal sesuai aturan. "
+    "Filter l2 membatasi hasil pada REVENUE dan EBITDA sehingga tabel tetap ringkas. "
+    "Jika ingin melihat trend, ganti filter period dengan rentang periode yang diinginkan. " * 3
+)
+
+
+async def _run(requests: int, streaming: bool):
+    settings.sql_streaming_enabled = streaming
+    latencies = []
+    for _ in range(requests):
+        t0 = time.perf_counter()
+        sql = await routes.generate_and_validate_sql(
+            table_name="cfu_performance_data", columns_list=["div", "period", "l2", "real_mtd", "ach_mtd"],
+            first_row={}, user_query="Bagaimana performansi DWS Juli 2025?", instruction_prompt="-",
+        )
+        latencies.append(time.perf_counter() - t0)
+    return sql, latencies
+
+
+async def main(requests: int, chunk_delay_ms: float, chunk_chars: int):
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    chunks = max(1, len(COMPLETION) // chunk_chars)
+    cfg = StubLLMConfig(content=COMPLETION, stream_chunks=chunks, chunk_delay=chunk_delay_ms / 1000)
+    server, url, _ = start_stub_server(cfg)
+    llm_engine.URL_CUSTOM_LLM = url
+    try:
+        for streaming in (False, True):
+            sent_before = cfg.stream_chunks_sent
+            cfg.latency = 0.0 if streaming else chunks * cfg.chunk_delay
+            sql, latencies = await _run(requests, streaming)
+            await asyncio.sleep(0.2)  # let the stub notice the closed connections
+            mean = sum(latencies) / len(latencies) * 1000
+            label = "streamed, cut at ';'" if streaming else "full completion"
+            generated = (cfg.stream_chunks_sent - sent_before) / requests if streaming else chunks
+            print(f"{label:<22} mean={mean:.0f}ms  chunks generated/request={generated:.0f}")
+        print(f"SQL passed on: {sql!r}")
+    finally:
+        server.shutdown()
+        await llm_engine.close_llm_client()
+    stats = get_sql_stream_stats()
+    print(f"early stops={stats['early_stops']}/{stats['streams']}  avg tail={stats['avg_tail_chars']} chars  "
+          f"est. saved mean={stats['saved_seconds']['mean'] * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--chunk-delay-ms", type=float, default=20.0)
+    parser.add_argument("--chunk-chars", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.chunk_delay_ms, args.chunk_chars))
@@ -0,0 +1,128 @@
+# benchmarks/stub_llm.py
+"""
+Local stub of the OpenAI-compatible chat completion endpoint used by llm_engine.
+
+Used by the benchmark scripts in this folder so the client and scheduling code
+can be measured without a real model server.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional, Tuple
+
+
+class StubLLMConfig:
+    """Mutable behaviour of the stub, shared by all handler threads."""
+
+    def __init__(self, latency: float = 0.0, handshake: float = 0.0, content: str = "SELECT 1;",
+                 status_code: int = 200, stream_chunks: int = 8, chunk_delay: float = 0.0,
+                 responder: Optional[Callable[[dict], str]] = None, failure_rate: float = 0.0,
+                 prefill_per_1k_tokens: float = 0.0):
+        self.latency = latency            # seconds before the response is sent
+        self.handshake = handshake        # seconds added once per new TCP connection (simulated TLS)
+        self.content = content
+        self.status_code = status_code
+        self.stream_chunks = stream_chunks
+        self.chunk_delay = chunk_delay
+        self.responder = responder        # optional payload -> content override
+        self.failure_rate = failure_rate  # share of requests answered with 503
+        self.prefill_per_1k_tokens = prefill_per_1k_tokens  # seconds per 1000 prompt tokens (4 chars per token)
+        self.connections = 0
+        self.requests = 0
+        self.stream_chunks_sent = 0
+        self.lock = threading.Lock()
+
+
+def _make_handler(cfg: StubLLMConfig):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            with cfg.lock:
+                cfg.connections += 1
+            if cfg.handshake:
+                time.sleep(cfg.handshake)
+            super().setup()
+
+        def log_message(self, format, *args):
+            pass
+
+        def _write_chunk(self, data: bytes):
+            self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            with cfg.lock:
+                cfg.requests += 1
+            if cfg.latency:
+                time.sleep(cfg.latency)
+            if cfg.prefill_per_1k_tokens:
+                prompt_chars = sum(len(str(m.get("content", ""))) for m in payload.get("messages", []))
+                time.sleep(prompt_chars / 4 / 1000 * cfg.prefill_per_1k_tokens)
+
+            status_code = 503 if cfg.failure_rate and random.random() < cfg.failure_rate else cfg.status_code
+            if status_code != 200:
+                body = json.dumps({"error": "stub failure"}).encode()
+                self.send_response(status_code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+
+            content = cfg.responder(payload) if cfg.responder else cfg.content
+            # Cut the completion at max_tokens (4 chars per token) like a real server
+            finish_reason = "stop"
+            if payload.get("max_tokens") and len(content) > payload["max_tokens"] * 4:
+                content, finish_reason = content[:payload["max_tokens"] * 4], "length"
+            usage = {"completion_tokens": (len(content) + 3) // 4}
+            if payload.get("stream"):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                step = max(1, len(content) // max(1, cfg.stream_chunks))
+                try:
+                    for i in range(0, len(content), step):
+                        delta = {"choices": [{"delta": {"content": content[i:i + step]}}]}
+                        self._write_chunk(f"data: {json.dumps(delta)}\n\n".encode())
+                        with cfg.lock:
+                            cfg.stream_chunks_sent += 1
+                        if cfg.chunk_delay:
+                            time.sleep(cfg.chunk_delay)
+                    final = {"choices": [{"delta": {}, "finish_reason": finish_reason}], "usage": usage}
+                    self._write_chunk(f"data: {json.dumps(final)}\n\n".encode())
+                    self._write_chunk(b"data: [DONE]\n\n")
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                return
+
+            body = json.dumps({"choices": [{"message": {"role": "assistant", "content": content}, "finish_reason": finish_reason}],
+                               "usage": usage}).encode()
+            try:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the client cancelled the request (e.g. a hedged call lost the race)
+
+    return Handler
+
+
+def start_stub_server(cfg: Optional[StubLLMConfig] = None, host: str = "127.0.0.1",
+                      port: int = 0) -> Tuple[ThreadingHTTPServer, str, StubLLMConfig]:
+    """Start the stub in a daemon thread. Returns (server, url, config); call server.shutdown() to stop."""
+    cfg = cfg or StubLLMConfig()
+    server = ThreadingHTTPServer((host, port), _make_handler(cfg))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://{host}:{server.server_address[1]}/v1/chat/completions"
+    return server, url, cfg
@@ -0,0 +1,80 @@
+# benchmarks/table_encoding_report.py
+"""
+Size of the table data sent to the insight LLM: the list-of-dicts repr used before
+against table_encoding.encode_table, with and without column pruning.
+
+Rows are synthetic breakdowns shaped like cfu_performance_data results (one unit and
+period, L3/L4 products, MTD/YTD measures) and go through _clean_rows_for_display as in
+generate_insight. Sizes are estimated tokens (llm_metrics.estimate_tokens); the insight
+prompt column also counts the fixed instructions.
+
+Usage (from the api/ folder):
+    python benchmarks/table_encoding_report.py --rows 50 100 200
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("X_API_KEY", "bench")
+os.environ.setdefault("URL_CUSTOM_LLM", "http://127.0.0.1")
+os.environ.setdefault("TOKEN_CUSTOM_LLM", "bench")
+
+from config import settings  # noqa: E402
+from lib.prompt import generate_insight_prompt  # noqa: E402
+from llm_metrics import estimate_tokens  # noqa: E402
+from routes import _clean_rows_for_display  # noqa: E402
+from table_encoding import encode_table, prune_columns  # noqa: E402
+
+L3 = ["DATA", "VOICE", "DIGITAL", "MANAGED SERVICE", "OTHERS"]
+L4 = ["IPLC", "IPTX", "IP TRANSIT", "CDN & SECURITY", "A2P SMS", "CPAAS", "DATA CENTER", "HUBBING", "MVNO DATA",
+      "SATELLITE", "SDWAN", "WIFI ROAMING", "INTERCONNECTION", "TRANSPONDER", "METRO-E", "COLOCATION AND POWER"]
+QUESTION = "Tampilkan produk penyumbang revenue terbesar unit TELIN Juli 2025"
+PROMPT_NAME = "CFU Top Revenue Contributing Products Analysis"
+
+
+def _rows(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        real = rng.uniform(1e9, 9e11)
+        rows.append({
+            "div": "TELIN", "period": 202507, "l2": "REVENUE", "l3": L3[i % len(L3)],
+            "l4": f"{L4[i % len(L4)]} {i // len(L4) + 1}" if count > len(L4) else L4[i], "l5": None,
+            "real_mtd": real, "target_mtd": real / rng.uniform(0.7, 1.2), "prev_year": real / rng.uniform(0.8, 1.3),
+            "ach_mtd": rng.uniform(60, 130), "mom": rng.uniform(-20, 20), "real_ytd": real * 7.1,
+            "ach_ytd": rng.uniform(60, 130), "yoy": rng.uniform(-30, 30),
+        })
+    return rows
+
+
+def _prompt_tokens(table_data, instruction_prompt: str) -> int:
+    prompt = generate_insight_prompt.replace("{number_format_instruction}", "Gunakan format sederhana.")
+    return estimate_tokens(len(prompt.format(table_name="cfu_performance_data", column_list=[], table_data=table_data,
+                                             instruction_prompt=instruction_prompt, user_query=QUESTION)))
+
+
+def main(row_counts):
+    instruction_prompt = settings.get_prompt_by_name(PROMPT_NAME)
+    print(f"{'rows':>5} {'encoding':<18}{'table tok':>10}{'prompt tok':>11}{'vs records':>11}")
+    for count in row_counts:
+        cleaned = _clean_rows_for_display(_rows(count))
+        columns = list(cleaned[0].keys())
+        variants = {
+            "records (before)": cleaned,
+            "columnar": encode_table(cleaned, columns),
+            "columnar + prune": encode_table(cleaned, prune_columns(columns, cleaned, instruction_prompt, QUESTION)),
+        }
+        baseline = _prompt_tokens(cleaned, instruction_prompt)
+        for name, table_data in variants.items():
+            prompt_tokens = _prompt_tokens(table_data, instruction_prompt)
+            print(f"{count:>5} {name:<18}{estimate_tokens(len(str(table_data))):>10}{prompt_tokens:>11}"
+                  f"{prompt_tokens / baseline:>10.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[50, 100, 200])
+    args = parser.parse_args()
+    main(args.rows)
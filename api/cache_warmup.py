@@ -0,0 +1,147 @@
+# app/cache_warmup.py
+import asyncio
+import os
+import socket
+import time
+from typing import Any, Dict, List, Optional
+from loguru import logger
+
+from config import settings
+from llm_cache import get_llm_cache
+from llm_scheduler import BACKGROUND_LANE, use_llm_lane
+from routes import get_insight_logic
+from sql_cache import data_version
+
+# Fields requested by the chat client, so warm-up runs every stage a user request runs
+WARMUP_FIELDS = ["output", "chart", "dataColumns", "dataRows", "intent"]
+# Lease in the on-disk LLM cache held by the worker that warms the caches
+WARMUP_LEASE = "cache_warmup"
+WARMUP_OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+# Report of the last warm-up run, see get_warmup_stats()
+_last_report: Optional[Dict[str, Any]] = None
+# Database file state the caches were last warmed for
+_warmed_version: Optional[str] = None
+_runs = 0
+_is_warmer = False
+
+
+def load_warmup_questions() -> List[str]:
+    """settings.warmup_questions plus the lines of settings.warmup_questions_path, without duplicates."""
+    questions = list(settings.warmup_questions)
+    if settings.warmup_questions_path:
+        try:
+            with open(settings.warmup_questions_path, encoding="utf-8") as f:
+                questions.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+        except OSError as e:
+            logger.warning(f"[Warmup] could not read {settings.warmup_questions_path}: {e}")
+    return list(dict.fromkeys(questions))
+
+
+async def _warm_question(question: str, semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+    async with semaphore:
+        # Warm-up calls queue behind live traffic and give up when the background lane is saturated
+        use_llm_lane(BACKGROUND_LANE)
+        t0 = time.monotonic()
+        try:
+            result = await get_insight_logic(question, None, WARMUP_FIELDS)
+            status, sql_source = "warmed", result.get("sql_source")
+        except Exception as e:
+            status, sql_source = f"failed: {getattr(e, 'detail', None) or e}", None
+        return {"question": question, "status": status, "sql_source": sql_source,
+                "seconds": round(time.monotonic() - t0, 2)}
+
+
+async def run_warmup(reason: str) -> Dict[str, Any]:
+    """
+    Run the warm-up questions through the insight pipeline, at most settings.warmup_concurrency at
+    a time, so the SQL, insight and LLM response caches hold their answers. Returns the coverage report.
+    """
+    global _last_report, _warmed_version, _runs
+    questions = load_warmup_questions()
+    version = data_version(settings.database_api_path, [])
+    semaphore = asyncio.Semaphore(max(1, settings.warmup_concurrency))
+    t0 = time.monotonic()
+    results = await asyncio.gather(*(_warm_question(q, semaphore) for q in questions))
+
+    warmed = sum(1 for r in results if r["status"] == "warmed")
+    _runs += 1
+    _warmed_version = version
+    _last_report = {
+        "reason": reason,
+        "finished_at": time.time(),
+        "seconds": round(time.monotonic() - t0, 2),
+        "questions": len(questions),
+        "warmed": warmed,
+        "failed": len(questions) - warmed,
+        "coverage": round(warmed / len(questions), 3) if questions else 0.0,
+        "results": results,
+    }
+    logger.info(
+        f"[Warmup] {reason}: warmed {warmed}/{len(questions)} questions in {_last_report['seconds']:.1f}s"
+        + "".join(f"\n  - {r['question']}: {r['status']}" for r in results if r["status"] != "warmed")
+    )
+    return _last_report
+
+
+def hold_warmup_lease() -> bool:
+    """Take or renew the warm-up lease; True when this worker is the one that warms."""
+    cache = get_llm_cache()
+    if cache is None:
+        return True
+    return cache.acquire_lease(WARMUP_LEASE, WARMUP_OWNER, settings.warmup_lease_ttl)
+
+
+def _warmup_reason(last_run: float) -> Optional[str]:
+    if _warmed_version is None:
+        return "startup"
+    if data_version(settings.database_api_path, []) != _warmed_version:
+        return "data reload"
+    if time.monotonic() - last_run >= settings.warmup_interval:
+        return "schedule"
+    return None
+
+
+async def _warm_holding_lease(reason: str) -> None:
+    """run_warmup(), renewing the lease meanwhile so a long run is not taken over by another worker."""
+    run = asyncio.ensure_future(run_warmup(reason))
+    try:
+        while not run.done():
+            await asyncio.wait({run}, timeout=settings.warmup_check_interval)
+            if not run.done():
+                await asyncio.to_thread(hold_warmup_lease)
+    finally:
+        run.cancel()
+    await run
+
+
+async def run_cache_warmer() -> None:
+    """
+    Warm the caches at startup, then again whenever the database file changes (a data reload, also
+    by another worker) and every settings.warmup_interval seconds. Only the worker holding the
+    warm-up lease runs; the others check every settings.warmup_check_interval seconds.
+    """
+    global _is_warmer
+    last_run = time.monotonic()
+    try:
+        while True:
+            try:
+                elected = await asyncio.to_thread(hold_warmup_lease)
+                if elected != _is_warmer:
+                    logger.info(f"[Warmup] {WARMUP_OWNER} {'is now' if elected else 'is no longer'} the warming worker")
+                    _is_warmer = elected
+                reason = _warmup_reason(last_run) if elected else None
+                if reason:
+                    await _warm_holding_lease(reason)
+                    last_run = time.monotonic()
+            except Exception as e:
+                logger.error(f"[Warmup] warm-up error: {e}")
+            await asyncio.sleep(settings.warmup_check_interval)
+    finally:
+        cache = get_llm_cache()
+        if _is_warmer and cache is not None:
+            cache.release_lease(WARMUP_LEASE, WARMUP_OWNER)
+
+
+def get_warmup_stats() -> Dict[str, Any]:
+    return {"enabled": settings.warmup_enabled, "warmer": _is_warmer, "runs": _runs, "last": _last_report}
@@ -1,7 +1,7 @@
 # config.py
 import os
 from dotenv import load_dotenv
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from pydantic import Field
 from pydantic_settings import BaseSettings
 from loguru import logger
@@ -72,6 +72,206 @@ class Settings(BaseSettings):
     data_path: str = "data/"
     database_api_path: str = os.path.join(data_path, "CFU_API.db")
 
+    # Shared LLM HTTP client (created and closed by main.lifespan)
+    llm_http2: bool = True
+    llm_max_connections: int = 50
+    llm_max_keepalive_connections: int = 20
+    llm_keepalive_expiry: float = 60.0
+    llm_connect_timeout: float = 10.0
+    llm_default_timeout: float = 120.0
+    # Deadline (seconds) per LLM stage, keyed by the stage name used in llm_engine. For non-streaming
+    # calls it bounds all attempts together; for streaming calls it is the read timeout.
+    llm_stage_timeouts: Dict[str, float] = {
+        "main_agent": 60.0,
+        "plan": 60.0,
+        "select_table": 45.0,
+        "generate_sql": 120.0,
+        "infer_sql": 180.0,
+        "fix_sql": 90.0,
+        "generate_topic": 20.0,
+        "recommendation": 30.0,
+        "greeting": 60.0,
+        "intent": 30.0,
+    }
+
+    # Per-stage LLM profile: model, max_tokens, temperature, optional "stop" sequences and optionally
+    # url/token of a different endpoint (comma-separated replicas allowed; defaults to URL_CUSTOM_LLM/TOKEN_CUSTOM_LLM).
+    # Routing stages can be pointed at a smaller, faster model here.
+    llm_default_model: str = "telkom-ai-instruct"
+    llm_stage_profiles: Dict[str, Dict[str, Any]] = {
+        "main_agent": {"max_tokens": 4000, "temperature": 0},
+        "intent": {"max_tokens": 256, "temperature": 0},
+        "plan": {"max_tokens": 2000, "temperature": 0},
+        "select_table": {"max_tokens": 2000, "temperature": 0},
+        "generate_sql": {"max_tokens": 10000, "temperature": 0},
+        "infer_sql": {"max_tokens": 28000, "temperature": 0},
+        "fix_sql": {"max_tokens": 5000, "temperature": 0},
+        "generate_topic": {"max_tokens": 128, "temperature": 0},
+        "recommendation": {"max_tokens": 256, "temperature": 0},
+        "greeting": {"max_tokens": 2000, "temperature": 0},
+    }
+    # Named sets of per-stage profile overrides, selected per request with the getInsight
+    # "experiment" argument, e.g. {"small-router": {"select_table": {"model": "small-model"}}}
+    llm_experiments: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    # JSON mode of the plan, intent and select_table calls: "off", "json_object" or "json_schema"
+    # (sends the response schema as response_format). A stage profile can override it with "json_mode".
+    llm_json_mode: str = "off"
+
+    # Adaptive max_tokens (see llm_budget.py): per stage and prompt, the llm_budget_percentile of the
+    # last llm_budget_window completion lengths plus llm_budget_headroom, capped by the profile max_tokens.
+    # Applies to non-streaming calls and to the streamed stages of llm_budget_stream_stages, whose chunks
+    # never reach the client; a completion cut off at a learned budget is retried, not streamed, with the full one.
+    llm_budget_enabled: bool = True
+    llm_budget_window: int = 200
+    llm_budget_min_samples: int = 20
+    llm_budget_percentile: float = 0.99
+    llm_budget_headroom: float = 0.25
+    llm_budget_min_tokens: int = 64
+    llm_budget_path: str = os.path.join(data_path, "llm_budgets.json")
+    llm_budget_save_interval: float = 60.0
+    llm_budget_stream_stages: List[str] = ["generate_sql"]
+
+    # Outbound LLM concurrency governor: a global cap plus per-lane quotas. Lower priority value
+    # is served first; a call is rejected with 429 when its queue wait would exceed the lane deadline.
+    llm_max_concurrency: int = 16
+    llm_lane_quotas: Dict[str, int] = {"interactive": 16, "background": 4}
+    llm_lane_priorities: Dict[str, int] = {"interactive": 0, "background": 1}
+    llm_lane_queue_deadlines: Dict[str, float] = {"interactive": 30.0, "background": 5.0}
+    # LLM stages served by the background lane; all other stages are interactive
+    llm_background_stages: List[str] = ["generate_topic", "recommendation"]
+
+    # Jittered retries of non-streaming LLM calls on transient errors, within the stage deadline
+    llm_retry_attempts: int = 2
+    llm_retry_base_delay: float = 0.25
+    llm_retry_max_delay: float = 2.0
+    # Hedging: send a second request when a call runs past the observed p95 of its stage
+    llm_hedge_enabled: bool = True
+    llm_hedge_stages: List[str] = ["main_agent", "intent", "plan", "select_table"]
+    llm_hedge_min_delay: float = 0.5
+    llm_hedge_min_samples: int = 20
+
+    # Circuit breaker around the LLM endpoint: opens when the error rate or the slow call rate of
+    # the last llm_breaker_window_seconds crosses its threshold, fails calls fast while open and
+    # lets llm_breaker_half_open_calls trial calls through after llm_breaker_open_seconds.
+    llm_breaker_enabled: bool = True
+    llm_breaker_window_seconds: float = 60.0
+    llm_breaker_min_calls: int = 10
+    llm_breaker_failure_rate: float = 0.5
+    llm_breaker_slow_call_seconds: float = 60.0
+    llm_breaker_slow_call_rate: float = 0.8
+    llm_breaker_open_seconds: float = 30.0
+    llm_breaker_half_open_calls: int = 3
+
+    # Client-side load balancing over the comma-separated URL_CUSTOM_LLM replicas:
+    # "ewma" (latency x in-flight, default) or "least_outstanding". A replica is ejected after
+    # llm_endpoint_eject_failures consecutive failures and readmitted when a probe succeeds.
+    llm_balancer_strategy: str = "ewma"
+    llm_endpoint_ewma_alpha: float = 0.3
+    llm_endpoint_eject_failures: int = 3
+    llm_endpoint_eject_seconds: float = 10.0
+    llm_endpoint_max_eject_seconds: float = 300.0
+    llm_endpoint_probe_interval: float = 5.0
+    llm_endpoint_probe_timeout: float = 10.0
+
+    # Skip the contextualization LLM call for self-contained first-turn questions
+    context_fast_path_enabled: bool = True
+
+    # Planning mode: "split" (context, intent and selection calls), "fused" (one planning call)
+    # or "ab" (fused for planning_fused_ratio of the requests, split for the rest)
+    planning_mode: str = "split"
+    planning_fused_ratio: float = 0.5
+
+    # Local BM25 prompt router (see prompt_router.py). A local match is confident when the top score
+    # reaches prompt_router_min_score and exceeds the runner-up by prompt_router_margin (relative).
+    # prompt_router_mode: "off"; "shadow" (the LLM always selects, the local choice is only logged
+    # with its scores as [PromptRouter] agreement lines, to tune the threshold); "on" (confident
+    # local matches skip the LLM). prompt_router_shadow_rate is the share of local hits in "on"
+    # mode also sent to the LLM to measure agreement.
+    prompt_router_mode: str = "shadow"
+    prompt_router_min_score: float = 6.0
+    prompt_router_margin: float = 0.3
+    prompt_router_shadow_rate: float = 0.1
+
+    # Fill the reference SQL templates (see sql_templates.py) instead of calling the LLM
+    # when the entities of the question are resolved with confidence
+    sql_templates_enabled: bool = True
+    # Rows sent to the insight LLM: "columnar" (header plus '|'-separated rows, see table_encoding.py)
+    # or "records" (list of dicts). insight_prune_columns drops numeric columns that neither the
+    # instruction prompt nor the question names.
+    insight_table_format: str = "columnar"
+    insight_prune_columns: bool = False
+    # Above insight_row_budget rows (0 disables) the insight LLM gets a summary instead of every row:
+    # top and bottom rows by the key measure, group subtotals and the total. The client still gets
+    # all rows. The key measure is the first of insight_key_measures in the result.
+    insight_row_budget: int = 60
+    insight_key_measures: List[str] = ["real_mtd", "real_ytd", "revenue", "ebitda", "net_income"]
+
+    # Stream SQL generation and stop it at the end of the first statement (see sql_stream.py)
+    sql_streaming_enabled: bool = True
+
+    # Cache of LLM-generated SQL keyed on the normalized question, prompt, table and data version
+    # (see sql_cache.py); only SQL that returned rows is kept, and it is shared with the other
+    # workers through the on-disk LLM cache. Rebuilding the database invalidates it
+    sql_cache_enabled: bool = True
+    sql_cache_max_entries: int = 512
+    sql_cache_ttl: float = 6 * 3600
+    # On-disk cache of LLM completions shared by all workers (SQLite in WAL mode, see llm_cache.py).
+    # Only the stages listed are cached; compaction drops expired entries and the least recently
+    # used ones above llm_cache_max_bytes every llm_cache_compact_interval seconds.
+    llm_cache_enabled: bool = True
+    llm_cache_path: str = os.path.join(data_path, "llm_cache.db")
+    llm_cache_stages: List[str] = ["select_table", "plan", "intent", "generate_topic", "recommendation"]
+    llm_cache_ttl: float = 24 * 3600
+    llm_cache_max_bytes: int = 64 * 1024 * 1024
+    llm_cache_compact_interval: float = 600
+    # Single flight: identical non-streaming LLM calls, and identical insight requests (normalized
+    # question, chat history, requested fields) arriving while one runs, share the running one
+    llm_single_flight_enabled: bool = True
+    insight_single_flight_enabled: bool = True
+
+    # Cache warm-up (see cache_warmup.py): the questions below, plus one per line from
+    # warmup_questions_path, are run through the insight pipeline at startup, when the database file
+    # changes (checked every warmup_check_interval seconds) and every warmup_interval seconds.
+    # At most warmup_concurrency run at once, with their LLM calls on the background lane.
+    # One worker warms: it holds a lease in the on-disk LLM cache, renewed every check and taken
+    # over by another worker warmup_lease_ttl seconds after it stops. The others share its SQL and
+    # LLM cache entries through that file. Without the on-disk cache every worker warms itself.
+    warmup_enabled: bool = True
+    warmup_questions: List[str] = [
+        "Bagaimana performansi unit CFU WIB pada periode Juli 2025?",
+        "Bagaimana trend Revenue unit DWS untuk periode Januari 2025 sampai Juli 2025?",
+        "Produk apa yang tidak tercapai pada unit WINS?",
+        "Mengapa performansi EBITDA unit TELIN tercapai?",
+    ]
+    warmup_questions_path: Optional[str] = None
+    warmup_concurrency: int = 2
+    warmup_interval: float = 3600
+    warmup_check_interval: float = 60
+    warmup_lease_ttl: float = 300
+    # Cache of insight texts keyed on the result rows, prompt, normalized question and number format
+    # (see insight_cache.py), bounded by the total characters held. Hits are replayed to the text
+    # stream in chunks of insight_cache_replay_words words every insight_cache_replay_delay seconds.
+    insight_cache_enabled: bool = True
+    insight_cache_max_chars: int = 4_000_000
+    insight_cache_ttl: float = 6 * 3600
+    insight_cache_replay_words: int = 3
+    insight_cache_replay_delay: float = 0.02
+
+    # Insight pipeline (see pipeline.py); timeouts cover the whole stage, including SQL fix retries
+    pipeline_default_stage_timeout: float = 300.0
+    pipeline_stage_timeouts: Dict[str, float] = {
+        "plan": 90.0,
+        "context": 90.0,
+        "intent": 90.0,
+        "select": 90.0,
+        "schema": 30.0,
+        "sql": 180.0,
+        "query": 240.0,
+        "insight": 300.0,
+        "chart": 60.0,
+        "greeting": 90.0,
+    }
+
     # Static Table Configuration for ETL (single consolidated table)
     tables_config: List[Dict[str, Any]] = [
         {
@@ -5,6 +5,9 @@ from typing import List, Dict, Any
 from loguru import logger
 from pathlib import Path
 
+from insight_cache import invalidate_insight_cache
+from sql_cache import invalidate_sql_cache
+
 def get_db_connection(db_path: str):
     """Creates and returns a database connection with row factory for dict-like rows."""
     conn = sqlite3.connect(db_path)
@@ -142,6 +145,8 @@ def insert_xlsx_to_db(data_path: str, db_path: str, tables_config: List[Dict[str
 
             conn.commit()
             logger.success(f"Database successfully created at {db_path}")
+        invalidate_sql_cache("database rebuilt")
+        invalidate_insight_cache("database rebuilt")
 
     except Exception as e:
         logger.error(f"Error processing Excel files: {e}")
@@ -0,0 +1,223 @@
+# app/entity_extractor.py
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from loguru import logger
+
+VALID_VALUES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lib", "valid_values.json")
+
+MONTHS = {
+    "januari": 1, "january": 1, "jan": 1,
+    "februari": 2, "february": 2, "feb": 2, "pebruari": 2,
+    "maret": 3, "march": 3, "mar": 3,
+    "april": 4, "apr": 4,
+    "mei": 5, "may": 5,
+    "juni": 6, "june": 6, "jun": 6,
+    "juli": 7, "july": 7, "jul": 7,
+    "agustus": 8, "august": 8, "agu": 8, "agt": 8, "aug": 8,
+    "september": 9, "sep": 9, "sept": 9,
+    "oktober": 10, "october": 10, "okt": 10, "oct": 10,
+    "november": 11, "nov": 11, "nop": 11,
+    "desember": 12, "december": 12, "des": 12, "dec": 12,
+}
+
+# Relative period expressions, as token sequences
+RELATIVE_PERIODS = {
+    ("bulan", "lalu"): "previous_month",
+    ("bulan", "kemarin"): "previous_month",
+    ("bulan", "sebelumnya"): "previous_month",
+    ("last", "month"): "previous_month",
+    ("bulan", "ini"): "current_month",
+    ("this", "month"): "current_month",
+    ("tahun", "ini"): "current_year",
+    ("this", "year"): "current_year",
+    ("tahun", "lalu"): "previous_year",
+    ("last", "year"): "previous_year",
+}
+
+# Alternative spellings mapped to canonical values
+DIV_ALIASES = {
+    "telkomsat": "TSAT", "infranexia": "TIF", "mitratel": "DMT",
+    "telkom indonesia international": "TELIN", "divisi wholesale service": "DWS", "wholesale service": "DWS",
+}
+METRIC_ALIASES = {
+    "pendapatan": "REVENUE", "netincome": "NET INCOME", "net profit": "NET INCOME", "laba bersih": "NET INCOME",
+}
+CFU_WIB_ALIASES = ["cfu wib", "cfu"]
+
+# Single-word categories that are also everyday words; matches are reported as weak
+WEAK_CATEGORY_WORDS = {
+    "data", "service", "network", "general", "digital", "others", "lainnya", "marketing", "international",
+    "external", "premium", "bank", "rapat", "pd", "om", "legacy", "personnel", "personel", "incoming",
+    "outgoing", "reseller", "tax", "administrasi", "karyawan", "multimedia", "peralatan", "satellite",
+}
+
+_TERMINAL = "$"
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens ('&' kept as its own token)."""
+    return re.findall(r"[a-z0-9]+|&", (text or "").lower())
+
+
+class EntityExtractor:
+    """
+    Multi-pattern matcher over normalized tokens. All DIV, L2 and L3-L5 values of
+    lib/valid_values.json plus aliases are compiled into one token trie; a query is scanned
+    once with leftmost-longest matching.
+    """
+
+    def __init__(self, valid_values: Dict[str, Any]):
+        self.trie: Dict[str, Any] = {}
+        self.first_tokens = set()
+
+        for div in valid_values.get("DIV", []):
+            self._add(div, ("div", div))
+        for alias, div in DIV_ALIASES.items():
+            self._add(alias, ("div", div))
+        for metric in valid_values.get("L2_Key_Metrics", []):
+            self._add(metric, ("metric", metric))
+        for alias, metric in METRIC_ALIASES.items():
+            self._add(alias, ("metric", metric))
+        for alias in CFU_WIB_ALIASES:
+            self._add(alias, ("cfu_wib", "CFU WIB"))
+
+        levels: Dict[str, List[str]] = {}
+        for level in ("L3", "L4", "L5"):
+            for value in valid_values.get("HIERARCHY_REFERENCE", {}).get(level, []):
+                if tokenize(value):
+                    levels.setdefault(value, [])
+                    if level not in levels[value]:
+                        levels[value].append(level)
+        for value, value_levels in levels.items():
+            self._add(value, ("category", value, tuple(value_levels)))
+
+        for tokens, relative in RELATIVE_PERIODS.items():
+            self._add(" ".join(tokens), ("relative_period", relative))
+
+    def _add(self, phrase: str, payload: Tuple) -> None:
+        tokens = tokenize(phrase)
+        if not tokens:
+            return
+        node = self.trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node.setdefault(_TERMINAL, [])
+        if payload not in node[_TERMINAL]:
+            node[_TERMINAL].append(payload)
+        self.first_tokens.add(tokens[0])
+
+    def _normalize_tokens(self, text: str) -> List[str]:
+        """Tokenize and strip the Indonesian '-nya' suffix from known entities ('ebitdanya' -> 'ebitda')."""
+        tokens = []
+        for token in tokenize(text):
+            if token.endswith("nya") and token not in self.first_tokens and token[:-3] in self.first_tokens:
+                token = token[:-3]
+            tokens.append(token)
+        return tokens
+
+    def _match(self, tokens: List[str]) -> List[Tuple[int, int, List[Tuple]]]:
+        """Leftmost-longest matches as (start, end, payloads)."""
+        matches = []
+        i = 0
+        while i < len(tokens):
+            node = self.trie
+            best = None
+            j = i
+            while j < len(tokens) and tokens[j] in node:
+                node = node[tokens[j]]
+                j += 1
+                if _TERMINAL in node:
+                    best = (i, j, node[_TERMINAL])
+            if best:
+                matches.append(best)
+                i = best[1]
+            else:
+                i += 1
+        return matches
+
+    def extract(self, query: str, reference_period: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Return structured entities:
+        divs, cfu_wib, metrics, categories ({value, levels, weak}), periods (YYYYMM ints, sorted),
+        relative_periods, unresolved_months (month names without a year) and years (bare years).
+        Relative periods are converted to YYYYMM when reference_period (the latest period) is given.
+        """
+        tokens = self._normalize_tokens(query)
+        entities: Dict[str, Any] = {
+            "divs": [], "cfu_wib": False, "metrics": [], "categories": [],
+            "periods": [], "relative_periods": [], "unresolved_months": [], "years": [],
+        }
+        consumed = [False] * len(tokens)
+
+        for start, end, payloads in self._match(tokens):
+            for payload in payloads:
+                kind = payload[0]
+                if kind == "div" and payload[1] not in entities["divs"]:
+                    entities["divs"].append(payload[1])
+                elif kind == "metric" and payload[1] not in entities["metrics"]:
+                    entities["metrics"].append(payload[1])
+                elif kind == "cfu_wib":
+                    entities["cfu_wib"] = True
+                elif kind == "relative_period" and payload[1] not in entities["relative_periods"]:
+                    entities["relative_periods"].append(payload[1])
+                elif kind == "category":
+                    weak = end - start == 1 and tokens[start] in WEAK_CATEGORY_WORDS
+                    entities["categories"].append({"value": payload[1], "levels": list(payload[2]), "weak": weak})
+            for k in range(start, end):
+                consumed[k] = True
+
+        periods = set()
+        for i, token in enumerate(tokens):
+            if re.fullmatch(r"20\d{2}(0[1-9]|1[0-2])", token):
+                periods.add(int(token))
+            elif token in MONTHS and not (consumed[i] and len(token) <= 3):
+                year = tokens[i + 1] if i + 1 < len(tokens) else ""
+                if re.fullmatch(r"20\d{2}", year):
+                    periods.add(int(year) * 100 + MONTHS[token])
+                    consumed[i + 1] = True
+                else:
+                    entities["unresolved_months"].append(token)
+        for i, token in enumerate(tokens):
+            if re.fullmatch(r"20\d{2}", token) and not consumed[i]:
+                entities["years"].append(int(token))
+
+        if reference_period:
+            for relative in entities["relative_periods"]:
+                if relative == "current_month":
+                    periods.add(reference_period)
+                elif relative == "previous_month":
+                    year, month = divmod(reference_period, 100)
+                    periods.add((year - 1) * 100 + 12 if month == 1 else reference_period - 1)
+
+        entities["periods"] = sorted(periods)
+        return entities
+
+
+_extractor: Optional[EntityExtractor] = None
+
+
+def init_entity_extractor() -> EntityExtractor:
+    """Compile the matcher from lib/valid_values.json. Called once on application startup."""
+    global _extractor
+    try:
+        with open(VALID_VALUES_PATH, "r") as f:
+            valid_values = json.load(f)
+    except Exception as e:
+        logger.warning(f"Could not load valid_values.json for the entity extractor: {e}")
+        valid_values = {"DIV": ["DMT", "DWS", "TELIN", "TIF", "TSAT"],
+                        "L2_Key_Metrics": ["REVENUE", "COE", "EBITDA", "EBIT", "EBT", "NET INCOME"]}
+    _extractor = EntityExtractor(valid_values)
+    return _extractor
+
+
+def get_entity_extractor() -> EntityExtractor:
+    if _extractor is None:
+        return init_entity_extractor()
+    return _extractor
+
+
+def extract_entities(query: str, reference_period: Optional[int] = None) -> Dict[str, Any]:
+    """Extract entities with the shared extractor."""
+    return get_entity_extractor().extract(query, reference_period)
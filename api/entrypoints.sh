@@ -6,4 +6,4 @@
 # echo "Copying data done ..."
 
 echo "Starting CFU WIB application ..."
-/app/.venv/bin/uvicorn main:app --port 5123 --host 0.0.0.0 --workers 1 --reload
\ No newline at end of file
+/app/.venv/bin/uvicorn main:app --port 5123 --host 0.0.0.0 --workers ${WORKERS:-1}
\ No newline at end of file
@@ -1,6 +1,7 @@
 import strawberry
 from typing import List, Optional, Any, Dict, AsyncGenerator
 from strawberry.types import Info
+from graphql import GraphQLError
 from loguru import logger
 import asyncio
 from collections import defaultdict
@@ -11,6 +12,7 @@ from routes import (
     get_topic_logic,
     get_recommendation_logic
 )
+from llm_breaker import LLMUnavailableError, get_llm_breaker
 
 # Progress tracking storage
 progress_storage: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
@@ -64,6 +66,7 @@ class InsightResponse:
     data_columns: Optional[List[str]] = strawberry.field(description="The list of column names in the raw data table.")
     data_rows: Optional[List[DataRow]] = strawberry.field(description="The raw query result rows.")  # type: ignore
     intent: Optional[Intent] = strawberry.field(description="The recognized intent used for generating this response.")
+    sql_source: Optional[str] = strawberry.field(default=None, description="How the SQL was produced: 'template' (deterministic fast path), 'cache' (SQL generated earlier for the same question) or 'llm'.")
 
 
 @strawberry.type
@@ -141,21 +144,33 @@ def emit_text_stream(request_id: str, chunk: str, is_final: bool = False):
                 logger.warning(f"Text stream queue full for request {request_id}, skipping chunk")
 
 
+def llm_unavailable_error(error: LLMUnavailableError) -> GraphQLError:
+    """Typed GraphQL error for clients: extensions.code is LLM_UNAVAILABLE and retryAfter is in seconds."""
+    return GraphQLError(
+        "Layanan AI sedang tidak tersedia, silakan coba lagi beberapa saat lagi.",
+        extensions={"code": "LLM_UNAVAILABLE", "retryAfter": int(error.retry_after) + 1},
+    )
+
+
 # 2. DEFINE THE MAIN QUERY & RESOLVERS
 
 @strawberry.type
 class Query:
     @strawberry.field
-    async def get_insight(self, info: Info, query: str, request_id: str, chat_history: Optional[str] = None) -> InsightResponse:
+    async def get_insight(self, info: Info, query: str, request_id: str, chat_history: Optional[str] = None,
+                          experiment: Optional[str] = None, bypass_cache: bool = False) -> InsightResponse:
         """
         Resolver for generating insights with progress tracking.
         The intent is now fully handled within this backend logic.
+        bypass_cache=True generates the SQL and insight again instead of reusing cached ones.
         """
         logger.info(f"GraphQL get_insight called with query: '{query}' and request_id: '{request_id}'")
 
         emit_progress(request_id, "init", "in_progress", "Memulai pemrosesan permintaan...")
 
         try:
+            # Fail fast while the LLM circuit is open
+            get_llm_breaker().check()
 
             # 1. Inspect requested fields
             requested_fields = {field.name for field in info.selected_fields[0].selections}
@@ -168,7 +183,9 @@ class Query:
                 query=query,
                 chat_history=chat_history,
                 requested_fields=list(requested_fields),
-                request_id=request_id
+                request_id=request_id,
+                experiment=experiment,
+                bypass_cache=bypass_cache
             )
 
             # 3. Wrap chart data
@@ -194,29 +211,46 @@ class Query:
                 chart=chart_obj,
                 data_columns=result_dict.get("data_columns"),
                 data_rows=result_dict.get("data_rows"),
-                intent=intent_obj
+                intent=intent_obj,
+                sql_source=result_dict.get("sql_source")
             )
+        except LLMUnavailableError as e:
+            typed_error = llm_unavailable_error(e)
+            emit_progress(request_id, "error", "error", typed_error.message, details="LLM_UNAVAILABLE")
+            emit_text_stream(request_id, "", is_final=True)
+            logger.error(f"Error in get_insight: {e.detail}")
+            raise typed_error
         except Exception as e:
             emit_progress(request_id, "error", "error", f"Terjadi kesalahan: {str(e)}")
+            emit_text_stream(request_id, "", is_final=True)
             logger.error(f"Error in get_insight: {e}")
             raise
 
     @strawberry.field
     async def recognize_intent(self, query: str) -> Intent:
         """Resolver that uses LLM logic to detect the user's intent for text, chart, table, or simplified numbers."""
-        intent_dict = await get_intent_logic(query)
+        try:
+            intent_dict = await get_intent_logic(query)
+        except LLMUnavailableError as e:
+            raise llm_unavailable_error(e)
         return Intent(**intent_dict)
 
     @strawberry.field
     async def get_topic(self, chat_history: str) -> TopicResponse:
         """Resolver that generates a conversational topic from chat history."""
-        topic_text = await get_topic_logic(chat_history)
+        try:
+            topic_text = await get_topic_logic(chat_history)
+        except LLMUnavailableError as e:
+            raise llm_unavailable_error(e)
         return TopicResponse(output=topic_text)
 
     @strawberry.field
     async def get_recommendation(self, chat_history: str) -> RecommendationResponse:
         """Resolver that generates a recommendation or follow-up question from chat history."""
-        rec_text = await get_recommendation_logic(chat_history)
+        try:
+            rec_text = await get_recommendation_logic(chat_history)
+        except LLMUnavailableError as e:
+            raise llm_unavailable_error(e)
         return RecommendationResponse(output=rec_text)
 
 
@@ -0,0 +1,131 @@
+# app/insight_cache.py
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from loguru import logger
+
+from config import settings
+from sql_cache import normalize_query
+
+CacheKey = Tuple[str, str, str, bool]
+
+
+def result_hash(rows: List[Dict[str, Any]], instruction_prompt: str) -> str:
+    """Hash of the query rows and the instruction prompt text the insight was written from."""
+    digest = hashlib.sha1(instruction_prompt.encode())
+    digest.update(json.dumps(rows, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def insight_cache_key(rows: List[Dict[str, Any]], instruction_prompt: str, prompt_name: str,
+                      user_query: str, wants_simplified_numbers: bool) -> CacheKey:
+    return (result_hash(rows, instruction_prompt), prompt_name or "", normalize_query(user_query),
+            bool(wants_simplified_numbers))
+
+
+class InsightCache:
+    """LRU cache of insight texts bounded by their total size in characters, with a time to live."""
+
+    def __init__(self, max_chars: int, ttl: float):
+        self.max_chars = max_chars
+        self.ttl = ttl
+        self.entries: "OrderedDict[CacheKey, Tuple[float, str]]" = OrderedDict()
+        self.chars = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def get(self, key: CacheKey) -> Optional[str]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: CacheKey, text: str) -> None:
+        if len(text) > self.max_chars:
+            return
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (time.monotonic(), text)
+            self.chars += len(text)
+            while self.chars > self.max_chars:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def _remove(self, key: CacheKey) -> None:
+        _, text = self.entries.pop(key)
+        self.chars -= len(text)
+
+    def clear(self) -> int:
+        with self.lock:
+            count = len(self.entries)
+            self.entries.clear()
+            self.chars = 0
+            return count
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "chars": self.chars,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+        }
+
+
+_cache: Optional[InsightCache] = None
+
+
+def get_insight_cache() -> InsightCache:
+    global _cache
+    if _cache is None:
+        _cache = InsightCache(settings.insight_cache_max_chars, settings.insight_cache_ttl)
+    return _cache
+
+
+def replay_chunks(text: str, words_per_chunk: int) -> List[str]:
+    """Split text into chunks of a few words, keeping the whitespace and newlines between them."""
+    words = re.findall(r"\s*\S+", text)
+    chunks = ["".join(words[i:i + words_per_chunk]) for i in range(0, len(words), words_per_chunk)]
+    if chunks and len("".join(chunks)) < len(text):
+        chunks[-1] += text[len("".join(chunks)):]
+    return chunks
+
+
+async def replay_insight(text: str, stream_callback: Callable[[str], Awaitable[Any]]) -> None:
+    """Send a cached insight through the streaming callback in word chunks, paced like a live stream."""
+    for chunk in replay_chunks(text, settings.insight_cache_replay_words):
+        await stream_callback(chunk)
+        if settings.insight_cache_replay_delay:
+            await asyncio.sleep(settings.insight_cache_replay_delay)
+
+
+def invalidate_insight_cache(reason: str) -> None:
+    if _cache is not None:
+        count = _cache.clear()
+        logger.info(f"[InsightCache] dropped {count} entries ({reason})")
+
+
+def get_insight_cache_stats() -> Dict[str, Any]:
+    return {"enabled": settings.insight_cache_enabled, **get_insight_cache().stats()}
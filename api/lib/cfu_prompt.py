@@ -31,11 +31,10 @@ Valid Values Reference:
     print(f"Warning: Could not load valid_values.json: {e}")
 
 monthly_performance_prompt = f'''
-Task: Generate a SQLite query to get performance data for a specific division and period. Filter metrics based on user request.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Generate a SQLite query to get performance data for a specific division and period. Filter metrics based on user request.
 
 Rules:
 - ALWAYS translate user's "unit" to "div" in WHERE clause.
@@ -116,11 +115,10 @@ ORDER BY CASE l2
 '''
 
 trend_analysis_prompt = f'''
-Task: Generate a SQLite query to show trends for Revenue/COE/EBITDA/EBIT/EBT/NET INCOME over multiple periods.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Generate a SQLite query to show trends for Revenue/COE/EBITDA/EBIT/EBT/NET INCOME over multiple periods.
 
 Rules:
 - ALWAYS translate user's "unit" to "div" in WHERE clause.
@@ -169,11 +167,10 @@ ORDER BY period ASC, CASE l2
 '''
 
 comparison_trend_prompt = f'''
-Task: Generate a SQLite query to compare actual, target, and prev year values over time periods.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Generate a SQLite query to compare actual, target, and prev year values over time periods.
 
 Rules:
 - ALWAYS translate user's "unit" to "div" in WHERE clause.
@@ -215,11 +212,10 @@ ORDER BY period ASC;
 '''
 
 underperforming_products_prompt = f'''
-Task: Find products/categories with achievement < 100% for a specific division.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Find products/categories with achievement < 100% for a specific division.
 
 Rules:
 - ALWAYS translate user's "unit" to "div" in WHERE clause.
@@ -274,11 +270,10 @@ ORDER BY period ASC,
 '''
 
 revenue_success_analysis_prompt = f'''
-Task: Find revenue products with achievement > 100% and largest positive gaps for a division.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Find revenue products with achievement > 100% and largest positive gaps for a division.
 
 Rules:
 - ALWAYS translate user's "unit" to "div" in WHERE clause.
@@ -323,11 +318,10 @@ ORDER BY period ASC, l3, l4;
 '''
 
 revenue_failure_analysis_prompt = f'''
-Task: Find revenue products with achievement < 100% and largest negative gaps for a division.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Find revenue products with achievement < 100% and largest negative gaps for a division.
 
 Rules:
 - ALWAYS translate user's "unit" to "div" in WHERE clause.
@@ -372,11 +366,10 @@ ORDER BY period ASC, l3, l4;
 '''
 
 ebitda_success_analysis_prompt = f'''
-Task: Analyze why EBITDA achieved target by examining Revenue success and COE underperformance.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Analyze why EBITDA achieved target by examining Revenue success and COE underperformance.
 
 Rules:
 - ALWAYS translate user's "unit" to "div" in WHERE clause.
@@ -429,11 +422,10 @@ ORDER BY period ASC,
 '''
 
 ebitda_failure_analysis_prompt = f'''
-Task: Analyze why EBITDA failed to achieve target by examining Revenue shortfalls and COE overruns.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Analyze why EBITDA failed to achieve target by examining Revenue shortfalls and COE overruns.
 
 Rules:
 - ALWAYS translate user's "unit" to "div" in WHERE clause.
@@ -486,11 +478,10 @@ ORDER BY period ASC,
 '''
 
 netincome_success_analysis_prompt = f'''
-Task: Analyze Net Income success by examining EBITDA and below-EBITDA factors.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Analyze Net Income success by examining EBITDA and below-EBITDA factors.
 
 Rules:
 - ALWAYS translate user's "unit" to "div" in WHERE clause.
@@ -545,11 +536,10 @@ ORDER BY period ASC,
 '''
 
 netincome_failure_analysis_prompt = f'''
-Task: Analyze Net Income failure by examining EBITDA and below-EBITDA negative factors.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Analyze Net Income failure by examining EBITDA and below-EBITDA negative factors.
 
 Rules:
 - ALWAYS translate user's "unit" to "div" in WHERE clause.
@@ -604,11 +594,10 @@ ORDER BY period ASC,
 '''
 
 negative_growth_products_prompt = f'''
-Task: Find products with negative growth (MoM < 0%) for a specific division.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Find products with negative growth (MoM < 0%) for a specific division.
 
 Rules:
 - ALWAYS translate user's "unit" to "div" in WHERE clause.
@@ -664,11 +653,10 @@ ORDER BY period ASC,
 '''
 
 ebitda_negative_growth_prompt = f'''
-Task: Analyze why EBITDA has negative growth by checking Revenue and COE growth patterns.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Analyze why EBITDA has negative growth by checking Revenue and COE growth patterns.
 
 Rules:
 - ALWAYS translate user's "unit" to "div" in WHERE clause.
@@ -720,11 +708,10 @@ ORDER BY period ASC,
 '''
 
 external_revenue_prompt = f'''
-Task: Generate a SQLite query to calculate External Revenue performance (actual, achievement, growth) for a given division and period.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Generate a SQLite query to calculate External Revenue performance (actual, achievement, growth) for a given division and period.
 
 Rules:
 - ALWAYS translate user's "unit" to "div" in WHERE clause.
@@ -764,11 +751,10 @@ ORDER BY real_mtd DESC;
 '''
 
 external_revenue_trend_prompt = f'''
-Task: Show External Revenue trend comparison (actual, target, prev year) over multiple periods.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Show External Revenue trend comparison (actual, target, prev year) over multiple periods.
 
 Rules:
 - ALWAYS translate user's "unit" to "div" in WHERE clause.
@@ -799,10 +785,10 @@ ORDER BY period ASC;
 '''
 
 top_contributing_segments_prompt = f'''
-Task: Find the business segments/divisions that contribute the most to Revenue, COE, EBITDA, and Net Income for CFU WIB by analyzing actual values and their percentages against the total.
-
-CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 {valid_values_str}
+CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
+
+Task: Find the business segments/divisions that contribute the most to Revenue, COE, EBITDA, and Net Income for CFU WIB by analyzing actual values and their percentages against the total.
 
 Rules:
 - ALWAYS translate user's "unit" to "div" in WHERE clause.
@@ -878,10 +864,10 @@ ORDER BY actual_value DESC;
 '''
 
 revenue_proportion_analysis_prompt = f'''
-Task: Calculate the proportion of revenue for a specific unit against total CFU WIB revenue and analyze trends over time.
-
-CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 {valid_values_str}
+CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
+
+Task: Calculate the proportion of revenue for a specific unit against total CFU WIB revenue and analyze trends over time.
 Rules:
 - ALWAYS translate user's "unit" to "div" in WHERE clause.
 - Handle the following specific queries:
@@ -949,10 +935,10 @@ ORDER BY period ASC;
 '''
 
 cfu_wib_mom_revenue_decline_check_prompt = f'''
-Task: Check if there is a revenue decline (Month on Month / MOM) in CFU WIB by performing query to extract total actual and MoM revenue for CFU WIB and check units that contribute to the MoM decline.
-
-CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 {valid_values_str}
+CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
+
+Task: Check if there is a revenue decline (Month on Month / MOM) in CFU WIB by performing query to extract total actual and MoM revenue for CFU WIB and check units that contribute to the MoM decline.
 Rules:
 - Query total revenue for CFU WIB (aggregate of all divisions) for MOM analysis
 - Check for revenue decline: mom < 0 for REVENUE metric
@@ -1022,10 +1008,10 @@ ORDER BY mom_growth_pct ASC;
 '''
 
 mom_revenue_decrease_products_prompt = f'''
-Task: Find products that experienced revenue decline (Month on Month / MOM) across all units and calculate absolute revenue decrease (current revenue - previous month revenue), then display top 5-10 products with biggest absolute decrease in order.
-
-CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 {valid_values_str}
+CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
+
+Task: Find products that experienced revenue decline (Month on Month / MOM) across all units and calculate absolute revenue decrease (current revenue - previous month revenue), then display top 5-10 products with biggest absolute decrease in order.
 Rules:
 - Filter for products where: l2 = 'REVENUE' AND mom < 0 (declining revenue)
 - Calculate absolute revenue decrease: current revenue (real_mtd) - previous month revenue (prev_month)
@@ -1059,10 +1045,10 @@ LIMIT 10;
 '''
 
 mom_revenue_increase_products_prompt = f'''
-Task: Find products that experienced revenue increase (Month on Month / MOM) across all units and calculate absolute revenue increase (current revenue - previous month revenue), then display top 5-10 products with biggest absolute increase in order.
-
-CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 {valid_values_str}
+CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
+
+Task: Find products that experienced revenue increase (Month on Month / MOM) across all units and calculate absolute revenue increase (current revenue - previous month revenue), then display top 5-10 products with biggest absolute increase in order.
 Rules:
 - Filter for products where: l2 = 'REVENUE' AND mom > 0 (increasing revenue)
 - Calculate absolute revenue increase: current revenue (real_mtd) - previous month revenue (prev_month)
@@ -1096,10 +1082,10 @@ LIMIT 10;
 '''
 
 yoy_revenue_decrease_products_prompt = f'''
-Task: Find products that experienced revenue decline (Year on Year / YoY) across all units and calculate absolute revenue decrease (current revenue - previous year revenue same period), then display top 5-10 products with biggest absolute decrease in order.
-
-CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 {valid_values_str}
+CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
+
+Task: Find products that experienced revenue decline (Year on Year / YoY) across all units and calculate absolute revenue decrease (current revenue - previous year revenue same period), then display top 5-10 products with biggest absolute decrease in order.
 Rules:
 - Filter for products where: l2 = 'REVENUE' AND yoy < 0 (declining revenue YoY)
 - Calculate absolute revenue decrease: current revenue (real_mtd) - previous year revenue (prev_year)
@@ -1133,10 +1119,10 @@ LIMIT 10;
 '''
 
 yoy_revenue_increase_products_prompt = f'''
-Task: Find products that experienced revenue increase (Year on Year / YoY) across all units and calculate absolute revenue increase (current revenue - previous year revenue same period), then display top 5-10 products with biggest absolute increase in order.
-
-CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 {valid_values_str}
+CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
+
+Task: Find products that experienced revenue increase (Year on Year / YoY) across all units and calculate absolute revenue increase (current revenue - previous year revenue same period), then display top 5-10 products with biggest absolute increase in order.
 Rules:
 - Filter for products where: l2 = 'REVENUE' AND yoy > 0 (increasing revenue YoY)
 - Calculate absolute revenue increase: current revenue (real_mtd) - previous year revenue (prev_year)
@@ -1170,10 +1156,10 @@ LIMIT 10;
 '''
 
 unit_revenue_mom_decline_cause_prompt = f'''
-Task: Find the cause for MoM revenue decline for a specific unit by querying for revenue products with negative MoM growth and displaying top 5-10 products with the biggest differences (decrease) with their percentages.
-
-CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 {valid_values_str}
+CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
+
+Task: Find the cause for MoM revenue decline for a specific unit by querying for revenue products with negative MoM growth and displaying top 5-10 products with the biggest differences (decrease) with their percentages.
 Rules:
 - Filter for specific division (unit) provided by user
 - Filter for: l2 = 'REVENUE' AND mom < 0
@@ -1208,10 +1194,10 @@ LIMIT 10;
 '''
 
 top_revenue_contributing_products_prompt = f'''
-Task: Find products that contribute the most to revenue for CFU WIB by analyzing actual values and their percentages against the total, displaying top 10 products with highest revenue contribution.
-
-CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 {valid_values_str}
+CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
+
+Task: Find products that contribute the most to revenue for CFU WIB by analyzing actual values and their percentages against the total, displaying top 10 products with highest revenue contribution.
 Rules:
 - Focus on identifying top revenue contributing products across all divisions
 - Calculate revenue contribution: SUM of real_mtd for each product
@@ -1244,10 +1230,10 @@ LIMIT 10;
 '''
 
 revenue_underachievement_products_prompt = f'''
-Task: Find products that contribute most to revenue underachievement for CFU WIB by calculating the shortfall (target - actual revenue) and showing the achievement percentage, displaying top 10 products with largest shortfalls.
-
-CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 {valid_values_str}
+CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
+
+Task: Find products that contribute most to revenue underachievement for CFU WIB by calculating the shortfall (target - actual revenue) and showing the achievement percentage, displaying top 10 products with largest shortfalls.
 Rules:
 - Focus on identifying products with largest revenue shortfalls (difference between target and actual)
 - Calculate revenue shortfall: SUM(target_mtd) - SUM(real_mtd) for each product
@@ -1284,10 +1270,10 @@ LIMIT 10;
 '''
 
 revenue_growth_comparison_prompt = f'''
-Task: Show Month-over-Month (MoM) and Year-over-Year (YoY) revenue growth comparison for CFU WIB and its individual units, including identifying products that contribute to growth or decline.
-
-CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 {valid_values_str}
+CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
+
+Task: Show Month-over-Month (MoM) and Year-over-Year (YoY) revenue growth comparison for CFU WIB and its individual units, including identifying products that contribute to growth or decline.
 Rules:
 - Show both MoM and YoY revenue growth for total CFU WIB and individual units
 - Calculate MoM growth: (current - previous_month) / previous_month * 100
@@ -1366,10 +1352,10 @@ LIMIT 10;
 '''
 
 revenue_surge_products_year_prompt = f'''
-Task: Find products that experienced revenue surge (Month on Month / MOM) in a specific year compared to their previous months' average, identifying products with MOM > 10% above the 3-month average.
-
-CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 {valid_values_str}
+CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
+
+Task: Find products that experienced revenue surge (Month on Month / MOM) in a specific year compared to their previous months' average, identifying products with MOM > 10% above the 3-month average.
 Rules:
 - Identify revenue surges by comparing current month MOM to 3-month historical average
 - Calculate 3-month moving average of MOM for each product to establish baseline
@@ -1434,11 +1420,10 @@ FROM surge_products
 ORDER BY (current_mom - avg_prev_3_months_mom) DESC; -- DESC to get biggest surges
 '''
 ebitda_proportion_analysis_prompt = f'''
-Task: Calculate the proportion of EBITDA for a specific unit against total CFU WIB EBITDA.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Calculate the proportion of EBITDA for a specific unit against total CFU WIB EBITDA.
 
 Rules:
 - ALWAYS translate user's "unit" to "div" in WHERE clause.
@@ -1465,11 +1450,10 @@ GROUP BY period, div;
 '''
 
 ebitda_proportion_trend_prompt = f'''
-Task: Analyze the trend of EBITDA proportion for a specific unit against total CFU WIB EBITDA over time.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Analyze the trend of EBITDA proportion for a specific unit against total CFU WIB EBITDA over time.
 
 Rules:
 - ALWAYS translate user's "unit" to "div" in WHERE clause.
@@ -1522,11 +1506,10 @@ ORDER BY period ASC;
 '''
 
 ebitda_mom_decline_check_prompt = f'''
-Task: Check if there is a decline in EBITDA (Month on Month / MOM) for CFU WIB and identify contributing units.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Check if there is a decline in EBITDA (Month on Month / MOM) for CFU WIB and identify contributing units.
 
 Rules:
 - ALWAYS translate user's "unit" to "div" in WHERE clause.
@@ -1553,11 +1536,10 @@ ORDER BY mom ASC; -- Order by lowest MoM (biggest decline) first
 '''
 
 ebitda_mom_change_cause_prompt = f'''
-Task: Analyze the cause of EBITDA Month on Month (MoM) change (Decline or Increase) by checking Revenue and COE.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Analyze the cause of EBITDA Month on Month (MoM) change (Decline or Increase) by checking Revenue and COE.
 
 Rules:
 - ALWAYS translate user's "unit" to "div" in WHERE clause.
@@ -1587,11 +1569,10 @@ ORDER BY div, l2;
 '''
 
 ebitda_proportion_analysis_prompt = f'''
-Task: Generate a SQLite query to calculate the proportion (percentage) of a specific unit's EBITDA against the total CFU WIB EBITDA for the latest period.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Generate a SQLite query to calculate the proportion (percentage) of a specific unit's EBITDA against the total CFU WIB EBITDA for the latest period.
 
 Rules:
 - ALWAYS translate user's "unit" to "div" in WHERE clause.
@@ -1639,11 +1620,10 @@ GROUP BY div, period, l2;
 '''
 
 ebitda_proportion_trend_yearly_prompt = f'''
-Task: Generate a SQLite query to show the trend of a specific unit's EBITDA proportion (percentage) against total CFU WIB EBITDA over the last 3 years (yearly basis).
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Generate a SQLite query to show the trend of a specific unit's EBITDA proportion (percentage) against total CFU WIB EBITDA over the last 3 years (yearly basis).
 
 Rules:
 - ALWAYS translate user's "unit" to "div" in WHERE clause.
@@ -1705,11 +1685,10 @@ ORDER BY lp.year ASC;
 '''
 
 ebitda_proportion_trend_monthly_prompt = f'''
-Task: Generate a SQLite query to show the trend of a specific unit's EBITDA proportion (percentage) against total CFU WIB EBITDA within the current year (monthly basis, from January to latest available period).
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Generate a SQLite query to show the trend of a specific unit's EBITDA proportion (percentage) against total CFU WIB EBITDA within the current year (monthly basis, from January to latest available period).
 
 Rules:
 - ALWAYS translate user's "unit" to "div" in WHERE clause.
@@ -1757,11 +1736,10 @@ ORDER BY t1.period ASC;
 '''
 
 cfu_wib_ebitda_mom_decline_check_prompt = f'''
-Task: Generate a SQLite query to check if there is a Month-over-Month (MoM) decline in total CFU WIB EBITDA for the latest period, and identify which units contributed to this decline.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Generate a SQLite query to check if there is a Month-over-Month (MoM) decline in total CFU WIB EBITDA for the latest period, and identify which units contributed to this decline.
 
 Rules:
 - COLUMN NAMES (CRITICAL):
@@ -1817,11 +1795,10 @@ ORDER BY div;
 '''
 
 ebitda_mom_decline_cause_prompt = f'''
-Task: Generate a SQLite query to identify the cause of EBITDA Month-over-Month (MoM) decline by analyzing Revenue and COE changes for each unit.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Generate a SQLite query to identify the cause of EBITDA Month-over-Month (MoM) decline by analyzing Revenue and COE changes for each unit.
 
 Rules:
 - COLUMN NAMES (CRITICAL):
@@ -1868,11 +1845,10 @@ ORDER BY div, (CASE WHEN l2 = 'COE' THEN -1 ELSE 1 END * (SUM(real_mtd) - SUM(pr
 '''
 
 ebitda_mom_increase_cause_prompt = f'''
-Task: Generate a SQLite query to identify the cause of EBITDA Month-over-Month (MoM) increase by analyzing Revenue and COE changes for each unit.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Generate a SQLite query to identify the cause of EBITDA Month-over-Month (MoM) increase by analyzing Revenue and COE changes for each unit.
 
 Rules:
 - COLUMN NAMES (CRITICAL):
@@ -1918,11 +1894,10 @@ ORDER BY div, (CASE WHEN l2 = 'COE' THEN -1 ELSE 1 END * (SUM(real_mtd) - SUM(pr
 '''
 
 ebitda_yoy_decline_cause_prompt = f'''
-Task: Generate a SQLite query to identify the cause of EBITDA Year-over-Year (YoY) decline by analyzing Revenue and COE changes for each unit.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Generate a SQLite query to identify the cause of EBITDA Year-over-Year (YoY) decline by analyzing Revenue and COE changes for each unit.
 
 Rules:
 - COLUMN NAMES (CRITICAL):
@@ -1969,11 +1944,10 @@ ORDER BY div, (CASE WHEN l2 = 'COE' THEN -1 ELSE 1 END * (SUM(real_mtd) - SUM(pr
 '''
 
 ebitda_yoy_increase_cause_prompt = f'''
-Task: Generate a SQLite query to identify the cause of EBITDA Year-over-Year (YoY) increase by analyzing Revenue and COE changes for each unit.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Generate a SQLite query to identify the cause of EBITDA Year-over-Year (YoY) increase by analyzing Revenue and COE changes for each unit.
 
 Rules:
 - COLUMN NAMES (CRITICAL):
@@ -2021,11 +1995,10 @@ ORDER BY div, (CASE WHEN l2 = 'COE' THEN -1 ELSE 1 END * (SUM(real_mtd) - SUM(pr
 
 
 unit_ebitda_mom_decline_cause_prompt = f'''
-Task: Generate a SQLite query to identify the cause of EBITDA Month-over-Month (MoM) decline for a specific unit by analyzing Revenue and COE changes.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Generate a SQLite query to identify the cause of EBITDA Month-over-Month (MoM) decline for a specific unit by analyzing Revenue and COE changes.
 
 Rules:
 - ALWAYS translate user's "unit" to "div" in WHERE clause.
@@ -2073,11 +2046,10 @@ ORDER BY (CASE WHEN l2 = 'COE' THEN -1 ELSE 1 END * (SUM(real_mtd) - SUM(prev_mo
 '''
 
 unit_ebitda_mom_increase_cause_prompt = f'''
-Task: Generate a SQLite query to identify the cause of EBITDA Month-over-Month (MoM) increase for a specific unit by analyzing Revenue and COE changes.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Generate a SQLite query to identify the cause of EBITDA Month-over-Month (MoM) increase for a specific unit by analyzing Revenue and COE changes.
 
 Rules:
 - ALWAYS translate user's "unit" to "div" in WHERE clause.
@@ -2125,11 +2097,10 @@ ORDER BY (CASE WHEN l2 = 'COE' THEN -1 ELSE 1 END * (SUM(real_mtd) - SUM(prev_mo
 '''
 
 unit_ebitda_margin_decline_cause_prompt = f'''
-Task: Generate a comprehensive SQLite query to analyze EBITDA margin decline for a specific unit in a specific period, showing both overall margin comparison and detailed L3 breakdown of causes in a single result.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Generate a comprehensive SQLite query to analyze EBITDA margin decline for a specific unit in a specific period, showing both overall margin comparison and detailed L3 breakdown of causes in a single result.
 
 Rules:
 - ALWAYS translate user's "unit" to "div" in WHERE clause.
@@ -2242,11 +2213,10 @@ ORDER BY section ASC, (CASE WHEN metric_type = 'COE' THEN -1 ELSE 1 END * absolu
 '''
 
 ebitda_improvement_recommendations_prompt = f'''
-Task: Generate a SQLite query to provide recommendations for improving or maintaining EBITDA by identifying underperforming revenue products and over-achieving COE categories.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Generate a SQLite query to provide recommendations for improving or maintaining EBITDA by identifying underperforming revenue products and over-achieving COE categories.
 
 Rules:
 - COLUMN NAMES (CRITICAL):
@@ -2324,11 +2294,10 @@ LIMIT 20;
 '''
 
 ebitda_margin_trend_3months_prompt = f'''
-Task: Generate a SQLite query to show the trend of EBITDA Margin over the last 3 months for CFU WIB or specific units.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Generate a SQLite query to show the trend of EBITDA Margin over the last 3 months for CFU WIB or specific units.
 
 Rules:
 - COLUMN NAMES (CRITICAL):
@@ -2375,11 +2344,10 @@ ORDER BY period ASC;
 '''
 
 gross_profit_margin_analysis_prompt = f'''
-Task: Generate a SQLite query to calculate Gross Profit Margin for CFU WIB by determining direct costs and computing (Revenue - Direct Cost) / Revenue * 100%.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Generate a SQLite query to calculate Gross Profit Margin for CFU WIB by determining direct costs and computing (Revenue - Direct Cost) / Revenue * 100%.
 
 Rules:
 - COLUMN NAMES (CRITICAL):
@@ -2447,11 +2415,10 @@ JOIN cost_categories c ON r.period = c.period;
 '''
 
 net_income_proportion_analysis_prompt = f'''
-Task: Generate a SQLite query to calculate the proportion (percentage) of a specific unit's NET INCOME against the total CFU WIB NET INCOME for the latest period.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Generate a SQLite query to calculate the proportion (percentage) of a specific unit's NET INCOME against the total CFU WIB NET INCOME for the latest period.
 
 Rules:
 - ALWAYS translate user's "unit" to "div" in WHERE clause.
@@ -2501,11 +2468,10 @@ GROUP BY div, period, l2;
 '''
 
 net_income_proportion_trend_yearly_prompt = f'''
-Task: Generate a SQLite query to show the trend of a specific unit's NET INCOME proportion (percentage) against total CFU WIB NET INCOME over the last 3 years (yearly basis).
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Generate a SQLite query to show the trend of a specific unit's NET INCOME proportion (percentage) against total CFU WIB NET INCOME over the last 3 years (yearly basis).
 
 Rules:
 - ALWAYS translate user's "unit" to "div" in WHERE clause.
@@ -2567,11 +2533,10 @@ ORDER BY lp.year ASC;
 '''
 
 net_income_proportion_trend_monthly_prompt = f'''
-Task: Generate a SQLite query to show the trend of a specific unit's NET INCOME proportion (percentage) against total CFU WIB NET INCOME within the current year (monthly basis, from January to latest available period).
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Generate a SQLite query to show the trend of a specific unit's NET INCOME proportion (percentage) against total CFU WIB NET INCOME within the current year (monthly basis, from January to latest available period).
 
 Rules:
 - ALWAYS translate user's "unit" to "div" in WHERE clause.
@@ -2621,11 +2586,10 @@ ORDER BY t1.period ASC;
 '''
 
 cfu_wib_net_income_mom_decline_check_prompt = f'''
-Task: Generate a SQLite query to check if there is a Month-over-Month (MoM) decline in total CFU WIB NET INCOME for the latest period, and identify which units contributed to this decline.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Generate a SQLite query to check if there is a Month-over-Month (MoM) decline in total CFU WIB NET INCOME for the latest period, and identify which units contributed to this decline.
 
 Rules:
 - COLUMN NAMES (CRITICAL):
@@ -2683,11 +2647,10 @@ ORDER BY div;
 '''
 
 net_income_mom_decline_cause_prompt = f'''
-Task: Generate a SQLite query to identify the cause of NET INCOME Month-over-Month (MoM) decline by analyzing Revenue and COE changes for each unit.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Generate a SQLite query to identify the cause of NET INCOME Month-over-Month (MoM) decline by analyzing Revenue and COE changes for each unit.
 
 Rules:
 - COLUMN NAMES (CRITICAL):
@@ -2734,11 +2697,10 @@ ORDER BY div, (CASE WHEN l2 = 'COE' THEN -1 ELSE 1 END * (SUM(real_mtd) - SUM(pr
 '''
 
 net_income_mom_increase_cause_prompt = f'''
-Task: Generate a SQLite query to identify the cause of NET INCOME Month-over-Month (MoM) increase by analyzing Revenue and COE changes for each unit.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Generate a SQLite query to identify the cause of NET INCOME Month-over-Month (MoM) increase by analyzing Revenue and COE changes for each unit.
 
 Rules:
 - COLUMN NAMES (CRITICAL):
@@ -2785,11 +2747,10 @@ ORDER BY div, (CASE WHEN l2 = 'COE' THEN -1 ELSE 1 END * (SUM(real_mtd) - SUM(pr
 '''
 
 net_income_yoy_decline_cause_prompt = f'''
-Task: Generate a SQLite query to identify the cause of NET INCOME Year-over-Year (YoY) decline by analyzing Revenue and COE changes for each unit.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Generate a SQLite query to identify the cause of NET INCOME Year-over-Year (YoY) decline by analyzing Revenue and COE changes for each unit.
 
 Rules:
 - COLUMN NAMES (CRITICAL):
@@ -2837,11 +2798,10 @@ ORDER BY div, (CASE WHEN l2 = 'COE' THEN -1 ELSE 1 END * (SUM(real_mtd) - SUM(pr
 '''
 
 net_income_yoy_increase_cause_prompt = f'''
-Task: Generate a SQLite query to identify the cause of NET INCOME Year-over-Year (YoY) increase by analyzing Revenue and COE changes for each unit.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Generate a SQLite query to identify the cause of NET INCOME Year-over-Year (YoY) increase by analyzing Revenue and COE changes for each unit.
 
 Rules:
 - COLUMN NAMES (CRITICAL):
@@ -2890,11 +2850,10 @@ ORDER BY div, (CASE WHEN l2 = 'COE' THEN -1 ELSE 1 END * (SUM(real_mtd) - SUM(pr
 '''
 
 unit_net_income_mom_decline_cause_prompt = f'''
-Task: Generate a SQLite query to identify the cause of NET INCOME Month-over-Month (MoM) decline for a specific unit by analyzing Revenue and COE changes at L3 level.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Generate a SQLite query to identify the cause of NET INCOME Month-over-Month (MoM) decline for a specific unit by analyzing Revenue and COE changes at L3 level.
 
 Rules:
 - COLUMN NAMES (CRITICAL):
@@ -2940,11 +2899,10 @@ ORDER BY (CASE WHEN l2 = 'COE' THEN -1 ELSE 1 END * (SUM(real_mtd) - SUM(prev_mo
 '''
 
 unit_net_income_mom_increase_cause_prompt = f'''
-Task: Generate a SQLite query to identify the cause of NET INCOME Month-over-Month (MoM) increase for a specific unit by analyzing Revenue and COE changes at L3 level.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Generate a SQLite query to identify the cause of NET INCOME Month-over-Month (MoM) increase for a specific unit by analyzing Revenue and COE changes at L3 level.
 
 Rules:
 - COLUMN NAMES (CRITICAL):
@@ -2990,11 +2948,10 @@ ORDER BY (CASE WHEN l2 = 'COE' THEN -1 ELSE 1 END * (SUM(real_mtd) - SUM(prev_mo
 '''
 
 unit_net_income_margin_decline_cause_prompt = f'''
-Task: Generate a comprehensive SQLite query to analyze NET INCOME margin decline for a specific unit in a specific period, showing both overall margin comparison and detailed L3 breakdown of causes in a single result.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Generate a comprehensive SQLite query to analyze NET INCOME margin decline for a specific unit in a specific period, showing both overall margin comparison and detailed L3 breakdown of causes in a single result.
 
 Rules:
 - ALWAYS translate user's "unit" to "div" in WHERE clause.
@@ -3107,11 +3064,10 @@ ORDER BY section ASC, (CASE WHEN metric_type = 'COE' THEN -1 ELSE 1 END * absolu
 '''
 
 net_income_improvement_recommendations_prompt = f'''
-Task: Generate a SQLite query to provide recommendations for improving or maintaining NET INCOME by identifying underperforming revenue products and high-achieving COE items that need optimization.
-
+{valid_values_str}
 CRITICAL USER MAPPING: When user says "unit", they mean "div" (division) in database!
 
-{valid_values_str}
+Task: Generate a SQLite query to provide recommendations for improving or maintaining NET INCOME by identifying underperforming revenue products and high-achieving COE items that need optimization.
 
 Rules:
 - COLUMN NAMES (CRITICAL):
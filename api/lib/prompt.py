@@ -10,13 +10,7 @@ CRITICAL RULES FOR PERCENTAGE COLUMNS:
 - Example: PRINTF('%.2f%%', mom)
 - This ensures percentages display as "88.11%" instead of 88.11
 
-Output: Provide only one SQL query without additional commentary, markdown formatting, or code fences.
-
-User's query:
-{user_query}
-
-Instruction prompt:
-{instruction_prompt}
+Output: Provide only one SQL query, terminated by a semicolon, without additional commentary, markdown formatting, or code fences.
 
 Table name:
 {table_name}
@@ -26,6 +20,12 @@ Columns available in the table:
 
 First row of the table (for reference):
 {first_row}
+
+Instruction prompt:
+{instruction_prompt}
+
+User's query:
+{user_query}
 '''
 
 select_table_and_prompt_prompt = '''
@@ -47,10 +47,10 @@ User's question:
 '''
 
 generate_insight_prompt = '''
-You are an expert Insight Generator, your conversational language is Bahasa Indonesia. You're tasked to answer the user's question based on the SQL-extracted data from the table "{table_name}".
+You are an expert Insight Generator, your conversational language is Bahasa Indonesia. You're tasked to answer the user's question based on the SQL-extracted data from the table given below.
 
 **MANDATORY FORMATTING RULES:**
-- You MUST format all numbers according to this instruction: **{number_format_instruction}**
+- You MUST format all numbers according to the number format instruction given below.
 - Never Use 'Triliun', always use 'Miliar'. 1000 Miliar not 1 Triliun.
 - Thousand separator: comma "," (e.g., 12,345).
 - Percentages: ALWAYS show two decimals (e.g., 88.11%, 156.48%, -55.07%). NEVER round to whole numbers (e.g., NOT 88%, NOT 156%, NOT -55%).
@@ -62,20 +62,26 @@ You are an expert Insight Generator, your conversational language is Bahasa Indo
 - Answer independently. Ignore any previous conversation unless explicitly referenced.
 - **CRITICAL:** If the data contains YTD (Year-to-Date) columns (e.g., `actual_ytd`, `ach_ytd`), you MUST include a summary of YTD performance in your insight, even if the user only asked for a specific month. Explain how the monthly performance contributes to the yearly performance.
 
-User Question:
-{user_query}
+Table name:
+{table_name}
 
 Additional Prompt for Context:
 {instruction_prompt}
 
+Number format instruction:
+**{number_format_instruction}**
+
 Data extracted using SQL (do not enumerate all rows, use them only for reasoning):
 {table_data}
+
+User Question:
+{user_query}
 '''
 
 sql_fix_prompt = '''
 You are an expert SQL correction tool. You're tasked to fix an SQL expression given an SQL and its error message. Your SQL fix must be different to the given SQL Expression and must be a valid SQLLite compatible query. Only use the columns provided in the columns list.
 
-Output: Provide only one SQL query without additional commentary, markdown formatting, or code fences.
+Output: Provide only one SQL query, terminated by a semicolon, without additional commentary, markdown formatting, or code fences.
 
 Table Columns:
 {columns_list}
@@ -93,9 +99,7 @@ agent_prompt = '''
 You are a master controller agent deciding the next step in a multi-step workflow. Your response MUST be a single, valid JSON object without any other text.
 
 **YOUR CONTEXT:**
-- User's current query: {user_query}
-- Recent conversation history: {chat_history}
-- Last action's result (data summary): {tools_answer}
+The user's current query, the recent conversation history and the last action's result (`tools_answer`, a data summary) are given at the end, under START TASK.
 
 **VALID ENTITIES REFERENCE (Use this to identify entities in follow-up questions):**
 - DIV: ['DMT', 'DWS', 'TELIN', 'TIF', 'TSAT'] (Note: 'CFU WIB' is the aggregate of these 5. 'WINS' is NOT supported.)
@@ -218,7 +222,7 @@ Analyze the context and decide ONE of two actions: "Continue" or "Final Answer".
     - Place this text directly into the `final_answer` key.
     
     **OUTPUT JSON for this case:**
-    {{"action": "Final Answer", "action_input": "", "final_answer": "{tools_answer}"}}
+    {{"action": "Final Answer", "action_input": "", "final_answer": "<the tools_answer text>"}}
 
 **START TASK**
 - User query: {user_query}
@@ -280,9 +284,7 @@ User Query: "{user_query}"
 greeting_and_general_prompt = '''
 You are a friendly and helpful assistant for the CFU WIB Insight Bot. Your name is 'WIBI'. Your conversational language MUST BE Bahasa Indonesia.
 
-The current time is {current_time} WIB.
-
-Use the current time to determine the correct greeting in Bahasa Indonesia:
+Use the current time (given below) to determine the correct greeting in Bahasa Indonesia:
 - If time is between 00:00 and 10:59 → "Selamat Pagi"
 - If time is between 11:00 and 14:59 → "Selamat Siang"
 - If time is between 15:00 and 17:59 → "Selamat Sore"
@@ -292,6 +294,45 @@ When a user greets you or asks a non-data-related question (such as "who are you
 - Greet them back in a short sentence, e.g "Halo, ada yang bisa saya bantu?", "Siang, ada yang bisa saya bantu?".
 - Keep the response concise, friendly, and strictly in Bahasa Indonesia.
 
+The current time is {current_time} WIB.
+
 User's message:
 {user_query}
-'''
\ No newline at end of file
+'''
+
+planning_prompt = '''
+You are the PLANNER of the CFU WIB Insight Bot. In ONE step you must (1) rewrite the user's query into a complete, self-contained question, (2) decide which output components the user wants, and (3) select the most suitable table and prompt.
+Your response MUST be a single, valid JSON object without any other text.
+
+**STEP 1 - CONTEXTUALIZE ("completed_query"):**
+- If the query is a follow-up (e.g., "kalau unit X?", "ebitdanya gimana?", "angka lengkap"), merge it with the chat history: keep the previous question type, metric and period, and replace ONLY the entity the user changed.
+- If the user does NOT specify a period and there is none in the chat history, DO NOT add one.
+- If the query is already self-contained, return it unchanged.
+- Valid DIV values: ['DMT', 'DWS', 'TELIN', 'TIF', 'TSAT'] ('CFU WIB' is the aggregate of these 5). L2 Key Metrics: ['REVENUE', 'COE', 'EBITDA', 'EBIT', 'EBT', 'NET INCOME'].
+
+**STEP 2 - OUTPUT COMPONENTS (booleans):**
+- "wants_simplified_numbers": false if the user says "angka lengkap", "full number", "jangan disingkat"; otherwise true.
+- "grafiknya saja", "only the chart": wants_chart true, others false.
+- "tabelnya saja", "tabel aja", "datanya doang", "only the table": wants_table true, wants_text false, wants_chart false.
+- "mengapa", "jelaskan", "rekomendasi", "strategi": wants_text true, wants_table true, wants_chart false unless a trend is mentioned.
+- "tren", "bandingkan" without "saja/only": all three true.
+- "Berapa" or performance data: wants_table true.
+- Otherwise: wants_text true, wants_table true, wants_chart false.
+
+**STEP 3 - TABLE AND PROMPT:**
+- If there is the exact question in a prompt description, select that prompt.
+- "table_name" must be one of the table names and "prompt" must be one of the prompt names (without the description).
+
+The possible tables and descriptions are:
+{tables_list}.
+
+The possible prompt and its descriptions are:
+{prompt_list}.
+
+**OUTPUT JSON:**
+{{"completed_query": "...", "wants_text": true, "wants_chart": false, "wants_table": true, "wants_simplified_numbers": true, "table_name": "...", "prompt": "..."}}
+
+**START TASK**
+- Chat history: {chat_history}
+- User query: {user_query}
+'''
@@ -0,0 +1,168 @@
+# app/llm_breaker.py
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+from fastapi import HTTPException
+from loguru import logger
+
+from config import settings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class LLMUnavailableError(HTTPException):
+    """Raised without calling the endpoint while the LLM circuit is open."""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = max(0.0, retry_after)
+        super().__init__(
+            status_code=503,
+            detail=f"LLM service is unavailable, retry after {self.retry_after:.0f}s.",
+            headers={"Retry-After": str(int(self.retry_after) + 1)},
+        )
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker over the outcomes of LLM HTTP attempts.
+    Failures are transport errors, timeouts, 429 and 5xx responses; a call slower than
+    slow_call_seconds counts as slow even when it succeeds.
+    """
+
+    def __init__(self, window_seconds: float, min_calls: int, failure_rate: float, slow_call_seconds: float,
+                 slow_call_rate: float, open_seconds: float, half_open_calls: int):
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.trials_in_flight = 0
+        self.trial_successes = 0
+        self.times_opened = 0
+        self.rejected = 0
+        self._outcomes: Deque[Tuple[float, bool, bool]] = deque()
+
+    def _prune(self, now: float) -> None:
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            self._outcomes.popleft()
+
+    def _transition(self, state: str, reason: str = "") -> None:
+        if state == self.state:
+            return
+        logger.warning(f"[LLMBreaker] {self.state} -> {state}{f' ({reason})' if reason else ''}")
+        self.state = state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+        if state in (HALF_OPEN, CLOSED):
+            self.trials_in_flight = 0
+            self.trial_successes = 0
+        if state == CLOSED:
+            self._outcomes.clear()
+
+    def retry_after(self) -> float:
+        return self.opened_at + self.open_seconds - time.monotonic()
+
+    def check(self) -> None:
+        """Fail fast while open; moves to half-open once the open period is over."""
+        if self.state == OPEN:
+            if self.retry_after() > 0:
+                self.rejected += 1
+                raise LLMUnavailableError(self.retry_after())
+            self._transition(HALF_OPEN, "open period elapsed")
+
+    def before_call(self) -> None:
+        """Admit one HTTP attempt, taking a trial permit when half-open."""
+        self.check()
+        if self.state == HALF_OPEN:
+            if self.trials_in_flight >= self.half_open_calls:
+                self.rejected += 1
+                raise LLMUnavailableError(1.0)
+            self.trials_in_flight += 1
+
+    def abandon(self) -> None:
+        """The attempt was cancelled before it had an outcome."""
+        if self.state == HALF_OPEN and self.trials_in_flight:
+            self.trials_in_flight -= 1
+
+    def record(self, success: bool, latency: Optional[float] = None) -> None:
+        now = time.monotonic()
+        slow = latency is not None and latency >= self.slow_call_seconds
+
+        if self.state == HALF_OPEN:
+            self.trials_in_flight = max(0, self.trials_in_flight - 1)
+            if not success or slow:
+                self._transition(OPEN, "trial call failed" if not success else "trial call slow")
+            else:
+                self.trial_successes += 1
+                if self.trial_successes >= self.half_open_calls:
+                    self._transition(CLOSED, "trial calls succeeded")
+            return
+        if self.state == OPEN:
+            return
+
+        self._outcomes.append((now, not success, slow))
+        self._prune(now)
+        total = len(self._outcomes)
+        if total < self.min_calls:
+            return
+        failures = sum(1 for _, failed, _ in self._outcomes if failed)
+        slow_calls = sum(1 for _, _, is_slow in self._outcomes if is_slow)
+        if failures / total >= self.failure_rate:
+            self._transition(OPEN, f"error rate {failures}/{total}")
+        elif slow_calls / total >= self.slow_call_rate:
+            self._transition(OPEN, f"slow call rate {slow_calls}/{total}")
+
+    def stats(self) -> Dict[str, Any]:
+        self._prune(time.monotonic())
+        total = len(self._outcomes)
+        return {
+            "state": self.state,
+            "calls_in_window": total,
+            "failure_rate": round(sum(1 for _, f, _ in self._outcomes if f) / total, 4) if total else 0.0,
+            "slow_call_rate": round(sum(1 for *_, s in self._outcomes if s) / total, 4) if total else 0.0,
+            "retry_after": round(max(0.0, self.retry_after()), 1) if self.state == OPEN else 0.0,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
+
+
+class _DisabledBreaker(CircuitBreaker):
+    def check(self) -> None:
+        pass
+
+    def before_call(self) -> None:
+        pass
+
+    def record(self, success: bool, latency: Optional[float] = None) -> None:
+        pass
+
+
+_breaker: Optional[CircuitBreaker] = None
+
+
+def get_llm_breaker() -> CircuitBreaker:
+    global _breaker
+    if _breaker is None:
+        breaker_cls = CircuitBreaker if settings.llm_breaker_enabled else _DisabledBreaker
+        _breaker = breaker_cls(
+            window_seconds=settings.llm_breaker_window_seconds,
+            min_calls=settings.llm_breaker_min_calls,
+            failure_rate=settings.llm_breaker_failure_rate,
+            slow_call_seconds=settings.llm_breaker_slow_call_seconds,
+            slow_call_rate=settings.llm_breaker_slow_call_rate,
+            open_seconds=settings.llm_breaker_open_seconds,
+            half_open_calls=settings.llm_breaker_half_open_calls,
+        )
+    return _breaker
+
+
+def get_llm_breaker_stats() -> Dict[str, Any]:
+    return get_llm_breaker().stats()
@@ -0,0 +1,204 @@
+# app/llm_budget.py
+import asyncio
+import json
+import math
+import os
+import tempfile
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+from loguru import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves of concurrent workers are not serialized
+    fcntl = None
+
+from config import settings
+
+BudgetKey = Tuple[str, str]
+
+
+class TokenBudgets:
+    """
+    Learned max_tokens per (stage, prompt_name): a high percentile of the recent completion
+    lengths plus headroom, never above the configured budget of the stage. Keys with fewer
+    than min_samples completions keep the configured budget. Completion lengths observed since
+    the last save are kept in unsaved, so a save adds only those to the shared file.
+    """
+
+    def __init__(self, window: int, min_samples: int, percentile: float, headroom: float, min_tokens: int):
+        self.window = window
+        self.min_samples = min_samples
+        self.percentile = percentile
+        self.headroom = headroom
+        self.min_tokens = min_tokens
+        self.samples: Dict[BudgetKey, Deque[int]] = {}
+        self.learned: Dict[BudgetKey, int] = {}
+        self.truncations: Dict[BudgetKey, int] = {}
+        self.retries: Dict[BudgetKey, int] = {}
+        self.unsaved: Dict[BudgetKey, List[int]] = {}
+
+    def budget(self, stage: str, prompt_name: str, ceiling: int) -> int:
+        learned = self.learned.get((stage, prompt_name))
+        return ceiling if learned is None else min(ceiling, learned)
+
+    def observe(self, stage: str, prompt_name: str, completion_tokens: int) -> None:
+        key = (stage, prompt_name)
+        samples = self.samples.setdefault(key, deque(maxlen=self.window))
+        samples.append(completion_tokens)
+        self.unsaved.setdefault(key, []).append(completion_tokens)
+        self._learn(key)
+
+    def _learn(self, key: BudgetKey) -> None:
+        samples = self.samples[key]
+        if len(samples) < self.min_samples:
+            self.learned.pop(key, None)
+            return
+        ordered = sorted(samples)
+        value = ordered[min(len(ordered) - 1, math.ceil(self.percentile * len(ordered)) - 1)]
+        self.learned[key] = max(self.min_tokens, math.ceil(value * (1 + self.headroom)))
+
+    def note_truncation(self, stage: str, prompt_name: str, retried: bool) -> None:
+        key = (stage, prompt_name)
+        self.truncations[key] = self.truncations.get(key, 0) + 1
+        if retried:
+            self.retries[key] = self.retries.get(key, 0) + 1
+
+    def load(self, path: str) -> None:
+        samples = read_budget_file(path)
+        for key, completion_tokens in samples.items():
+            self.samples[key] = deque(completion_tokens, maxlen=self.window)
+            self._learn(key)
+        if samples:
+            logger.info(f"[LLMBudget] loaded completion lengths of {len(samples)} stage/prompt pairs from {path}")
+
+    def take_unsaved(self) -> Dict[BudgetKey, List[int]]:
+        unsaved, self.unsaved = self.unsaved, {}
+        return unsaved
+
+    def save(self, path: str) -> None:
+        merge_budget_file(path, self.take_unsaved(), self.window)
+
+    def stats(self) -> Dict[str, Any]:
+        keys = sorted(set(self.samples) | set(self.truncations))
+        return {
+            f"{stage}/{prompt_name}": {
+                "samples": len(self.samples.get((stage, prompt_name), ())),
+                "max_tokens": self.learned.get((stage, prompt_name)),
+                "truncations": self.truncations.get((stage, prompt_name), 0),
+                "truncation_retries": self.retries.get((stage, prompt_name), 0),
+            }
+            for stage, prompt_name in keys
+        }
+
+
+def read_budget_file(path: str) -> Dict[BudgetKey, List[int]]:
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"[LLMBudget] could not load budgets from {path}: {e}")
+        return {}
+    return {(entry["stage"], entry["prompt_name"]): entry["completion_tokens"] for entry in data.get("samples", [])}
+
+
+def write_budget_file(path: str, data: Dict[str, Any]) -> None:
+    """Write the file atomically, through a temporary file of its own."""
+    tmp_path = None
+    try:
+        with tempfile.NamedTemporaryFile("w", dir=os.path.dirname(path) or ".", prefix=f"{os.path.basename(path)}.",
+                                         suffix=".tmp", delete=False) as f:
+            tmp_path = f.name
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def merge_budget_file(path: str, new_samples: Dict[BudgetKey, List[int]], window: int) -> None:
+    """
+    Add completion lengths to the ones in the file, keeping the last window per stage and prompt.
+    All workers save to the same file, each with what it observed since its last save, so the
+    read-merge-write runs under an exclusive lock on path + ".lock".
+    """
+    if not new_samples:
+        return
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path + ".lock", "w") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            samples = read_budget_file(path)
+            for key, completion_tokens in new_samples.items():
+                samples[key] = (samples.get(key, []) + completion_tokens)[-window:]
+            write_budget_file(path, {"samples": [
+                {"stage": stage, "prompt_name": prompt_name, "completion_tokens": tokens}
+                for (stage, prompt_name), tokens in samples.items()
+            ]})
+    except OSError as e:
+        logger.warning(f"[LLMBudget] could not save budgets to {path}: {e}")
+
+
+_budgets: Optional[TokenBudgets] = None
+# Time of the last save; None until load_token_budgets() ran, so scripts do not write the file
+_last_save: Optional[float] = None
+# Saves running in worker threads; kept referenced until done
+_saves: Set[asyncio.Future] = set()
+
+
+def get_token_budgets() -> TokenBudgets:
+    global _budgets
+    if _budgets is None:
+        _budgets = TokenBudgets(
+            window=settings.llm_budget_window,
+            min_samples=settings.llm_budget_min_samples,
+            percentile=settings.llm_budget_percentile,
+            headroom=settings.llm_budget_headroom,
+            min_tokens=settings.llm_budget_min_tokens,
+        )
+    return _budgets
+
+
+def load_token_budgets() -> None:
+    global _last_save
+    if settings.llm_budget_enabled:
+        get_token_budgets().load(settings.llm_budget_path)
+        _last_save = time.monotonic()
+
+
+def save_token_budgets(force: bool = False) -> None:
+    """
+    Add the completion lengths observed since the last save to the file shared by all workers, at
+    most every llm_budget_save_interval seconds unless forced. On the event loop the file is written
+    in a worker thread; see flush_token_budgets().
+    """
+    global _last_save
+    if not settings.llm_budget_enabled or _budgets is None or _last_save is None:
+        return
+    now = time.monotonic()
+    if not force and now - _last_save < settings.llm_budget_save_interval:
+        return
+    _last_save = now
+    args = (settings.llm_budget_path, _budgets.take_unsaved(), _budgets.window)
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        merge_budget_file(*args)
+        return
+    task = loop.create_task(asyncio.to_thread(merge_budget_file, *args))
+    _saves.add(task)
+    task.add_done_callback(_saves.discard)
+
+
+async def flush_token_budgets() -> None:
+    """Wait for the saves running in worker threads, e.g. at shutdown."""
+    if _saves:
+        await asyncio.gather(*list(_saves), return_exceptions=True)
+
+
+def get_token_budget_stats() -> Dict[str, Any]:
+    return {"enabled": settings.llm_budget_enabled, "budgets": get_token_budgets().stats()}
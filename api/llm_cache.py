@@ -0,0 +1,262 @@
+# app/llm_cache.py
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Set
+from loguru import logger
+
+from config import settings
+
+# Payload fields that decide the completion; max_tokens is left out because the learned
+# budget changes it and only complete (untruncated) completions are stored
+KEY_FIELDS = ("model", "messages", "temperature", "stop", "response_format")
+
+# Reads run on the event loop and, in WAL mode, do not wait for writers; writes run in worker
+# threads (see write_behind) and are skipped when they cannot get the lock this quickly
+BUSY_TIMEOUT = 0.2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    stage TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed);
+CREATE TABLE IF NOT EXISTS llm_lease (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+"""
+
+
+def cache_key(stage: str, payload: Dict[str, Any]) -> str:
+    """Content address of a request: hash of the stage and the payload fields that decide the completion."""
+    fields = {k: payload.get(k) for k in KEY_FIELDS}
+    return hashlib.sha256(json.dumps([stage, fields], sort_keys=True).encode()).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    LLM completions in a SQLite file in WAL mode, so several worker processes read and write it
+    at once. Entries live for `ttl` seconds; compact() drops expired entries and the least
+    recently used ones above max_bytes. One connection per thread.
+    """
+
+    def __init__(self, path: str, ttl: float, max_bytes: int, touch_interval: float = 60.0):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.touch_interval = touch_interval
+        self.local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.errors = 0
+        self.read_seconds = 0.0
+        self.max_read_seconds = 0.0
+        self.compactions = 0
+        self.evicted = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+            # Takes effect when the file is created; lets compact() return free pages without a full VACUUM
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self.local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        t0 = time.perf_counter()
+        try:
+            row = self._conn().execute("SELECT value, created, accessed FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            if row is None or now - row[1] > self.ttl:
+                self.misses += 1
+                return None
+            # Access times only drive eviction, so they are refreshed at most every touch_interval
+            if now - row[2] > self.touch_interval:
+                write_behind(self.touch, key, now)
+            self.hits += 1
+            return row[0]
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"[LLMCache] read failed: {e}")
+            return None
+        finally:
+            elapsed = time.perf_counter() - t0
+            self.read_seconds += elapsed
+            self.max_read_seconds = max(self.max_read_seconds, elapsed)
+
+    def put(self, key: str, stage: str, value: str) -> None:
+        now = time.time()
+        try:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO llm_cache (key, stage, value, size, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, stage, value, len(value.encode()), now, now),
+            )
+            self.stores += 1
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"[LLMCache] write failed: {e}")
+
+    def touch(self, key: str, accessed: float) -> None:
+        try:
+            self._conn().execute("UPDATE llm_cache SET accessed = ? WHERE key = ?", (accessed, key))
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"[LLMCache] touch failed: {e}")
+
+    def discard(self, key: str) -> None:
+        try:
+            self._conn().execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"[LLMCache] discard failed: {e}")
+
+    def acquire_lease(self, name: str, owner: str, ttl: float) -> bool:
+        """
+        Take or renew the lease `name` for `ttl` seconds. True when `owner` holds it, i.e. it was
+        free, expired or already held by `owner`; lets one worker of several run a job.
+        """
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT INTO llm_lease (name, owner, expires) VALUES (?, ?, ?) ON CONFLICT (name) DO UPDATE "
+                "SET owner = excluded.owner, expires = excluded.expires "
+                "WHERE llm_lease.owner = excluded.owner OR llm_lease.expires < ?",
+                (name, owner, now + ttl, now),
+            )
+            row = conn.execute("SELECT owner FROM llm_lease WHERE name = ?", (name,)).fetchone()
+            return row is not None and row[0] == owner
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"[LLMCache] lease {name} failed: {e}")
+            return False
+
+    def release_lease(self, name: str, owner: str) -> None:
+        try:
+            self._conn().execute("DELETE FROM llm_lease WHERE name = ? AND owner = ?", (name, owner))
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"[LLMCache] lease {name} release failed: {e}")
+
+    def compact(self) -> int:
+        """Delete expired entries and the least recently used ones above max_bytes; returns the number deleted."""
+        conn = self._conn()
+        deleted = conn.execute("DELETE FROM llm_cache WHERE created < ?", (time.time() - self.ttl,)).rowcount
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total > self.max_bytes:
+            excess, keys = total - self.max_bytes, []
+            for key, size in conn.execute("SELECT key, size FROM llm_cache ORDER BY accessed"):
+                if excess <= 0:
+                    break
+                keys.append(key)
+                excess -= size
+            conn.executemany("DELETE FROM llm_cache WHERE key = ?", [(k,) for k in keys])
+            deleted += len(keys)
+        conn.execute("PRAGMA incremental_vacuum")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.compactions += 1
+        self.evicted += deleted
+        return deleted
+
+    def clear(self, stage: Optional[str] = None) -> int:
+        try:
+            if stage is None:
+                return self._conn().execute("DELETE FROM llm_cache").rowcount
+            return self._conn().execute("DELETE FROM llm_cache WHERE stage = ?", (stage,)).rowcount
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"[LLMCache] clear failed: {e}")
+            return 0
+
+    def stats(self) -> Dict[str, Any]:
+        reads = self.hits + self.misses
+        entries, size = 0, 0
+        try:
+            entries, size = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        except sqlite3.Error:
+            pass
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / reads, 3) if reads else 0.0,
+            "stores": self.stores,
+            "errors": self.errors,
+            "read_ms": {
+                "mean": round(self.read_seconds / reads * 1000, 3) if reads else 0.0,
+                "max": round(self.max_read_seconds * 1000, 3),
+            },
+            "compactions": self.compactions,
+            "evicted": self.evicted,
+        }
+
+
+_cache: Optional[LLMResponseCache] = None
+# Writes running in worker threads; kept referenced until done
+_writes: Set[asyncio.Future] = set()
+
+
+def write_behind(fn: Callable[..., Any], *args: Any) -> None:
+    """Run a cache write in a worker thread without waiting for it; inline when no event loop is running."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        fn(*args)
+        return
+    task = loop.create_task(asyncio.to_thread(fn, *args))
+    _writes.add(task)
+    task.add_done_callback(_writes.discard)
+
+
+async def flush_llm_cache_writes() -> None:
+    """Wait for the pending background writes, e.g. at shutdown."""
+    if _writes:
+        await asyncio.gather(*list(_writes), return_exceptions=True)
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """The shared cache, or None when settings.llm_cache_enabled is off."""
+    global _cache
+    if not settings.llm_cache_enabled:
+        return None
+    if _cache is None:
+        _cache = LLMResponseCache(settings.llm_cache_path, settings.llm_cache_ttl, settings.llm_cache_max_bytes)
+    return _cache
+
+
+def compact_llm_cache() -> None:
+    cache = get_llm_cache()
+    if cache is None:
+        return
+    t0 = time.monotonic()
+    deleted = cache.compact()
+    logger.info(f"[LLMCache] compaction removed {deleted} entries in {(time.monotonic() - t0) * 1000:.0f}ms")
+
+
+def invalidate_llm_cache(stage: str, reason: str) -> None:
+    cache = get_llm_cache()
+    if cache is not None:
+        count = cache.clear(stage)
+        logger.info(f"[LLMCache] dropped {count} {stage} entries ({reason})")
+
+
+def get_llm_cache_stats() -> Dict[str, Any]:
+    cache = get_llm_cache()
+    return {"enabled": False} if cache is None else {"enabled": True, "path": cache.path, **cache.stats()}
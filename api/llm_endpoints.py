@@ -0,0 +1,142 @@
+# app/llm_endpoints.py
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+from loguru import logger
+
+from config import settings
+
+LEAST_OUTSTANDING = "least_outstanding"
+EWMA = "ewma"
+
+
+class Endpoint:
+    """One model replica with its in-flight count, latency average and ejection state."""
+
+    def __init__(self, url: str, token: str):
+        self.url = url
+        self.token = token
+        self.outstanding = 0
+        self.ewma_latency: Optional[float] = None
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.ejections = 0
+
+    @property
+    def ejected(self) -> bool:
+        return self.ejected_until > 0.0
+
+    def start(self) -> None:
+        self.outstanding += 1
+        self.requests += 1
+
+    def release(self) -> None:
+        self.outstanding -= 1
+
+    def observe(self, success: bool, latency: float) -> None:
+        """Record an attempt outcome (latency to the response, or to the failure)."""
+        alpha = settings.llm_endpoint_ewma_alpha
+        self.ewma_latency = latency if self.ewma_latency is None else alpha * latency + (1 - alpha) * self.ewma_latency
+        if success:
+            self.consecutive_failures = 0
+            return
+        self.failures += 1
+        self.consecutive_failures += 1
+        if not self.ejected and self.consecutive_failures >= settings.llm_endpoint_eject_failures:
+            self.eject()
+
+    def eject(self) -> None:
+        """Take the endpoint out of rotation; the ejection doubles on every repeat, up to the maximum."""
+        duration = min(settings.llm_endpoint_eject_seconds * 2 ** self.ejections, settings.llm_endpoint_max_eject_seconds)
+        self.ejections += 1
+        self.ejected_until = time.monotonic() + duration
+        logger.warning(f"[LLMEndpoints] ejected {self.url} for {duration:.0f}s after {self.consecutive_failures} failures")
+
+    def readmit(self) -> None:
+        logger.info(f"[LLMEndpoints] {self.url} passed its probe, back in rotation")
+        self.ejected_until = 0.0
+        self.consecutive_failures = 0
+
+    def score(self, strategy: str, default_latency: float = 0.0) -> Tuple[float, float]:
+        latency = self.ewma_latency if self.ewma_latency is not None else default_latency
+        if strategy == LEAST_OUTSTANDING:
+            return self.outstanding, latency
+        # Peak EWMA: expected wait grows with the requests already queued on the replica
+        return latency * (self.outstanding + 1), self.outstanding
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "outstanding": self.outstanding,
+            "ewma_ms": round(self.ewma_latency * 1000, 1) if self.ewma_latency is not None else None,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejected": self.ejected,
+            "ejections": self.ejections,
+        }
+
+
+class EndpointPool:
+    """Picks a replica per attempt with the configured strategy, skipping ejected replicas."""
+
+    def __init__(self, endpoints: List[Endpoint], strategy: str):
+        self.endpoints = endpoints
+        self.strategy = strategy
+        self._next = 0
+
+    def pick(self, exclude: Optional[Set[str]] = None) -> Endpoint:
+        """
+        Best healthy endpoint not in exclude (urls already tried by this call). Falls back to
+        the excluded ones, then to ejected ones, so a call is never refused by the balancer.
+        """
+        exclude = exclude or set()
+        healthy = [e for e in self.endpoints if not e.ejected]
+        candidates = [e for e in healthy if e.url not in exclude] or healthy or self.endpoints
+        # Rotate the start so ties (e.g. cold start) spread across replicas
+        self._next = (self._next + 1) % len(candidates)
+        rotated = candidates[self._next:] + candidates[:self._next]
+        # Replicas without a measurement yet are assumed to be as fast as the measured average
+        measured = [e.ewma_latency for e in candidates if e.ewma_latency is not None]
+        default_latency = sum(measured) / len(measured) if measured else 0.0
+        return min(rotated, key=lambda e: e.score(self.strategy, default_latency))
+
+    def due_for_probe(self) -> List[Endpoint]:
+        now = time.monotonic()
+        return [e for e in self.endpoints if e.ejected and e.ejected_until <= now]
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [e.stats() for e in self.endpoints]
+
+
+def parse_endpoints(urls: Optional[str], tokens: Optional[str]) -> List[Endpoint]:
+    """
+    Comma-separated URL_CUSTOM_LLM replicas. TOKEN_CUSTOM_LLM is either one token shared by
+    all replicas or a comma-separated list with one token per URL.
+    """
+    url_list = [u.strip() for u in (urls or "").split(",") if u.strip()]
+    token_list = [t.strip() for t in (tokens or "").split(",")]
+    if len(token_list) != len(url_list):
+        token_list = [tokens or ""] * len(url_list)
+    return [Endpoint(url, token) for url, token in zip(url_list, token_list)]
+
+
+_pools: Dict[Tuple[str, str], EndpointPool] = {}
+
+
+def get_endpoint_pool(urls: str, tokens: str) -> EndpointPool:
+    key = (urls or "", tokens or "")
+    if key not in _pools:
+        endpoints = parse_endpoints(urls, tokens) or [Endpoint(urls or "", tokens or "")]
+        _pools[key] = EndpointPool(endpoints, settings.llm_balancer_strategy)
+        if len(endpoints) > 1:
+            logger.info(f"[LLMEndpoints] balancing over {len(endpoints)} replicas ({settings.llm_balancer_strategy})")
+    return _pools[key]
+
+
+def get_endpoint_pools() -> List[EndpointPool]:
+    return list(_pools.values())
+
+
+def get_endpoint_stats() -> List[Dict[str, Any]]:
+    return [stats for pool in _pools.values() for stats in pool.stats()]
@@ -1,45 +1,330 @@
 # app/llm_engine.py
 import os
+import json
+import time
+import random
+import asyncio
 import httpx
+from importlib.util import find_spec
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+from fastapi import HTTPException
 from dotenv import load_dotenv
 from loguru import logger
 
+from config import settings
+from llm_metrics import (
+    Histogram, LATENCY_BUCKETS, estimate_tokens, get_last_completion, get_llm_prompt_name, instrument_llm_call,
+    note_coalesced, note_completion, note_first_token, note_hedge, note_request, note_response, note_retry,
+)
+from llm_scheduler import get_llm_scheduler, lane_for_stage
+from llm_breaker import get_llm_breaker
+from llm_endpoints import EndpointPool, get_endpoint_pool, get_endpoint_pools
+from llm_output import response_format
+from llm_budget import flush_token_budgets, get_token_budgets, load_token_budgets, save_token_budgets
+from llm_cache import cache_key, compact_llm_cache, flush_llm_cache_writes, get_llm_cache, write_behind
+from single_flight import SingleFlight, flight_key
+
 load_dotenv('.env')
 
 URL_CUSTOM_LLM = os.getenv('URL_CUSTOM_LLM')
 TOKEN_CUSTOM_LLM = os.getenv('TOKEN_CUSTOM_LLM')
 
-async def make_async_api_call(url, token, payload):
-    headers = {
-        "Content-Type": "application/json",
-        "Accept": "application/json",
-        "x-api-key": token
-    }
-    async with httpx.AsyncClient(timeout=120.0, verify=False) as client:
-        try:
-            response = await client.post(url, json=payload, headers=headers)
-            if response.status_code == 200:
-                return response.json()['choices'][0]['message']['content']
+# Shared HTTP client, created by init_llm_client() in main.lifespan
+_client: Optional[httpx.AsyncClient] = None
+# Background task readmitting ejected replicas, see run_endpoint_prober()
+_prober: Optional[asyncio.Task] = None
+# Background task compacting the on-disk LLM cache, see run_llm_cache_compactor()
+_compactor: Optional[asyncio.Task] = None
+
+# Stage profile overrides of the current request, see use_llm_experiment()
+_experiment: ContextVar[Optional[Dict[str, Dict[str, Any]]]] = ContextVar("llm_experiment", default=None)
+
+# Minimal completion used to check whether an ejected replica answers again
+PROBE_PAYLOAD = {
+    "messages": [{"role": "user", "content": "ping"}],
+    "max_tokens": 1, "temperature": 0, "stream": False
+}
+
+# Finish reason recorded when a stream callback stopped the generation
+CLIENT_STOP = "client_stop"
+
+# Status codes worth retrying: upstream overload and gateway errors
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+# Latency of successful single attempts per stage, the basis of the hedging delay
+_attempt_latency: Dict[str, Histogram] = {}
+
+# Non-streaming calls in flight per payload, shared by identical concurrent calls
+_llm_flights = SingleFlight()
+
+
+def _build_client() -> httpx.AsyncClient:
+    """Build a pooled keep-alive client, using HTTP/2 when the 'h2' package is available."""
+    http2 = settings.llm_http2 and find_spec("h2") is not None
+    if settings.llm_http2 and not http2:
+        logger.warning("HTTP/2 requested for the LLM client but 'h2' is not installed. Using HTTP/1.1.")
+
+    limits = httpx.Limits(
+        max_connections=settings.llm_max_connections,
+        max_keepalive_connections=settings.llm_max_keepalive_connections,
+        keepalive_expiry=settings.llm_keepalive_expiry,
+    )
+    timeout = httpx.Timeout(settings.llm_default_timeout, connect=settings.llm_connect_timeout)
+    return httpx.AsyncClient(http2=http2, limits=limits, timeout=timeout, verify=False)
+
+
+async def init_llm_client() -> httpx.AsyncClient:
+    """Create the shared LLM client. Called once on application startup."""
+    global _client, _prober, _compactor
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+        logger.info(
+            f"LLM client ready (max_connections={settings.llm_max_connections}, "
+            f"keepalive={settings.llm_max_keepalive_connections})"
+        )
+    get_endpoint_pool(URL_CUSTOM_LLM, TOKEN_CUSTOM_LLM)
+    load_token_budgets()
+    if _prober is None or _prober.done():
+        _prober = asyncio.create_task(run_endpoint_prober())
+    if get_llm_cache() is not None and (_compactor is None or _compactor.done()):
+        _compactor = asyncio.create_task(run_llm_cache_compactor())
+    return _client
+
+
+async def close_llm_client() -> None:
+    """Close the shared LLM client and release pooled connections."""
+    global _client, _prober, _compactor
+    if _prober is not None:
+        _prober.cancel()
+        _prober = None
+    if _compactor is not None:
+        _compactor.cancel()
+        _compactor = None
+    save_token_budgets(force=True)
+    await flush_token_budgets()
+    await flush_llm_cache_writes()
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+        logger.info("LLM client closed.")
+    _client = None
+
+
+def get_llm_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it lazily when the lifespan hook did not run (e.g. scripts)."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def probe_ejected_endpoints() -> None:
+    """Send a minimal completion to every replica whose ejection period is over."""
+    client = get_llm_client()
+    for pool in get_endpoint_pools():
+        for endpoint in pool.due_for_probe():
+            try:
+                response = await client.post(endpoint.url, json={"model": settings.llm_default_model, **PROBE_PAYLOAD}, headers=_headers(endpoint.token, "application/json"),
+                                             timeout=settings.llm_endpoint_probe_timeout)
+                healthy = response.status_code == 200
+            except Exception as e:
+                logger.debug(f"[LLMEndpoints] probe of {endpoint.url} failed: {e}")
+                healthy = False
+            if healthy:
+                endpoint.readmit()
             else:
-                error_message = response.text
-                print(f"API Error {response.status_code}: {error_message}")
-                return {"error": f"API call failed with status {response.status_code}"}
+                endpoint.eject()
+
+
+def get_llm_single_flight_stats() -> Dict[str, Any]:
+    return {"enabled": settings.llm_single_flight_enabled, **_llm_flights.stats()}
+
+
+async def run_llm_cache_compactor() -> None:
+    while True:
+        await asyncio.sleep(settings.llm_cache_compact_interval)
+        try:
+            await asyncio.to_thread(compact_llm_cache)
         except Exception as e:
-            logger.error(f"Exception during API call: {e}")
-            return {"error": str(e)}
+            logger.error(f"[LLMCache] compaction error: {e}")
 
-async def make_streaming_api_call(url, token, payload, callback):
-    """Make streaming API call and invoke callback for each chunk."""
-    headers = {
-        "Content-Type": "application/json",
-        "Accept": "text/event-stream",
-        "x-api-key": token
-    }
-    
+
+async def run_endpoint_prober() -> None:
+    while True:
+        await asyncio.sleep(settings.llm_endpoint_probe_interval)
+        try:
+            await probe_ejected_endpoints()
+        except Exception as e:
+            logger.error(f"[LLMEndpoints] prober error: {e}")
+
+
+def _stage_deadline(stage: Optional[str]) -> float:
+    return settings.llm_stage_timeouts.get(stage, settings.llm_default_timeout) if stage else settings.llm_default_timeout
+
+
+def _stage_timeout(stage: Optional[str], remaining: Optional[float] = None) -> httpx.Timeout:
+    """Per-stage read timeout from settings.llm_stage_timeouts, capped by the remaining deadline."""
+    read_timeout = _stage_deadline(stage)
+    if remaining is not None:
+        read_timeout = max(0.001, min(read_timeout, remaining))
+    return httpx.Timeout(read_timeout, connect=min(settings.llm_connect_timeout, read_timeout))
+
+
+def _hedge_delay(stage: Optional[str]) -> Optional[float]:
+    """Observed p95 of the stage, once enough samples exist; None disables hedging."""
+    if not settings.llm_hedge_enabled or stage not in settings.llm_hedge_stages:
+        return None
+    latency = _attempt_latency.get(stage)
+    if latency is None or latency.count < settings.llm_hedge_min_samples:
+        return None
+    return max(settings.llm_hedge_min_delay, latency.quantile(0.95))
+
+
+def _headers(token: str, accept: str) -> Dict[str, str]:
+    return {"Content-Type": "application/json", "Accept": accept, "x-api-key": token}
+
+
+async def _post_once(client: httpx.AsyncClient, pool: EndpointPool, tried: Set[str], payload, stage: Optional[str],
+                     remaining: float) -> Tuple[int, str]:
+    """
+    One attempt holding a scheduler slot, sent to the replica picked by the pool (preferring
+    replicas this call has not tried yet). Returns (status_code, content or error text).
+    """
+    breaker = get_llm_breaker()
+    breaker.check()
+    async with get_llm_scheduler().slot(lane_for_stage(stage)):
+        breaker.before_call()
+        endpoint = pool.pick(exclude=tried)
+        tried.add(endpoint.url)
+        endpoint.start()
+        t0 = time.perf_counter()
+        try:
+            response = await client.post(endpoint.url, json=payload, headers=_headers(endpoint.token, "application/json"),
+                                         timeout=_stage_timeout(stage, remaining))
+        except asyncio.CancelledError:
+            breaker.abandon()
+            raise
+        except Exception:
+            breaker.record(False, time.perf_counter() - t0)
+            endpoint.observe(False, time.perf_counter() - t0)
+            raise
+        finally:
+            endpoint.release()
+        success = response.status_code not in RETRYABLE_STATUS_CODES
+        breaker.record(success, time.perf_counter() - t0)
+        endpoint.observe(success, time.perf_counter() - t0)
+        if response.status_code != 200:
+            return response.status_code, response.text
+        body = response.json()
+        choice = body['choices'][0]
+        content = choice['message']['content']
+        note_completion(choice.get('finish_reason'), (body.get('usage') or {}).get('completion_tokens'))
+        if stage:
+            _attempt_latency.setdefault(stage, Histogram(LATENCY_BUCKETS)).observe(time.perf_counter() - t0)
+        return response.status_code, content
+
+
+async def _hedged_post(attempt: Callable[[], Awaitable[Tuple[int, str]]], hedge_delay: Optional[float]) -> Tuple[int, str]:
+    """
+    Run the attempt; when it is still pending after hedge_delay, start a second one.
+    The first 200 response wins and the other request is cancelled.
+    """
+    primary = asyncio.create_task(attempt())
+    tasks = [primary]
+    try:
+        if hedge_delay is not None:
+            done, _ = await asyncio.wait({primary}, timeout=hedge_delay)
+            if not done:
+                note_hedge()
+                tasks.append(asyncio.create_task(attempt()))
+
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.exception() and task.result()[0] == 200:
+                    if task is not primary:
+                        note_hedge(won=True)
+                    return task.result()
+        return primary.result()
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+async def make_async_api_call(url, token, payload, stage: Optional[str] = None):
+    """
+    Non-streaming call with the stage deadline from settings.llm_stage_timeouts covering all
+    attempts: transient failures are retried with jittered exponential backoff while the
+    deadline allows, and routing stages are hedged past their observed p95.
+    """
+    client = get_llm_client()
+    pool = get_endpoint_pool(url, token)
+    tried: Set[str] = set()
+    note_request(payload)
+    deadline = time.monotonic() + _stage_deadline(stage)
+    attempt = 0
+
+    while True:
+        remaining = deadline - time.monotonic()
+        error = None
+        try:
+            status, content = await asyncio.wait_for(
+                _hedged_post(lambda: _post_once(client, pool, tried, payload, stage, remaining), _hedge_delay(stage)),
+                timeout=remaining,
+            )
+        except HTTPException:
+            raise
+        except Exception as e:
+            status, content, error = type(e).__name__, str(e) or type(e).__name__, e
+
+        if status == 200:
+            note_response(status, content)
+            return content
+
+        transient = isinstance(error, (httpx.TransportError, asyncio.TimeoutError)) or status in RETRYABLE_STATUS_CODES
+        delay = random.uniform(0, min(settings.llm_retry_max_delay, settings.llm_retry_base_delay * 2 ** attempt))
+        latency = _attempt_latency.get(stage)
+        expected = latency.quantile(0.5) if latency and latency.count else 0.0
+        if not transient or attempt >= settings.llm_retry_attempts or deadline - time.monotonic() <= delay + expected:
+            note_response(status)
+            logger.error(f"API Error {status} (stage={stage}, attempts={attempt + 1}): {str(content)[:500]}")
+            if error is not None:
+                return {"error": str(error) or type(error).__name__}
+            return {"error": f"API call failed with status {status}"}
+
+        attempt += 1
+        note_retry()
+        logger.warning(f"[LLM] {stage} attempt {attempt} failed ({status}), retrying in {delay:.2f}s")
+        await asyncio.sleep(delay)
+
+async def make_streaming_api_call(url, token, payload, callback, stage: Optional[str] = None):
+    """
+    Make streaming API call and invoke callback for each chunk. A callback returning True stops
+    the stream: the connection is closed, which aborts the generation upstream.
+    """
     full_content = ""
-    async with httpx.AsyncClient(timeout=120.0, verify=False) as client:
+    finish_reason = completion_tokens = None
+    client = get_llm_client()
+    pool = get_endpoint_pool(url, token)
+    note_request(payload)
+    breaker = get_llm_breaker()
+    breaker.check()
+    async with get_llm_scheduler().slot(lane_for_stage(stage)):
+        breaker.before_call()
+        endpoint = pool.pick()
+        endpoint.start()
+        t0 = time.perf_counter()
+        outcome_recorded = False
         try:
-            async with client.stream('POST', url, json=payload, headers=headers) as response:
+            async with client.stream('POST', endpoint.url, json=payload, headers=_headers(endpoint.token, "text/event-stream"),
+                                     timeout=_stage_timeout(stage)) as response:
+                # Streaming calls are judged on the time to response headers
+                success = response.status_code not in RETRYABLE_STATUS_CODES
+                breaker.record(success, time.perf_counter() - t0)
+                endpoint.observe(success, time.perf_counter() - t0)
+                outcome_recorded = True
                 if response.status_code == 200:
                     async for line in response.aiter_lines():
                         if line.startswith('data: '):
@@ -47,93 +332,193 @@ async def make_streaming_api_call(url, token, payload, callback):
                             if chunk_data == '[DONE]':
                                 break
                             try:
-                                import json
                                 chunk_json = json.loads(chunk_data)
+                                if chunk_json.get('usage'):
+                                    completion_tokens = chunk_json['usage'].get('completion_tokens')
                                 if 'choices' in chunk_json and len(chunk_json['choices']) > 0:
+                                    finish_reason = chunk_json['choices'][0].get('finish_reason') or finish_reason
                                     delta = chunk_json['choices'][0].get('delta', {})
                                     content = delta.get('content', '')
                                     if content:
+                                        note_first_token()
                                         full_content += content
-                                        await callback(content)
+                                        if await callback(content):
+                                            finish_reason = CLIENT_STOP
+                                            logger.debug(f"[LLM] {stage} stream stopped by the caller after {len(full_content)} chars")
+                                            break
                             except json.JSONDecodeError:
                                 continue
+                    note_completion(finish_reason, completion_tokens)
+                    note_response(response.status_code, full_content)
                     return full_content
                 else:
+                    note_response(response.status_code)
                     error_message = await response.aread()
                     logger.error(f"Streaming API Error {response.status_code}: {error_message}")
                     return {"error": f"Streaming failed with status {response.status_code}"}
+        except asyncio.CancelledError:
+            if not outcome_recorded:
+                breaker.abandon()
+            raise
         except Exception as e:
+            if not outcome_recorded:
+                breaker.record(False, time.perf_counter() - t0)
+                endpoint.observe(False, time.perf_counter() - t0)
+            note_response(type(e).__name__, full_content)
             logger.error(f"Exception during streaming API call: {e}")
             return {"error": str(e)}
+        finally:
+            endpoint.release()
+
+def get_stage_profile(stage: str) -> Dict[str, Any]:
+    """
+    Model, max_tokens, temperature, url, token and JSON mode of a stage: settings.llm_stage_profiles,
+    then the experiment overrides of the current request (see use_llm_experiment).
+    """
+    profile: Dict[str, Any] = {"model": settings.llm_default_model, "max_tokens": 2000, "temperature": 0,
+                               "url": None, "token": None, "json_mode": settings.llm_json_mode}
+    profile.update(settings.llm_stage_profiles.get(stage, {}))
+    profile.update((_experiment.get() or {}).get(stage, {}))
+    profile["url"] = profile["url"] or URL_CUSTOM_LLM
+    profile["token"] = profile["token"] or TOKEN_CUSTOM_LLM
+    return profile
 
-async def telkomllm_select_table(prompt, tables_list, prompt_list, user_query):
-    payload = {
-        "model": "telkom-ai-instruct",
-        "messages": [{"role": "system", "content": prompt.format(tables_list=tables_list, prompt_list=prompt_list, user_query=user_query)}],
-        "max_tokens": 2000, "temperature": 0, "stream": False
-    }
-    return await make_async_api_call(URL_CUSTOM_LLM, TOKEN_CUSTOM_LLM, payload)
 
-async def telkomllm_generate_sql(prompt, table_name, columns_list, first_row, user_query, instruction_prompt):
+def use_llm_experiment(name: Optional[str]) -> None:
+    """Apply the settings.llm_experiments overrides named `name` to the LLM calls of the current task."""
+    if not name:
+        return
+    overrides = settings.llm_experiments.get(name)
+    if overrides is None:
+        logger.warning(f"Unknown LLM experiment '{name}', using the configured stage profiles.")
+        return
+    _experiment.set(overrides)
+
+
+async def _call_stage(stage: str, content: str, stream: bool = False, stream_callback=None):
+    """
+    Call the LLM with the stage profile. Non-streaming calls, and streaming calls of the stages in
+    settings.llm_budget_stream_stages, use the max_tokens budget learned for the stage and prompt
+    (see llm_budget.py) and are retried once, without streaming, with the profile budget when the
+    completion is cut off at the learned one. Stages in settings.llm_cache_stages are
+    answered from the on-disk cache (see llm_cache.py) when the same request was completed before,
+    and identical non-streaming calls running at the same time share one upstream request. The shared
+    call runs in the context of the caller that started it, so calls only share it when they go to
+    the same endpoint in the same scheduler lane; a live request never waits on a warm-up call.
+    """
+    profile = get_stage_profile(stage)
+    streaming = bool(stream and stream_callback)
+    budgets = get_token_budgets() if settings.llm_budget_enabled else None
+    prompt_name = get_llm_prompt_name()
+    max_tokens = profile["max_tokens"]
+    if budgets and (not streaming or stage in settings.llm_budget_stream_stages):
+        max_tokens = budgets.budget(stage, prompt_name, max_tokens)
     payload = {
-        "model": "telkom-ai-instruct",
-        "messages": [{"role": "system", "content": prompt.format(table_name=table_name, columns_list=columns_list, first_row=first_row, user_query=user_query, instruction_prompt=instruction_prompt)}],
-        "max_tokens": 10000, "temperature": 0, "stream": False
+        "model": profile["model"],
+        "messages": [{"role": "system", "content": content}],
+        "max_tokens": max_tokens, "temperature": profile["temperature"], "stream": stream
     }
-    return await make_async_api_call(URL_CUSTOM_LLM, TOKEN_CUSTOM_LLM, payload)
+    if profile.get("stop"):
+        payload["stop"] = profile["stop"]
+    output_format = response_format(stage, profile["json_mode"])
+    if output_format:
+        payload["response_format"] = output_format
+
+    cache = get_llm_cache() if stage in settings.llm_cache_stages else None
+    key = cache_key(stage, payload) if cache else None
+    if cache:
+        cached = cache.get(key)
+        if cached is not None:
+            logger.debug(f"[LLMCache] {stage} answered from cache ({len(cached)} chars)")
+            if streaming:
+                await stream_callback(cached)
+            return cached
+
+    if streaming:
+        return await _complete(stage, profile, payload, prompt_name, budgets, cache, key, stream_callback)
+    if not settings.llm_single_flight_enabled:
+        return await _complete(stage, profile, payload, prompt_name, budgets, cache, key)
+    result, shared = await _llm_flights.run(
+        flight_key(stage, payload, profile["url"], lane_for_stage(stage)),
+        lambda: _complete(stage, profile, payload, prompt_name, budgets, cache, key),
+    )
+    if shared:
+        note_coalesced(payload, result)
+    return result
+
 
+async def _complete(stage: str, profile: Dict[str, Any], payload: Dict[str, Any], prompt_name: str,
+                    budgets, cache, key: Optional[str], stream_callback=None):
+    """Send the request, retry a completion cut off at a learned budget, then store the outcome."""
+    max_tokens = payload["max_tokens"]
+    if stream_callback:
+        result = await make_streaming_api_call(profile["url"], profile["token"], payload, stream_callback, stage=stage)
+    else:
+        result = await make_async_api_call(profile["url"], profile["token"], payload, stage=stage)
+    if not isinstance(result, str):
+        return result
+    finish_reason, completion_tokens = get_last_completion()
+
+    if budgets and finish_reason == "length":
+        retry = max_tokens < profile["max_tokens"]
+        budgets.note_truncation(stage, prompt_name, retried=retry)
+        if retry:
+            logger.warning(f"[LLMBudget] {stage} '{prompt_name}' cut off at {max_tokens} tokens, retrying with {profile['max_tokens']}")
+            payload = {**payload, "max_tokens": profile["max_tokens"], "stream": False}
+            result = await make_async_api_call(profile["url"], profile["token"], payload, stage=stage)
+            if not isinstance(result, str):
+                return result
+            finish_reason, completion_tokens = get_last_completion()
+
+    if cache and finish_reason != "length":
+        # A stream stopped by its callback is stored as received: replaying it stops at the same point
+        write_behind(cache.put, key, stage, result)
+    if budgets and (finish_reason != CLIENT_STOP or stage in settings.llm_budget_stream_stages):
+        # A completion cut off at the profile budget counts as needing all of it; a stream stopped
+        # by the caller of a budgeted stream stage needed what it received
+        tokens = payload["max_tokens"] if finish_reason == "length" else completion_tokens or estimate_tokens(len(result))
+        budgets.observe(stage, prompt_name, tokens)
+        save_token_budgets()
+    return result
+
+@instrument_llm_call
+async def telkomllm_select_table(prompt, tables_list, prompt_list, user_query):
+    return await _call_stage("select_table", prompt.format(tables_list=tables_list, prompt_list=prompt_list, user_query=user_query))
+
+@instrument_llm_call
+async def telkomllm_generate_sql(prompt, table_name, columns_list, first_row, user_query, instruction_prompt, stream=False, stream_callback=None):
+    content = prompt.format(table_name=table_name, columns_list=columns_list, first_row=first_row, user_query=user_query, instruction_prompt=instruction_prompt)
+    return await _call_stage("generate_sql", content, stream=stream, stream_callback=stream_callback)
+
+@instrument_llm_call
 async def telkomllm_infer_sql(prompt, user_query, table_name, instruction_prompt, column_list, table_data, stream=False, stream_callback=None):
-    payload = {
-        "model": "telkom-ai-instruct",
-        "messages": [{"role": "system", "content": prompt.format(table_name=table_name, column_list=column_list, table_data=table_data, instruction_prompt=instruction_prompt, user_query=user_query)}],
-        "max_tokens": 28000, "temperature": 0, "stream": stream
-    }
-    
-    if stream and stream_callback:
-        return await make_streaming_api_call(URL_CUSTOM_LLM, TOKEN_CUSTOM_LLM, payload, stream_callback)
-    
-    return await make_async_api_call(URL_CUSTOM_LLM, TOKEN_CUSTOM_LLM, payload)
+    content = prompt.format(table_name=table_name, column_list=column_list, table_data=table_data, instruction_prompt=instruction_prompt, user_query=user_query)
+    return await _call_stage("infer_sql", content, stream=stream, stream_callback=stream_callback)
 
+@instrument_llm_call
 async def telkomllm_fix_sql(prompt, columns_list, error_sql, error_message):
-    payload = {
-        "model": "telkom-ai-instruct",
-        "messages": [{"role": "system", "content": prompt.format(columns_list=columns_list, error_sql=error_sql, error_message=error_message)}],
-        "max_tokens": 5000, "temperature": 0, "stream": False
-    }
-    return await make_async_api_call(URL_CUSTOM_LLM, TOKEN_CUSTOM_LLM, payload)
+    return await _call_stage("fix_sql", prompt.format(columns_list=columns_list, error_sql=error_sql, error_message=error_message))
 
+@instrument_llm_call
 async def telkomllm_main_agent(agent_prompt, user_query, chat_history="", tools_answer=""):
-    payload = {
-        "model": "telkom-ai-instruct",
-        "messages": [{"role": "system","content": agent_prompt.format(user_query=user_query, chat_history=chat_history or "", tools_answer=tools_answer or "")}],
-        "max_tokens": 4000, "temperature": 0, "stream": False
-    }
-    return await make_async_api_call(URL_CUSTOM_LLM, TOKEN_CUSTOM_LLM, payload)
+    return await _call_stage("main_agent", agent_prompt.format(user_query=user_query, chat_history=chat_history or "", tools_answer=tools_answer or ""))
+
+@instrument_llm_call
+async def telkomllm_recognize_intent(prompt, user_query):
+    return await _call_stage("intent", prompt.format(user_query=user_query))
 
+@instrument_llm_call
+async def telkomllm_plan(prompt, user_query, chat_history, tables_list, prompt_list):
+    return await _call_stage("plan", prompt.format(user_query=user_query, chat_history=chat_history or "", tables_list=tables_list, prompt_list=prompt_list))
+
+@instrument_llm_call
 async def telkomllm_generate_topic(prompt, user_query: str):
-    payload = {
-        "model": "telkom-ai-instruct",
-        "messages": [{"role": "system", "content": prompt.format(user_query=user_query)}],
-        "max_tokens": 128, "temperature": 0, "stream": False
-    }
-    return await make_async_api_call(URL_CUSTOM_LLM, TOKEN_CUSTOM_LLM, payload)
+    return await _call_stage("generate_topic", prompt.format(user_query=user_query))
 
+@instrument_llm_call
 async def telkomllm_generate_recommendation_question(prompt, chat_history: str):
-    payload = {
-        "model": "telkom-ai-instruct",
-        "messages": [{"role": "system", "content": prompt.format(chat_history=chat_history or "")}],
-        "max_tokens": 256, "temperature": 0, "stream": False
-    }
-    return await make_async_api_call(URL_CUSTOM_LLM, TOKEN_CUSTOM_LLM, payload)
+    return await _call_stage("recommendation", prompt.format(chat_history=chat_history or ""))
 
+@instrument_llm_call
 async def telkomllm_greeting_and_general(prompt, user_query: str, stream=False, stream_callback=None):
-    payload = {
-        "model": "telkom-ai-instruct",
-        "messages": [{"role": "system", "content": prompt.format(user_query=user_query)}],
-        "max_tokens": 2000, "temperature": 0, "stream": stream
-    }
-    
-    if stream and stream_callback:
-        return await make_streaming_api_call(URL_CUSTOM_LLM, TOKEN_CUSTOM_LLM, payload, stream_callback)
-    
-    return await make_async_api_call(URL_CUSTOM_LLM, TOKEN_CUSTOM_LLM, payload)
\ No newline at end of file
+    return await _call_stage("greeting", prompt.format(user_query=user_query), stream=stream, stream_callback=stream_callback)
@@ -0,0 +1,274 @@
+# app/llm_metrics.py
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Dict, List, Optional, Tuple
+from loguru import logger
+
+# Rough chars-per-token ratio used to estimate token counts from text size
+CHARS_PER_TOKEN = 4
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0, 128.0, 300.0)
+TOKEN_BUCKETS = (32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+# Instruction prompt of the current request, set by the insight pipeline stages
+_prompt_name: ContextVar[Optional[str]] = ContextVar("llm_prompt_name", default=None)
+# Record of the LLM call in progress, filled in by llm_engine
+_current_call: ContextVar[Optional[Dict[str, Any]]] = ContextVar("llm_current_call", default=None)
+
+
+class Histogram:
+    """Fixed-bucket histogram with approximate quantiles."""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Linear interpolation inside the bucket holding the q-th observation."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return float(min(lower + (upper - lower) * (rank - seen) / bucket_count, self.max))
+            seen += bucket_count
+        return float(self.max)
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 4) if self.count else 0.0,
+            "p50": round(self.quantile(0.50), 4),
+            "p95": round(self.quantile(0.95), 4),
+            "p99": round(self.quantile(0.99), 4),
+            "max": round(float(self.max), 4),
+        }
+
+
+class CallStats:
+    """Aggregated metrics of one (function, prompt_name, model) series."""
+
+    def __init__(self):
+        self.wall_seconds = Histogram(LATENCY_BUCKETS)
+        self.queue_seconds = Histogram(LATENCY_BUCKETS)
+        self.ttft_seconds = Histogram(LATENCY_BUCKETS)
+        self.prompt_tokens = Histogram(TOKEN_BUCKETS)
+        self.completion_tokens = Histogram(TOKEN_BUCKETS)
+        self.max_tokens = 0
+        self.statuses: Dict[str, int] = {}
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.truncations = 0
+
+    def observe(self, call: Dict[str, Any]) -> None:
+        self.wall_seconds.observe(call["wall_seconds"])
+        self.queue_seconds.observe(call["queue_seconds"])
+        if call.get("ttft_seconds") is not None:
+            self.ttft_seconds.observe(call["ttft_seconds"])
+        self.prompt_tokens.observe(call["prompt_tokens"])
+        self.completion_tokens.observe(call["completion_tokens"])
+        self.max_tokens = max(self.max_tokens, call.get("max_tokens") or 0)
+        status = str(call.get("status"))
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.retries += call["retries"]
+        self.hedges += call["hedges"]
+        self.hedge_wins += call["hedge_wins"]
+        self.truncations += call["truncations"]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "wall_seconds": self.wall_seconds.snapshot(),
+            "queue_seconds": self.queue_seconds.snapshot(),
+            "ttft_seconds": self.ttft_seconds.snapshot(),
+            "prompt_tokens": self.prompt_tokens.snapshot(),
+            "completion_tokens": self.completion_tokens.snapshot(),
+            "max_tokens": self.max_tokens,
+            "statuses": dict(self.statuses),
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "truncations": self.truncations,
+        }
+
+
+_series: Dict[Tuple[str, str, str], CallStats] = {}
+
+
+def estimate_tokens(chars: int) -> int:
+    return (chars + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def set_llm_prompt_name(prompt_name: Optional[str]) -> None:
+    """Tag the LLM calls made from the current task with the instruction prompt name."""
+    _prompt_name.set(prompt_name)
+
+
+def get_llm_prompt_name() -> str:
+    return _prompt_name.get() or "-"
+
+
+def note_request(payload: Dict[str, Any]) -> None:
+    """Record model, prompt size and max_tokens of the outgoing payload."""
+    call = _current_call.get()
+    if call is None:
+        return
+    call["model"] = payload.get("model") or "-"
+    call["prompt_chars"] = sum(len(str(m.get("content", ""))) for m in payload.get("messages", []))
+    call["max_tokens"] = payload.get("max_tokens")
+    call["stream"] = bool(payload.get("stream"))
+
+
+def note_queue_time(seconds: float) -> None:
+    """Record the time the call waited for a concurrency slot."""
+    call = _current_call.get()
+    if call is not None:
+        call["queue_seconds"] += seconds
+
+
+def note_retry() -> None:
+    call = _current_call.get()
+    if call is not None:
+        call["retries"] += 1
+
+
+def note_hedge(won: bool = False) -> None:
+    """Record a hedged request, or (won=True) that the hedged request answered first."""
+    call = _current_call.get()
+    if call is not None:
+        call["hedge_wins" if won else "hedges"] += 1
+
+
+def note_first_token() -> None:
+    """Record time-to-first-token of a streaming call (first call wins)."""
+    call = _current_call.get()
+    if call is not None and call.get("ttft_seconds") is None:
+        call["ttft_seconds"] = time.perf_counter() - call["start"]
+
+
+def note_response(status: Any, content: Any = None) -> None:
+    """Record the HTTP status (or exception name) and the completion text."""
+    call = _current_call.get()
+    if call is None:
+        return
+    call["status"] = status
+    if isinstance(content, str):
+        call["completion_chars"] = len(content)
+
+
+def note_completion(finish_reason: Optional[str], completion_tokens: Optional[int] = None) -> None:
+    """Record the finish reason of the completion and the token count reported by the server."""
+    call = _current_call.get()
+    if call is None:
+        return
+    call["finish_reason"] = finish_reason
+    if completion_tokens is not None:
+        call["usage_completion_tokens"] = completion_tokens
+    if finish_reason == "length":
+        call["truncations"] += 1
+
+
+def note_coalesced(payload: Dict[str, Any], content: Any) -> None:
+    """Record a call answered by an identical call already in flight; its status is 'coalesced'."""
+    note_request(payload)
+    call = _current_call.get()
+    if call is None:
+        return
+    call["status"] = "coalesced"
+    if isinstance(content, str):
+        call["completion_chars"] = len(content)
+
+
+def get_last_completion() -> Tuple[Optional[str], Optional[int]]:
+    """Finish reason and server-reported completion tokens of the last completion of the call in progress."""
+    call = _current_call.get()
+    if call is None:
+        return None, None
+    return call["finish_reason"], call["usage_completion_tokens"]
+
+
+def instrument_llm_call(func):
+    """Wrap a telkomllm_* function so every call is measured and aggregated."""
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        call = {"function": func.__name__, "prompt_name": _prompt_name.get() or "-",
+                "start": time.perf_counter(), "status": None, "queue_seconds": 0.0, "ttft_seconds": None,
+                "model": "-", "prompt_chars": 0, "completion_chars": 0, "max_tokens": None,
+                "retries": 0, "hedges": 0, "hedge_wins": 0, "truncations": 0,
+                "finish_reason": None, "usage_completion_tokens": None}
+        token = _current_call.set(call)
+        try:
+            return await func(*args, **kwargs)
+        except BaseException as e:
+            if call["status"] is None:
+                call["status"] = getattr(e, "status_code", None) or type(e).__name__
+            raise
+        finally:
+            _current_call.reset(token)
+            _record(call)
+
+    return wrapper
+
+
+def _record(call: Dict[str, Any]) -> None:
+    call["wall_seconds"] = time.perf_counter() - call["start"]
+    call["prompt_tokens"] = estimate_tokens(call["prompt_chars"])
+    call["completion_tokens"] = call["usage_completion_tokens"] or estimate_tokens(call["completion_chars"])
+    _series.setdefault((call["function"], call["prompt_name"], call["model"]), CallStats()).observe(call)
+
+    ttft = f" ttft={call['ttft_seconds']:.2f}s" if call["ttft_seconds"] is not None else ""
+    logger.debug(
+        f"[LLM] {call['function']} prompt='{call['prompt_name']}' model={call['model']} status={call['status']} "
+        f"wall={call['wall_seconds']:.2f}s queue={call['queue_seconds']:.2f}s{ttft} prompt~{call['prompt_tokens']}tok "
+        f"completion~{call['completion_tokens']}tok max_tokens={call['max_tokens']} "
+        f"retries={call['retries']} hedges={call['hedges']} finish={call['finish_reason']}"
+    )
+
+
+def get_llm_metrics() -> Dict[str, Any]:
+    """Histograms per function, and per (function, prompt_name, model) series."""
+    by_function: Dict[str, CallStats] = {}
+    series: List[Dict[str, Any]] = []
+    for (function, prompt_name, model), stats in sorted(_series.items()):
+        series.append({"function": function, "prompt_name": prompt_name, "model": model, **stats.snapshot()})
+        merged = by_function.setdefault(function, CallStats())
+        for name in ("wall_seconds", "queue_seconds", "ttft_seconds", "prompt_tokens", "completion_tokens"):
+            _merge(getattr(merged, name), getattr(stats, name))
+        merged.max_tokens = max(merged.max_tokens, stats.max_tokens)
+        for status, count in stats.statuses.items():
+            merged.statuses[status] = merged.statuses.get(status, 0) + count
+        merged.retries += stats.retries
+        merged.hedges += stats.hedges
+        merged.hedge_wins += stats.hedge_wins
+        merged.truncations += stats.truncations
+
+    return {
+        "functions": {function: stats.snapshot() for function, stats in by_function.items()},
+        "series": series,
+    }
+
+
+def _merge(target: Histogram, source: Histogram) -> None:
+    target.counts = [a + b for a, b in zip(target.counts, source.counts)]
+    target.count += source.count
+    target.total += source.total
+    target.max = max(target.max, source.max)
+
+
+def reset_llm_metrics() -> None:
+    _series.clear()
@@ -0,0 +1,117 @@
+# app/llm_output.py
+import json
+import re
+from typing import Any, Dict, Optional, Type, TypeVar
+from loguru import logger
+from pydantic import BaseModel, ValidationError
+
+# Characters that can change the JSON scanner state; an escape consumes the next character
+_JSON_TOKEN = re.compile(r'\\.|[{}"]', re.S)
+# A JSON object starts with a key or is empty; other braces in the text are prose
+_OBJECT_START = re.compile(r'\{\s*["}]')
+
+JSON_MODES = ("off", "json_object", "json_schema")
+
+OutputModel = TypeVar("OutputModel", bound=BaseModel)
+
+
+def extract_json_object(text: Any) -> Optional[Dict[str, Any]]:
+    """
+    Return the first JSON object embedded in a (possibly noisy) LLM response.
+    Single pass over the text: braces inside JSON strings are ignored and candidates do not
+    overlap, each is parsed once, so the cost stays linear on long, noisy outputs.
+    """
+    if isinstance(text, dict):
+        return text
+    if not isinstance(text, str):
+        return None
+
+    pos = 0
+    while True:
+        candidate = _OBJECT_START.search(text, pos)
+        if candidate is None:
+            return None
+        end = _object_end(text, candidate.start())
+        if end is None:
+            return None
+        try:
+            return json.loads(text[candidate.start():end])
+        except json.JSONDecodeError:
+            pos = end
+
+
+def _object_end(text: str, start: int) -> Optional[int]:
+    """End offset of the brace-balanced object opening at `start`, None when it is not closed."""
+    depth = 0
+    in_string = False
+    for match in _JSON_TOKEN.finditer(text, start):
+        token = match.group()
+        if token[0] == "\\":
+            continue
+        if in_string:
+            in_string = token != '"'
+        elif token == '"':
+            in_string = True
+        elif token == "{":
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return match.end()
+    return None
+
+
+# Structured outputs of the routing calls
+class PlanOutput(BaseModel):
+    completed_query: Optional[str]
+    wants_text: bool
+    wants_chart: bool
+    wants_table: bool
+    wants_simplified_numbers: bool = True
+    table_name: str
+    prompt: str
+
+
+class IntentOutput(BaseModel):
+    wants_text: bool
+    wants_chart: bool
+    wants_table: bool
+    wants_simplified_numbers: bool = True
+
+
+class SelectionOutput(BaseModel):
+    table_name: str
+    prompt: str
+
+
+# LLM stages whose response is validated into a typed object, and can use JSON mode
+STAGE_OUTPUT_MODELS: Dict[str, Type[BaseModel]] = {
+    "plan": PlanOutput,
+    "intent": IntentOutput,
+    "select_table": SelectionOutput,
+}
+
+
+def parse_llm_output(raw: Any, model: Type[OutputModel]) -> Optional[OutputModel]:
+    """Extract the JSON object of an LLM response and validate it; None when either step fails."""
+    data = extract_json_object(raw)
+    if data is None:
+        return None
+    try:
+        return model.model_validate(data)
+    except ValidationError as e:
+        logger.warning(f"{model.__name__} validation failed: {e.error_count()} error(s), {e.errors()[0]['loc']}: {e.errors()[0]['msg']}")
+        return None
+
+
+def response_format(stage: str, mode: str) -> Optional[Dict[str, Any]]:
+    """OpenAI-style response_format of a stage for JSON mode `mode`, None when not applicable."""
+    model = STAGE_OUTPUT_MODELS.get(stage)
+    if model is None or mode == "off":
+        return None
+    if mode == "json_object":
+        return {"type": "json_object"}
+    if mode == "json_schema":
+        return {"type": "json_schema", "json_schema": {"name": model.__name__, "schema": model.model_json_schema()}}
+    logger.warning(f"Unknown JSON mode '{mode}' for stage {stage}, expected one of {JSON_MODES}.")
+    return None
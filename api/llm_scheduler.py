@@ -0,0 +1,189 @@
+# app/llm_scheduler.py
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from loguru import logger
+
+from config import settings
+from llm_metrics import Histogram, LATENCY_BUCKETS, note_queue_time
+
+INTERACTIVE_LANE = "interactive"
+BACKGROUND_LANE = "background"
+
+# Smoothing factor of the slot hold time average used to estimate queue waits
+SERVICE_TIME_ALPHA = 0.2
+
+# Lane forced for the LLM calls of the current task, see use_llm_lane()
+_lane: ContextVar[Optional[str]] = ContextVar("llm_lane", default=None)
+
+
+class LLMScheduler:
+    """
+    Admission control for outbound LLM calls: a global concurrency cap, per-lane quotas and
+    priority ordering between lanes (FIFO inside a lane). A caller is rejected with HTTP 429
+    when its estimated or actual queue wait exceeds the lane deadline.
+    """
+
+    def __init__(self, max_concurrency: int, lane_quotas: Dict[str, int], lane_priorities: Dict[str, int],
+                 queue_deadlines: Dict[str, float]):
+        self.max_concurrency = max_concurrency
+        self.lane_quotas = lane_quotas
+        self.lane_priorities = lane_priorities
+        self.queue_deadlines = queue_deadlines
+
+        self.active = 0
+        self.lane_active: Dict[str, int] = {}
+        self._waiters: List[Tuple[int, int, str, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self.service_time: Optional[float] = None
+
+        self.queue_seconds: Dict[str, Histogram] = {}
+        self.admitted: Dict[str, int] = {}
+        self.rejected: Dict[str, int] = {}
+
+    def _can_start(self, lane: str) -> bool:
+        quota = self.lane_quotas.get(lane, self.max_concurrency)
+        return self.active < self.max_concurrency and self.lane_active.get(lane, 0) < quota
+
+    def _grant(self, lane: str) -> None:
+        self.active += 1
+        self.lane_active[lane] = self.lane_active.get(lane, 0) + 1
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiters in priority order, skipping lanes that are at quota."""
+        blocked = []
+        while self._waiters and self.active < self.max_concurrency:
+            waiter = heapq.heappop(self._waiters)
+            _, _, lane, future = waiter
+            if future.done():
+                continue
+            if self._can_start(lane):
+                self._grant(lane)
+                future.set_result(None)
+            else:
+                blocked.append(waiter)
+        for waiter in blocked:
+            heapq.heappush(self._waiters, waiter)
+
+    def _waiting_ahead(self, priority: int) -> int:
+        return sum(1 for p, _, _, f in self._waiters if p <= priority and not f.done())
+
+    def _reject(self, lane: str, reason: str) -> None:
+        self.rejected[lane] = self.rejected.get(lane, 0) + 1
+        logger.warning(f"[LLMScheduler] rejected {lane} call: {reason} (active={self.active}, waiting={len(self._waiters)})")
+        raise HTTPException(status_code=429, detail=f"LLM is overloaded, please retry later ({reason}).")
+
+    async def acquire(self, lane: str) -> float:
+        """Wait for a slot in the lane and return the queue time in seconds."""
+        priority = self.lane_priorities.get(lane, max(self.lane_priorities.values(), default=0))
+        deadline = self.queue_deadlines.get(lane)
+        start = time.perf_counter()
+
+        if self._can_start(lane) and not self._waiting_ahead(priority):
+            self._grant(lane)
+            return self._admit(lane, 0.0)
+
+        if deadline is not None and self.service_time is not None:
+            estimate = (self._waiting_ahead(priority) + 1) * self.service_time / self.max_concurrency
+            if estimate > deadline:
+                self._reject(lane, f"estimated queue wait {estimate:.1f}s exceeds {deadline:.0f}s")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), lane, future))
+        try:
+            await asyncio.wait({future}, timeout=deadline)
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(lane)
+            else:
+                future.cancel()
+            raise
+
+        if not future.done():
+            future.cancel()
+            self._reject(lane, f"queue wait exceeded {deadline:.0f}s")
+        return self._admit(lane, time.perf_counter() - start)
+
+    def _admit(self, lane: str, queued: float) -> float:
+        self.admitted[lane] = self.admitted.get(lane, 0) + 1
+        self.queue_seconds.setdefault(lane, Histogram(LATENCY_BUCKETS)).observe(queued)
+        return queued
+
+    def release(self, lane: str, held: Optional[float] = None) -> None:
+        self.active -= 1
+        self.lane_active[lane] -= 1
+        if held is not None:
+            self.service_time = held if self.service_time is None else (
+                SERVICE_TIME_ALPHA * held + (1 - SERVICE_TIME_ALPHA) * self.service_time
+            )
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, lane: str):
+        """Hold one concurrency slot of the lane for the duration of the block."""
+        queued = await self.acquire(lane)
+        note_queue_time(queued)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(lane, time.perf_counter() - start)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self.active,
+            "waiting": sum(1 for *_, f in self._waiters if not f.done()),
+            "service_time": round(self.service_time, 4) if self.service_time is not None else None,
+            "lanes": {
+                lane: {
+                    "quota": self.lane_quotas.get(lane),
+                    "active": self.lane_active.get(lane, 0),
+                    "admitted": self.admitted.get(lane, 0),
+                    "rejected": self.rejected.get(lane, 0),
+                    "queue_seconds": self.queue_seconds[lane].snapshot() if lane in self.queue_seconds else None,
+                }
+                for lane in sorted(set(self.lane_quotas) | set(self.admitted) | set(self.rejected))
+            },
+        }
+
+
+_scheduler: Optional[LLMScheduler] = None
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LLMScheduler(
+            max_concurrency=settings.llm_max_concurrency,
+            lane_quotas=settings.llm_lane_quotas,
+            lane_priorities=settings.llm_lane_priorities,
+            queue_deadlines=settings.llm_lane_queue_deadlines,
+        )
+    return _scheduler
+
+
+def use_llm_lane(lane: Optional[str]) -> None:
+    """Send the LLM calls of the current task to `lane` whatever their stage, e.g. for cache warm-up."""
+    _lane.set(lane)
+
+
+def current_llm_lane() -> Optional[str]:
+    """Lane forced on the current task by use_llm_lane(), or None."""
+    return _lane.get()
+
+
+def lane_for_stage(stage: Optional[str]) -> str:
+    forced = _lane.get()
+    if forced:
+        return forced
+    return BACKGROUND_LANE if stage in settings.llm_background_stages else INTERACTIVE_LANE
+
+
+def get_llm_scheduler_stats() -> Dict[str, Any]:
+    return get_llm_scheduler().stats()
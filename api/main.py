@@ -1,3 +1,4 @@
+import asyncio
 import os
 import sys
 import warnings
@@ -9,8 +10,14 @@ from dotenv import load_dotenv
 from loguru import logger
 from security import SecurityHeadersMiddleware, get_api_key
 from utils import load_initial_data
+from config import settings
+from llm_engine import init_llm_client, close_llm_client
+from cache_warmup import run_cache_warmer
+from prompt_router import init_prompt_router
+from entity_extractor import init_entity_extractor
 from strawberry.fastapi import GraphQLRouter
 from graphql_schema import schema
+from routes import get_metrics
 
 # Init
 load_dotenv(override=True)
@@ -26,8 +33,16 @@ logger.add("log/CFU_Insight_Bot.log", rotation="100 MB", level="INFO")
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     load_initial_data()
+    init_prompt_router()
+    init_entity_extractor()
+    await init_llm_client()
+    # Warm the caches in the background so requests are served meanwhile
+    warmer = asyncio.create_task(run_cache_warmer()) if settings.warmup_enabled else None
     logger.info("Application startup complete.")
     yield
+    if warmer is not None:
+        warmer.cancel()
+    await close_llm_client()
     logger.info("Application shutting down.")
 
 # FastAPI app
@@ -98,6 +113,9 @@ async def health_check_endpoint():
     from routes import health_check
     return await health_check()
 
+# LLM call metrics endpoint; get_metrics requires the API key
+app.add_api_route("/metrics", get_metrics, methods=["GET"], tags=["Health"])
+
 # Entrypoint
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=int(os.getenv("PORT", "5123")), workers=int(os.getenv("WORKERS", "1")))
\ No newline at end of file
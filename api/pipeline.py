@@ -0,0 +1,167 @@
+# app/pipeline.py
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+from fastapi import HTTPException
+from loguru import logger
+
+from config import settings
+
+EmitFn = Callable[..., None]
+StageFn = Callable[[Dict[str, Any], EmitFn], Awaitable[Dict[str, Any]]]
+
+
+class Stage:
+    """
+    A single node of the pipeline graph.
+
+    - inputs / outputs: context keys the stage reads and writes. The stage function only
+      receives its declared inputs and must return a dict with all of its outputs.
+    - fields: GraphQL fields that need this stage; when none of them is requested the stage
+      is skipped. None means the stage always runs.
+    - when: optional predicate on the inputs; a False result skips the stage.
+    - defaults: output values used when the stage is skipped.
+    - step / start_message / done_message: emit_progress events sent automatically.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: StageFn,
+        inputs: Iterable[str] = (),
+        outputs: Iterable[str] = (),
+        fields: Optional[Set[str]] = None,
+        when: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        defaults: Optional[Dict[str, Any]] = None,
+        step: Optional[str] = None,
+        start_message: Optional[str] = None,
+        done_message: Union[str, Callable[[Dict[str, Any]], str], None] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.name = name
+        self.fn = fn
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.fields = fields
+        self.when = when
+        self.defaults = defaults or {}
+        self.step = step
+        self.start_message = start_message
+        self.done_message = done_message
+        self.timeout = timeout
+
+    def get_timeout(self) -> float:
+        if self.timeout is not None:
+            return self.timeout
+        return settings.pipeline_stage_timeouts.get(self.name, settings.pipeline_default_stage_timeout)
+
+
+class PipelineExecutor:
+    """
+    Runs a graph of stages, starting every stage as soon as its inputs are available.
+    Independent stages run concurrently; if a stage fails, the running ones are cancelled.
+    """
+
+    def __init__(self, stages: List[Stage], inputs: Iterable[str]):
+        self.stages = stages
+        self.inputs = tuple(inputs)
+        self.producers: Dict[str, str] = {}
+        for stage in stages:
+            for key in stage.outputs:
+                if key in self.producers or key in self.inputs:
+                    raise ValueError(f"Pipeline key '{key}' is produced more than once.")
+                self.producers[key] = stage.name
+        self._validate()
+
+    def _validate(self) -> None:
+        """Check that every input has a source and that the graph has no cycles."""
+        available = set(self.inputs)
+        remaining = list(self.stages)
+        while remaining:
+            ready = [s for s in remaining if all(k in available for k in s.inputs)]
+            if not ready:
+                missing = {s.name: [k for k in s.inputs if k not in available] for s in remaining}
+                raise ValueError(f"Pipeline has unresolved inputs or a cycle: {missing}")
+            for stage in ready:
+                available.update(stage.outputs)
+                remaining.remove(stage)
+
+    def _should_skip(self, stage: Stage, ctx: Dict[str, Any], requested_fields: Set[str], skipped: Set[str]) -> bool:
+        if stage.fields is not None and not (stage.fields & requested_fields):
+            return True
+        if any(self.producers.get(k) in skipped for k in stage.inputs):
+            return True
+        if stage.when is not None and not stage.when({k: ctx[k] for k in stage.inputs}):
+            return True
+        return False
+
+    async def _run_stage(self, stage: Stage, stage_inputs: Dict[str, Any], emit: EmitFn) -> Tuple[Dict[str, Any], float]:
+        if stage.step and stage.start_message:
+            emit(stage.step, "in_progress", stage.start_message)
+
+        timeout = stage.get_timeout()
+        t0 = time.monotonic()
+        try:
+            outputs = await asyncio.wait_for(stage.fn(stage_inputs, emit), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"[Pipeline] Stage '{stage.name}' timed out after {timeout:.0f}s")
+            raise HTTPException(status_code=504, detail=f"Stage '{stage.name}' timed out after {timeout:.0f}s")
+        elapsed = time.monotonic() - t0
+
+        missing = [k for k in stage.outputs if k not in outputs]
+        if missing:
+            raise RuntimeError(f"Stage '{stage.name}' did not produce outputs: {missing}")
+
+        if stage.step and stage.done_message:
+            message = stage.done_message(outputs) if callable(stage.done_message) else stage.done_message
+            emit(stage.step, "completed", message)
+        return outputs, elapsed
+
+    async def run(
+        self,
+        inputs: Dict[str, Any],
+        requested_fields: Iterable[str],
+        emit: EmitFn,
+    ) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        """Execute the graph. Returns (context with all outputs, per-stage timings in seconds)."""
+        requested = set(requested_fields)
+        ctx: Dict[str, Any] = dict(inputs)
+        timings: Dict[str, float] = {}
+        skipped: Set[str] = set()
+        pending = list(self.stages)
+        running: Dict[asyncio.Task, Stage] = {}
+
+        try:
+            while pending or running:
+                progressed = True
+                while progressed:
+                    progressed = False
+                    for stage in list(pending):
+                        if not all(k in ctx for k in stage.inputs):
+                            continue
+                        pending.remove(stage)
+                        progressed = True
+                        if self._should_skip(stage, ctx, requested, skipped):
+                            skipped.add(stage.name)
+                            ctx.update({k: stage.defaults.get(k) for k in stage.outputs})
+                            logger.debug(f"[Pipeline] Skipped stage '{stage.name}'")
+                            continue
+                        stage_inputs = {k: ctx[k] for k in stage.inputs}
+                        running[asyncio.ensure_future(self._run_stage(stage, stage_inputs, emit))] = stage
+
+                if not running:
+                    break
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    stage = running.pop(task)
+                    outputs, elapsed = task.result()
+                    ctx.update(outputs)
+                    timings[stage.name] = elapsed
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        return ctx, timings
@@ -0,0 +1,133 @@
+# app/prompt_router.py
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from loguru import logger
+
+from config import settings
+
+# Words that carry no routing signal in Indonesian/English questions
+STOPWORDS = {
+    "a", "an", "and", "the", "of", "for", "to", "in", "on", "by", "with", "is", "are", "what", "which",
+    "questions", "like", "specific", "show", "unit", "div",
+    "apa", "yang", "dan", "di", "ke", "dari", "pada", "untuk", "dengan", "ini", "itu", "atau",
+    "berapa", "bagaimana", "tampilkan", "saja", "aja", "periode",
+    # Period words: most questions name a period, so they would decide routes on their own
+    "bulan", "tahun", "terakhir", "bln", "thn", "month", "months", "monthly", "year", "years", "last",
+}
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords and template placeholders like [unit]."""
+    text = re.sub(r"\[[^\]]*\]", " ", (text or "").lower())
+    return [t for t in re.findall(r"[a-z0-9]+", text) if t not in STOPWORDS and len(t) > 1]
+
+
+class PromptRouter:
+    """BM25 index over the prompt names and descriptions in settings.prompt_config."""
+
+    def __init__(self, prompt_config: List[Dict[str, Any]]):
+        self.prompt_names: List[str] = []
+        self.doc_freqs: List[Counter] = []
+        self.doc_lengths: List[int] = []
+        df: Counter = Counter()
+
+        for entry in prompt_config:
+            tokens = tokenize(f"{entry['prompt_name']} {entry.get('prompt_description', '')}")
+            self.prompt_names.append(entry["prompt_name"])
+            self.doc_freqs.append(Counter(tokens))
+            self.doc_lengths.append(len(tokens))
+            df.update(set(tokens))
+
+        n_docs = len(self.prompt_names)
+        self.avg_length = (sum(self.doc_lengths) / n_docs) if n_docs else 0.0
+        self.idf = {term: math.log(1 + (n_docs - freq + 0.5) / (freq + 0.5)) for term, freq in df.items()}
+
+    def score(self, query: str) -> List[Tuple[str, float]]:
+        """Return (prompt_name, score) pairs sorted by descending score."""
+        terms = tokenize(query)
+        scores = []
+        for name, freqs, length in zip(self.prompt_names, self.doc_freqs, self.doc_lengths):
+            total = 0.0
+            for term in terms:
+                tf = freqs.get(term)
+                if not tf:
+                    continue
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / self.avg_length)
+                total += self.idf[term] * tf * (BM25_K1 + 1) / (tf + norm)
+            scores.append((name, total))
+        scores.sort(key=lambda item: item[1], reverse=True)
+        return scores
+
+    def route(self, query: str) -> Tuple[Optional[str], bool, float, float]:
+        """
+        Return (top_prompt_name, confident, top_score, runner_up_score). The match is confident when
+        the top score reaches settings.prompt_router_min_score and beats the runner-up by
+        settings.prompt_router_margin (relative).
+        """
+        ranked = self.score(query)
+        if not ranked:
+            return None, False, 0.0, 0.0
+        top_name, top_score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+
+        confident = (
+            top_score >= settings.prompt_router_min_score
+            and top_score >= runner_up * (1 + settings.prompt_router_margin)
+        )
+        return top_name, confident, top_score, runner_up
+
+
+_router: Optional[PromptRouter] = None
+
+# Routing counters, reported by get_prompt_router_stats()
+_stats: Dict[str, int] = {
+    "lookups": 0, "local_hits": 0, "llm_fallbacks": 0,
+    "agreement_checks": 0, "agreement_matches": 0,
+}
+
+
+def init_prompt_router() -> PromptRouter:
+    """Build the index from settings.prompt_config. Called once on application startup."""
+    global _router
+    _router = PromptRouter(settings.prompt_config)
+    logger.info(f"Prompt router index built over {len(_router.prompt_names)} prompts.")
+    return _router
+
+
+def get_prompt_router() -> PromptRouter:
+    if _router is None:
+        return init_prompt_router()
+    return _router
+
+
+def record_route(local_hit: bool) -> None:
+    _stats["lookups"] += 1
+    _stats["local_hits" if local_hit else "llm_fallbacks"] += 1
+
+
+def record_agreement(local_choice: str, llm_choice: str, local_hit: bool, top_score: float, runner_up: float) -> None:
+    """Compare the local top candidate with the LLM choice and log the result for threshold tuning."""
+    matched = local_choice == llm_choice
+    _stats["agreement_checks"] += 1
+    _stats["agreement_matches"] += int(matched)
+    logger.info(
+        f"[PromptRouter] agreement={'yes' if matched else 'no'} local_hit={local_hit} "
+        f"local='{local_choice}' llm='{llm_choice}' top={top_score:.2f} runner_up={runner_up:.2f} "
+        f"stats={get_prompt_router_stats()}"
+    )
+
+
+def get_prompt_router_stats() -> Dict[str, float]:
+    """Return hit rate and agreement with the LLM choice."""
+    lookups = _stats["lookups"]
+    checks = _stats["agreement_checks"]
+    return {
+        **_stats,
+        "hit_rate": round(_stats["local_hits"] / lookups, 4) if lookups else 0.0,
+        "agreement_rate": round(_stats["agreement_matches"] / checks, 4) if checks else 0.0,
+    }
@@ -0,0 +1,70 @@
+# app/query_classifier.py
+import re
+from typing import Dict, List, Optional
+
+from entity_extractor import extract_entities
+
+# Phrases that make a question depend on earlier turns
+FOLLOW_UP_MARKERS = [
+    "kalau", "kalo", "klo", "bagaimana dengan", "gimana dengan", "yang tadi", "tadi",
+    "sebelumnya", "tersebut", "yang sama", "sama seperti", "juga", "lalu", "terus",
+    "grafiknya", "tabelnya", "datanya", "angkanya", "angka lengkapnya",
+    "how about", "what about", "the same", "previous",
+]
+
+MIN_SELF_CONTAINED_TOKENS = 4
+
+# Fast path counters, reported by get_context_fast_path_stats()
+_stats: Dict[str, int] = {"fast_path": 0, "llm": 0}
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", (text or "").lower()).strip()
+
+
+def _compile_alternation(phrases: List[str]) -> re.Pattern:
+    alternatives = "|".join(re.escape(p) for p in sorted(phrases, key=len, reverse=True))
+    return re.compile(rf"(?<!\w)(?:{alternatives})(?!\w)")
+
+
+FOLLOW_UP_PATTERN = _compile_alternation(FOLLOW_UP_MARKERS)
+
+
+def _names_entity(query: str) -> bool:
+    """True when the query names a unit, CFU WIB, an L2 metric or a specific L3-L5 category."""
+    entities = extract_entities(query)
+    return bool(
+        entities["divs"] or entities["cfu_wib"] or entities["metrics"]
+        or any(not c["weak"] for c in entities["categories"])
+    )
+
+
+def is_self_contained(query: str, chat_history: Optional[str]) -> bool:
+    """
+    Return True when the query can be used as-is without the contextualization LLM call:
+    there is no chat history, it names at least one known entity (see entity_extractor)
+    and has no follow-up markers.
+    """
+    if chat_history and chat_history.strip():
+        return False
+
+    normalized = _normalize(query)
+    if len(normalized.split(" ")) < MIN_SELF_CONTAINED_TOKENS:
+        return False
+    if FOLLOW_UP_PATTERN.search(normalized):
+        return False
+    return _names_entity(query)
+
+
+def record_context_decision(fast_path: bool) -> None:
+    _stats["fast_path" if fast_path else "llm"] += 1
+
+
+def get_context_fast_path_stats() -> Dict[str, float]:
+    """Return how often the contextualization fast path fired."""
+    total = _stats["fast_path"] + _stats["llm"]
+    return {
+        "fast_path": _stats["fast_path"],
+        "llm": _stats["llm"],
+        "hit_rate": round(_stats["fast_path"] / total, 4) if total else 0.0,
+    }
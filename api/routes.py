@@ -1,27 +1,34 @@
-from typing import List, Dict, Any, Optional, Tuple
+from typing import Callable, List, Dict, Any, Optional, Set, Tuple
+import hashlib
 import json
 import time
 import re
+import random
 import asyncio
 from datetime import datetime
 import pytz
-from fastapi import HTTPException
+from fastapi import Depends, HTTPException
 from fastapi.security.api_key import APIKey
 from loguru import logger
 
 # Internal modules
 from config import settings
+from security import get_api_key
 from database import get_table_columns, execute_query
 
 from llm_engine import (
     telkomllm_main_agent,
+    telkomllm_recognize_intent,
+    telkomllm_plan,
     telkomllm_select_table,
     telkomllm_generate_sql,
     telkomllm_infer_sql,
     telkomllm_fix_sql,
     telkomllm_generate_topic,
     telkomllm_generate_recommendation_question,
-    telkomllm_greeting_and_general
+    telkomllm_greeting_and_general,
+    get_llm_single_flight_stats,
+    use_llm_experiment
 )
 
 from lib.prompt import (
@@ -32,77 +39,46 @@ from lib.prompt import (
     select_table_and_prompt_prompt,
     generate_topic_prompt,
     recommendation_question_prompt,
-    recognize_components_prompt
+    recognize_components_prompt,
+    planning_prompt
 )
 
 from chart_generator import ChartGenerator
+from pipeline import PipelineExecutor, Stage
+from sql_templates import render_sql_template
+from table_encoding import encode_table, prune_columns
+from insight_cache import get_insight_cache, get_insight_cache_stats, insight_cache_key, replay_insight
+from sql_cache import forget_sql, get_sql_cache_stats, lookup_sql, normalize_query, remember_sql, sql_cache_key
+from single_flight import SingleFlight, flight_key
+from sql_stream import SQLStatementDetector, extract_sql_statement, record_sql_generation, get_sql_stream_stats
+from prompt_router import get_prompt_router, record_route, record_agreement, get_prompt_router_stats
+from llm_metrics import estimate_tokens, get_llm_metrics, set_llm_prompt_name
+from llm_scheduler import current_llm_lane, get_llm_scheduler_stats
+from llm_breaker import get_llm_breaker_stats
+from llm_endpoints import get_endpoint_stats
+from llm_budget import get_token_budget_stats
+from llm_cache import get_llm_cache_stats
+from llm_output import IntentOutput, PlanOutput, SelectionOutput, extract_json_object, parse_llm_output
+from query_classifier import is_self_contained, record_context_decision, get_context_fast_path_stats
 
 
 # Runtime constants
 SQL_FIX_RETRIES = 3
-MAX_AGENT_STEPS = 3
+# Column name fragments of percentages and ratios, which are not summed
+RATIO_KEYWORDS = ['pct', 'ach', 'growth', 'margin', 'ratio', 'percent', 'rate', 'mom', 'yoy']
 
-
-# JSON utilities
-def _extract_json_object(text: str) -> Optional[str]:
-    """Extract the first valid JSON object from a string, considering nested braces."""
-    if not text:
-        return None
-
-    s = text.strip()
-    first_brace = s.find("{")
-    if first_brace == -1:
-        return None
-
-    brace_count = 0
-    for i in range(first_brace, len(s)):
-        if s[i] == "{":
-            brace_count += 1
-        elif s[i] == "}":
-            brace_count -= 1
-
-        if brace_count == 0:
-            candidate = s[first_brace : i + 1]
-            try:
-                json.loads(candidate)
-                return candidate
-            except json.JSONDecodeError:
-                continue
-
-    return None
+# References to fire-and-forget tasks so they are not garbage collected mid-flight
+_background_tasks: Set[asyncio.Task] = set()
 
 
+# JSON utilities
 def _safe_json_loads(text_or_obj, required_keys: Optional[List[str]] = None) -> Optional[dict]:
     """
     A safer json.loads wrapper that handles both strings and dicts,
     and extracts the first valid JSON block if the input is noisy.
     """
-    if isinstance(text_or_obj, dict):
-        data = text_or_obj
-    elif isinstance(text_or_obj, str):
-        s = text_or_obj.strip()
-        first_brace = s.find("{")
-        if first_brace == -1:
-            return None
-
-        brace_count = 1
-        for i in range(first_brace + 1, len(s)):
-            if s[i] == "{":
-                brace_count += 1
-            elif s[i] == "}":
-                brace_count -= 1
-
-            if brace_count == 0:
-                json_block = s[first_brace : i + 1]
-                try:
-                    data = json.loads(json_block)
-                    break
-                except json.JSONDecodeError:
-                    brace_count = 1
-                    continue
-        else:
-            return None
-    else:
+    data = extract_json_object(text_or_obj)
+    if data is None:
         return None
 
     if required_keys and not all(k in data for k in required_keys):
@@ -142,12 +118,8 @@ def _determine_chart_type(prompt_name: str, user_query: str) -> str:
 
 
 # Core agent functions
-async def select_table_and_prompt(user_query: str) -> Tuple[str, str, str]:
-    """
-    Use LLM to select the most relevant table and prompt.
-    Returns: (table_name, instruction_prompt, prompt_name_for_chart).
-    """
-    t0 = time.monotonic()
+def _build_selection_lists() -> Tuple[List[str], List[str]]:
+    """Return the 'name: description' lists of tables and prompts sent to the selection LLM."""
     tables_list = [
         f"{c['table_name']}: {c.get('table_description', '')}"
         for c in settings.tables_config
@@ -156,6 +128,69 @@ async def select_table_and_prompt(user_query: str) -> Tuple[str, str, str]:
         f"{p['prompt_name']}: {p.get('prompt_description', '')}"
         for p in settings.prompt_config
     ]
+    return tables_list, prompt_list
+
+
+def _use_fused_planning() -> bool:
+    """Decide the planning mode for this request according to settings.planning_mode."""
+    if settings.planning_mode == "fused":
+        return True
+    if settings.planning_mode == "ab":
+        return random.random() < settings.planning_fused_ratio
+    return False
+
+
+async def plan_query(query: str, chat_history: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Single planning LLM call returning the completed query, intent and table/prompt selection.
+    Returns None when the response cannot be parsed or fails validation, so the caller
+    can fall back to the separate context, intent and selection calls.
+    """
+    t0 = time.monotonic()
+    tables_list, prompt_list = _build_selection_lists()
+    raw = await telkomllm_plan(
+        prompt=planning_prompt,
+        user_query=query,
+        chat_history=chat_history or "",
+        tables_list=tables_list,
+        prompt_list=prompt_list,
+    )
+    logger.debug(f"[Timing] plan_query {(time.monotonic() - t0):.2f}s")
+
+    parsed = parse_llm_output(raw, PlanOutput)
+    if not parsed:
+        logger.warning(f"[Planning] invalid JSON, falling back to split planning. Raw: {str(raw)[:300]}")
+        return None
+
+    prompt_name = parsed.prompt
+    table_name = parsed.table_name
+    valid_prompts = {p["prompt_name"] for p in settings.prompt_config}
+    valid_tables = {c["table_name"] for c in settings.tables_config}
+    if prompt_name not in valid_prompts:
+        logger.warning(f"[Planning] unknown prompt '{prompt_name}', falling back to split planning.")
+        return None
+    if prompt_name != "Greeting or General Question" and table_name not in valid_tables:
+        logger.warning(f"[Planning] unknown table '{table_name}', falling back to split planning.")
+        return None
+
+    intent = parsed.model_dump(include=set(IntentOutput.model_fields))
+    completed_query = parsed.completed_query
+    if not completed_query or not completed_query.strip():
+        completed_query = query
+
+    return {
+        "completed_query": completed_query,
+        "intent": intent,
+        "table_name": table_name,
+        "instruction_prompt": settings.get_prompt_by_name(prompt_name),
+        "prompt_name": prompt_name,
+    }
+
+
+async def _select_with_llm(user_query: str) -> Dict[str, str]:
+    """Ask the LLM for the table and prompt; falls back to the first configured entries on invalid JSON."""
+    t0 = time.monotonic()
+    tables_list, prompt_list = _build_selection_lists()
 
     raw = await telkomllm_select_table(
         prompt=select_table_and_prompt_prompt,
@@ -165,14 +200,56 @@ async def select_table_and_prompt(user_query: str) -> Tuple[str, str, str]:
     )
     logger.debug(f"[Timing] select_table_and_prompt {(time.monotonic() - t0):.2f}s")
     
-    parsed = _safe_json_loads(raw, required_keys=["table_name", "prompt"])
-    if not parsed:
+    selection = parse_llm_output(raw, SelectionOutput)
+    if selection:
+        parsed = selection.model_dump()
+    else:
         logger.warning(f"[Agentic] select_table invalid JSON. Raw: {str(raw)[:300]}")
         default_table = settings.tables_config[0]["table_name"] if settings.tables_config else ""
         default_prompt = settings.prompt_config[0]["prompt_name"] if settings.prompt_config else ""
         if not default_table or not default_prompt:
             raise HTTPException(status_code=502, detail="No valid fallback for select_table.")
         parsed = {"table_name": default_table, "prompt": default_prompt}
+    return parsed
+
+
+async def _shadow_check_route(user_query: str, route: Tuple[Optional[str], bool, float, float]) -> None:
+    """Background LLM selection for a local hit, only used to log agreement."""
+    local_name, confident, top_score, runner_up = route
+    try:
+        parsed = await _select_with_llm(user_query)
+        record_agreement(local_name, parsed["prompt"], confident, top_score, runner_up)
+    except Exception as e:
+        logger.debug(f"[PromptRouter] shadow check failed: {e}")
+
+
+async def select_table_and_prompt(user_query: str) -> Tuple[str, str, str]:
+    """
+    Select the most relevant table and prompt, locally via the prompt router when it is
+    confident, there is a single data table and settings.prompt_router_mode is "on", otherwise
+    with the LLM. In "shadow" mode the local choice is only compared with the LLM one.
+    Returns: (table_name, instruction_prompt, prompt_name_for_chart).
+    """
+    parsed = None
+    route = None
+    if settings.prompt_router_mode in ("shadow", "on") and len(settings.tables_config) == 1:
+        route = get_prompt_router().route(user_query)
+        local_name, confident, top_score, runner_up = route
+        if settings.prompt_router_mode == "on":
+            record_route(confident)
+        if confident and settings.prompt_router_mode == "on":
+            logger.debug(f"[PromptRouter] local match '{local_name}' (score {top_score:.2f} vs {runner_up:.2f})")
+            parsed = {"table_name": settings.tables_config[0]["table_name"], "prompt": local_name}
+            if random.random() < settings.prompt_router_shadow_rate:
+                task = asyncio.create_task(_shadow_check_route(user_query, route))
+                _background_tasks.add(task)
+                task.add_done_callback(_background_tasks.discard)
+
+    if parsed is None:
+        parsed = await _select_with_llm(user_query)
+        if route is not None:
+            local_name, confident, top_score, runner_up = route
+            record_agreement(local_name, parsed["prompt"], confident, top_score, runner_up)
 
     table_name = parsed["table_name"]
     prompt_name = parsed["prompt"]
@@ -224,27 +301,55 @@ async def execute_agent_step(agent_prompt_text: str, query: str, chat_history: O
 
 async def generate_and_validate_sql(table_name: str, columns_list: List[str], first_row: Dict[str, Any],
                                     user_query: str, instruction_prompt: str) -> str:
-    """Ask LLM to generate SQL and validate the response."""
+    """
+    Ask LLM to generate SQL and validate the response. With settings.sql_streaming_enabled the
+    completion is streamed and cut at the end of the first statement, so any explanation the
+    model appends is neither generated nor passed to the database.
+    """
     t0 = time.monotonic()
-    generated_sql = await telkomllm_generate_sql(
-        prompt=generate_sql_prompt,
-        table_name=table_name,
-        columns_list=columns_list,
-        first_row=first_row,
-        user_query=user_query,
-        instruction_prompt=instruction_prompt,
-    )
+    detector = SQLStatementDetector()
+    sql_args = dict(prompt=generate_sql_prompt, table_name=table_name, columns_list=columns_list,
+                    first_row=first_row, user_query=user_query, instruction_prompt=instruction_prompt)
+    streamed = settings.sql_streaming_enabled
+    if streamed:
+        async def on_chunk(chunk: str) -> bool:
+            return detector.feed(chunk)
+
+        generated_sql = await telkomllm_generate_sql(**sql_args, stream=True, stream_callback=on_chunk)
+        if isinstance(generated_sql, str) and generated_sql != detector.text:
+            # Cut off at the learned token budget and retried in full without streaming
+            detector = SQLStatementDetector()
+            detector.feed(generated_sql)
+            streamed = False
+        elif isinstance(generated_sql, dict) and not detector.text:
+            # Nothing was streamed; the non-streaming call comes with retries
+            logger.warning(f"[Agentic] SQL stream failed ({generated_sql.get('error')}), retrying without streaming.")
+            streamed = False
+    if not streamed:
+        generated_sql = await telkomllm_generate_sql(**sql_args)
+        if isinstance(generated_sql, str):
+            detector.feed(generated_sql)
     logger.debug(f"[Timing] generate_and_validate_sql {(time.monotonic() - t0):.2f}s")
-    logger.info(f"[Agentic] Generated SQL: {generated_sql}")
 
     if isinstance(generated_sql, dict) and "error" in generated_sql:
         logger.error(f"LLM SQL generation failed: {generated_sql['error']}")
         raise HTTPException(status_code=500, detail=f"LLM SQL generation failed: {generated_sql['error']}")
+
+    stopped_early = streamed and detector.end is not None
+    saved = record_sql_generation(detector, streamed, stopped_early)
+    if stopped_early:
+        saved_text = f"{saved:.2f}s" if saved is not None else "n/a"
+        logger.info(f"[SQLStream] stopped at the statement end after {detector.end} chars, est. {saved_text} saved")
+    generated_sql = detector.finish()
+    logger.info(f"[Agentic] Generated SQL: {generated_sql}")
     return generated_sql
 
 
-async def execute_sql_query(generated_sql: str, columns_list: List[str]) -> List[Dict[str, Any]]:
-    """Run SQL query with error handling and retry using LLM-based fix if needed."""
+async def execute_sql_query(generated_sql: str, columns_list: List[str]) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    Run SQL query with error handling and retry using LLM-based fix if needed.
+    Returns the rows and the SQL that produced them.
+    """
     t0 = time.monotonic()
     try:
         rows = execute_query(settings.database_api_path, generated_sql)
@@ -252,25 +357,26 @@ async def execute_sql_query(generated_sql: str, columns_list: List[str]) -> List
 
         if not rows:
             logger.warning("[Agentic] Query returned no rows. Trying LLM fix...")
-            fixed_sql = await telkomllm_fix_sql(
+            fixed_sql = extract_sql_statement(await telkomllm_fix_sql(
                 prompt=sql_fix_prompt,
                 columns_list=columns_list,
                 error_sql=generated_sql,
                 error_message="No data found for the given query."
-            )
+            ))
             rows = execute_query(settings.database_api_path, fixed_sql)
             logger.debug(f"[Agentic] Fixed empty result. Rows={len(rows)}")
+            return rows, fixed_sql
 
-        return rows
+        return rows, generated_sql
 
     except Exception as exec_error:
         logger.warning(f"[Agentic] SQL error: {exec_error}. Trying to fix...")
-        fixed_sql = await telkomllm_fix_sql(
+        fixed_sql = extract_sql_statement(await telkomllm_fix_sql(
             prompt=sql_fix_prompt,
             columns_list=columns_list,
             error_sql=generated_sql,
             error_message=str(exec_error)
-        )
+        ))
         last_exc = exec_error
 
         for attempt in range(SQL_FIX_RETRIES):
@@ -280,7 +386,7 @@ async def execute_sql_query(generated_sql: str, columns_list: List[str]) -> List
                     f"[Timing] execute_sql_query FIX {(time.monotonic() - t0):.2f}s "
                     f"(attempt {attempt+1}). Rows={len(rows)}"
                 )
-                return rows
+                return rows, fixed_sql
             except Exception as e2:
                 last_exc = e2
 
@@ -300,9 +406,8 @@ def _calculate_summary_row(rows: List[Dict[str, Any]]) -> Optional[Dict[str, Any
     summary = {k: None for k in keys}
     
     # Identify columns to sum
-    # We sum columns that are numeric and NOT percentages/ratios
-    ratio_keywords = ['pct', 'ach', 'growth', 'margin', 'ratio', 'percent', 'rate', 'mom', 'yoy']
-    
+    # We sum columns that are numeric and NOT percentages/ratios (RATIO_KEYWORDS)
+
     # We need to find the first text column to put "TOTAL"
     first_text_col = None
     for k in keys:
@@ -331,7 +436,7 @@ def _calculate_summary_row(rows: List[Dict[str, Any]]) -> Optional[Dict[str, Any
             continue
 
         # Check if it's a ratio column
-        if any(kw in k.lower() for kw in ratio_keywords):
+        if any(kw in k.lower() for kw in RATIO_KEYWORDS):
             continue
             
         # Check if column is numeric
@@ -401,11 +506,106 @@ def _clean_rows_for_display(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     return cleaned_rows
 
 
+def _key_measure(rows: List[Dict[str, Any]]) -> Optional[str]:
+    """Measure used to rank rows: the first of settings.insight_key_measures present, else the first summable column."""
+    keys = list(rows[0].keys())
+    numeric = [k for k in keys if any(isinstance(r.get(k), (int, float)) for r in rows)]
+    for name in settings.insight_key_measures:
+        if name in numeric:
+            return name
+    for k in numeric:
+        if k.lower() != 'period' and not any(kw in k.lower() for kw in RATIO_KEYWORDS):
+            return k
+    return None
+
+
+def _group_column(rows: List[Dict[str, Any]], max_groups: int) -> Optional[str]:
+    """Text column with the fewest distinct values (at least two, at most max_groups)."""
+    best, best_count = None, None
+    for k in rows[0].keys():
+        values = {r.get(k) for r in rows}
+        if not all(isinstance(v, str) or v is None for v in values):
+            continue
+        if 2 <= len(values) <= max_groups and (best_count is None or len(values) < best_count):
+            best, best_count = k, len(values)
+    return best
+
+
+def _reduce_rows_for_insight(rows: List[Dict[str, Any]], budget: int) -> Optional[List[Tuple[str, List[Dict[str, Any]]]]]:
+    """
+    Deterministic summary of a result above the row budget, as (title, rows) sections:
+    top-k and bottom-k by the key measure, subtotals per group and the overall total.
+    Returns None when the rows fit in the budget.
+    """
+    if not budget or len(rows) <= budget:
+        return None
+    k = max(1, budget // 3)
+    measure = _key_measure(rows)
+    sections = []
+    if measure:
+        ranked = sorted((r for r in rows if isinstance(r.get(measure), (int, float))),
+                        key=lambda r: r[measure], reverse=True)
+        sections.append((f"Top {k} rows by {measure}", ranked[:k]))
+        sections.append((f"Bottom {k} rows by {measure}", ranked[max(k, len(ranked) - k):]))
+    else:
+        sections.append((f"First {k} rows", rows[:k]))
+        sections.append((f"Last {k} rows", rows[-k:]))
+
+    group_col = _group_column(rows, k)
+    if group_col:
+        groups: Dict[Any, List[Dict[str, Any]]] = {}
+        for r in rows:
+            groups.setdefault(r.get(group_col), []).append(r)
+        subtotals = []
+        for value, group_rows in groups.items():
+            subtotal = _calculate_summary_row(group_rows)
+            subtotal = {c: (None if v == "TOTAL" else v) for c, v in subtotal.items()}
+            subtotal[group_col] = value
+            subtotal["rows"] = len(group_rows)
+            subtotals.append(subtotal)
+        if measure:
+            subtotals.sort(key=lambda r: r.get(measure) or 0, reverse=True)
+        sections.append((f"Subtotals by {group_col} (rows = number of rows in the group)", subtotals))
+
+    total = _calculate_summary_row(rows)
+    if total:
+        sections.append((f"Total of all {len(rows)} rows", [total]))
+    return sections
+
+
+def _encode_insight_rows(rows: List[Dict[str, Any]], instruction_prompt: str, user_query: str):
+    """Table data for the insight prompt in the settings.insight_table_format encoding."""
+    cleaned = _clean_rows_for_display(rows)
+    if settings.insight_table_format != "columnar":
+        return cleaned
+    columns = list(cleaned[0].keys()) if cleaned else []
+    if settings.insight_prune_columns:
+        columns = prune_columns(columns, cleaned, instruction_prompt, user_query)
+    return encode_table(cleaned, columns)
+
+
 async def generate_insight(table_name: str, columns_list: List[str], table_data: List[Dict[str, Any]],
                            user_query: str, instruction_prompt: str, intent: Dict[str, bool], 
-                           stream: bool = False, stream_callback = None) -> str:
-    """Use LLM to generate textual insight from query results."""
+                           stream: bool = False, stream_callback = None, prompt_name: Optional[str] = None,
+                           use_cache: bool = True) -> str:
+    """
+    Use LLM to generate textual insight from query results. With settings.insight_cache_enabled an
+    insight written earlier for the same rows, prompt and question is replayed through
+    stream_callback instead; use_cache=False skips the lookup but still stores the new insight.
+    """
     t0 = time.monotonic()
+    cache_key = None
+    if settings.insight_cache_enabled and prompt_name:
+        cache_key = insight_cache_key(table_data, instruction_prompt, prompt_name, user_query,
+                                      intent.get("wants_simplified_numbers", True))
+        cached = get_insight_cache().get(cache_key) if use_cache else None
+        if not use_cache:
+            get_insight_cache().bypassed += 1
+        if cached:
+            logger.info(f"[InsightCache] hit for '{cache_key[2]}' ({len(cached)} chars)")
+            if stream and stream_callback:
+                await replay_insight(cached, stream_callback)
+            return cached
 
     if intent.get("wants_simplified_numbers", True):
         number_format_instruction = "Gunakan format sederhana (contoh: Rp5.025,1 Miliar, bukan Rp5,03 Triliun)."
@@ -414,8 +614,19 @@ async def generate_insight(table_name: str, columns_list: List[str], table_data:
     
     final_prompt = generate_insight_prompt.replace('{number_format_instruction}', number_format_instruction)
 
-    # Clean rows to remove empty columns
-    cleaned_table_data = _clean_rows_for_display(table_data)
+    # Clean rows to remove empty columns; above the row budget send a summary instead
+    table_text = _encode_insight_rows(table_data, instruction_prompt, user_query)
+    sections = _reduce_rows_for_insight(table_data, settings.insight_row_budget)
+    if sections:
+        full_tokens = estimate_tokens(len(str(table_text)))
+        parts = [f"The query returned {len(table_data)} rows, too many to list; they are summarized below."]
+        for title, section_rows in sections:
+            parts.append(f"{title}:\n{_encode_insight_rows(section_rows, instruction_prompt, user_query)}")
+        table_text = "\n\n".join(str(part) for part in parts)
+        logger.info(
+            f"[Insight] {len(table_data)} rows over the budget of {settings.insight_row_budget}, sending "
+            f"{sum(len(r) for _, r in sections)} summary rows (table data ~{full_tokens} -> ~{estimate_tokens(len(table_text))} tokens)"
+        )
 
     insight = await telkomllm_infer_sql(
         prompt=final_prompt, 
@@ -423,227 +634,399 @@ async def generate_insight(table_name: str, columns_list: List[str], table_data:
         table_name=table_name,
         instruction_prompt=instruction_prompt,
         column_list=columns_list,
-        table_data=cleaned_table_data,
+        table_data=table_text,
         stream=stream,
         stream_callback=stream_callback
     )
     logger.debug(f"[Timing] generate_insight {(time.monotonic() - t0):.2f}s")
+    if cache_key and isinstance(insight, str) and insight.strip():
+        get_insight_cache().put(cache_key, insight)
     return str(insight)
 
 
-async def get_insight_logic(
-    query: str,
-    chat_history: Optional[str],
-    requested_fields: List[str],
-    request_id: Optional[str] = None
-) -> Dict[str, Any]:
-    """
-    Main agent logic combining a robust agentic loop with the corrected flow:
-    1. Plan first (Contextualize Query).
-    2. Then, enter an execution loop that handles the rest.
-    """
-    
-    def emit(step: str, status: str, message: str, details: Optional[str] = None):
-        if request_id:
-            try:
-                from graphql_schema import emit_progress
-                emit_progress(request_id, step, status, message, details)
-            except ImportError:
-                pass
+# Insight pipeline stages
+GREETING_PROMPT_NAME = "Greeting or General Question"
+DATA_FIELDS = {"output", "dataRows", "dataColumns", "chart"}
+
+
+class _EventFanout:
+    """Request ids sharing one pipeline run, with the events sent so far for ids that attach later."""
+
+    def __init__(self, request_id: Optional[str]):
+        self.request_ids: List[str] = [request_id] if request_id else []
+        self.events: List[Tuple[Callable[..., None], tuple]] = []
+
+    def attach(self, request_id: str) -> None:
+        for send, args in self.events:
+            send(request_id, *args)
+        self.request_ids.append(request_id)
+
+    def send(self, send: Callable[..., None], *args) -> None:
+        self.events.append((send, args))
+        for request_id in self.request_ids:
+            send(request_id, *args)
+
+
+# Shared insight runs by single-flight key, and by the request_id the run was started with
+_insight_flights = SingleFlight()
+_fanouts_by_key: Dict[str, _EventFanout] = {}
+_fanouts_by_request: Dict[str, _EventFanout] = {}
+
+
+def _send_event(request_id: Optional[str], name: str, *args) -> None:
+    """Call graphql_schema.<name> for request_id, or for every request sharing its pipeline run."""
+    if not request_id:
+        return
+    try:
+        import graphql_schema
+    except ImportError:
+        return
+    send = getattr(graphql_schema, name)
+    fanout = _fanouts_by_request.get(request_id)
+    if fanout is None:
+        send(request_id, *args)
+    else:
+        fanout.send(send, *args)
+
+
+def _emit_text_chunk(request_id: Optional[str], chunk: str, is_final: bool = False) -> None:
+    _send_event(request_id, "emit_text_stream", chunk, is_final)
+
+
+def _make_stream_callback(request_id: Optional[str]):
+    """Streaming callback forwarding LLM chunks to the insight_stream subscription, or None without a request_id."""
+    if not request_id:
+        return None
+
+    async def stream_callback(chunk: str):
+        _emit_text_chunk(request_id, chunk)
+
+    return stream_callback
+
+
+async def _stage_plan(inputs: Dict[str, Any], emit) -> Dict[str, Any]:
+    """Fused planning call; plan is None in split mode or when the planning response is invalid."""
+    if not _use_fused_planning():
+        return {"plan": None, "planning_mode": "split"}
+
+    emit("planning", "in_progress", "Merencanakan pemrosesan pertanyaan...")
+    plan = await plan_query(inputs["query"], inputs["chat_history"])
+    if plan is None:
+        emit("planning", "completed", "Perencanaan gabungan gagal, memakai alur standar")
+        return {"plan": None, "planning_mode": "fused_fallback"}
+
+    emit("planning", "completed", "Perencanaan selesai")
+    return {"plan": plan, "planning_mode": "fused"}
+
+
+async def _stage_context(inputs: Dict[str, Any], emit) -> Dict[str, Any]:
+    """Contextualization (adjust the follow-up question based on chat history)."""
+    query = inputs["query"]
+    if inputs["plan"]:
+        return {"completed_query": inputs["plan"]["completed_query"]}
+
+    fast_path = settings.context_fast_path_enabled and is_self_contained(query, inputs["chat_history"])
+    record_context_decision(fast_path)
+    if fast_path:
+        logger.info(f"Query is self-contained, skipping contextualization: '{query}'")
+        return {"completed_query": query}
 
-    # Contextualization (adjust the follow-up question based on chat history)
-    emit("context_completion", "in_progress", "Memahami konteks pertanyaan...")
     planning_state = await execute_agent_step(
         agent_prompt_text=agent_prompt,
         query=query,
-        chat_history=chat_history,
+        chat_history=inputs["chat_history"],
         tools_answer=""
     )
     completed_query = planning_state.get("action_input") or query
     logger.info(f"Query contextualized from '{query}' to '{completed_query}'")
-    emit("context_completion", "completed", f"Pertanyaan diproses: {completed_query}")
+    return {"completed_query": completed_query}
+
 
-    # Intent Recognition
-    emit("intent", "in_progress", "Mengenali intent...")
-    intent_dict = await get_intent_logic(completed_query)
+async def _stage_intent(inputs: Dict[str, Any], emit) -> Dict[str, Any]:
+    if inputs["plan"]:
+        return {"intent": inputs["plan"]["intent"]}
+    intent_dict = await get_intent_logic(inputs["completed_query"])
     logger.info(f"Intent recognized for completed query: {intent_dict}")
-    emit("intent", "completed", "Intent berhasil dikenali")
-
-    # Table & Prompt Selection
-    emit("table_selection", "in_progress", "Memilih tabel dan prompt...")
-    table_name, instruction_prompt, prompt_name_for_chart = await select_table_and_prompt(completed_query)
-    emit("table_selection", "completed", f"Tabel terpilih: {table_name}")
-
-    if prompt_name_for_chart == "Greeting or General Question":
-        logger.info("Handling a greeting or general question, bypassing data pipeline.")
-        emit("greeting", "in_progress", "Memproses sapaan...")
-        jakarta_tz = pytz.timezone("Asia/Jakarta")
-        current_time_str = datetime.now(jakarta_tz).strftime('%A, %d %B %Y, %H:%M %Z')
-        time_aware_prompt = instruction_prompt.replace('{current_time}', current_time_str)
-        
-        # Streaming
-        async def stream_callback(chunk: str):
-            try:
-                from graphql_schema import emit_text_stream
-                emit_text_stream(request_id, chunk, is_final=False)
-            except ImportError:
-                pass
-        
-        greeting_response = await telkomllm_greeting_and_general(
-            prompt=time_aware_prompt, 
-            user_query=completed_query,
-            stream=True if request_id else False,
-            stream_callback=stream_callback if request_id else None
-        )
-        
-        # Send final chunk
+    return {"intent": intent_dict}
+
+
+async def _stage_select(inputs: Dict[str, Any], emit) -> Dict[str, Any]:
+    plan = inputs["plan"]
+    if plan:
+        return {k: plan[k] for k in ("table_name", "instruction_prompt", "prompt_name")}
+    table_name, instruction_prompt, prompt_name = await select_table_and_prompt(inputs["completed_query"])
+    return {"table_name": table_name, "instruction_prompt": instruction_prompt, "prompt_name": prompt_name}
+
+
+async def _stage_greeting(inputs: Dict[str, Any], emit) -> Dict[str, Any]:
+    set_llm_prompt_name(inputs["prompt_name"])
+    logger.info("Handling a greeting or general question, bypassing data pipeline.")
+    request_id = inputs["request_id"]
+    jakarta_tz = pytz.timezone("Asia/Jakarta")
+    current_time_str = datetime.now(jakarta_tz).strftime('%A, %d %B %Y, %H:%M %Z')
+    time_aware_prompt = inputs["instruction_prompt"].replace('{current_time}', current_time_str)
+
+    greeting_response = await telkomllm_greeting_and_general(
+        prompt=time_aware_prompt,
+        user_query=inputs["completed_query"],
+        stream=True if request_id else False,
+        stream_callback=_make_stream_callback(request_id)
+    )
+    _emit_text_chunk(request_id, "", is_final=True)
+    return {"greeting_text": str(greeting_response)}
+
+
+async def _stage_schema(inputs: Dict[str, Any], emit) -> Dict[str, Any]:
+    column_list, first_row = await asyncio.to_thread(get_schema_and_sample, inputs["table_name"])
+    return {"column_list": column_list, "first_row": first_row}
+
+
+async def _stage_sql(inputs: Dict[str, Any], emit) -> Dict[str, Any]:
+    set_llm_prompt_name(inputs["prompt_name"])
+    if settings.sql_templates_enabled:
+        template_sql = render_sql_template(inputs["prompt_name"], inputs["completed_query"])
+        if template_sql:
+            logger.info(f"[Agentic] SQL from template '{inputs['prompt_name']}': {template_sql}")
+            return {"generated_sql": template_sql, "sql_source": "template", "sql_cache_key": None}
+
+    cache_key = None
+    if settings.sql_cache_enabled:
+        cache_key = sql_cache_key(inputs["completed_query"], inputs["prompt_name"], inputs["table_name"],
+                                  inputs["column_list"])
+        cached_sql = None if inputs["bypass_cache"] else lookup_sql(cache_key)
+        if cached_sql:
+            logger.info(f"[SQLCache] hit for '{cache_key[0]}': {cached_sql}")
+            return {"generated_sql": cached_sql, "sql_source": "cache", "sql_cache_key": cache_key}
+
+    generated_sql = await generate_and_validate_sql(
+        table_name=inputs["table_name"], columns_list=inputs["column_list"], first_row=inputs["first_row"],
+        user_query=inputs["completed_query"], instruction_prompt=inputs["instruction_prompt"]
+    )
+    return {"generated_sql": generated_sql, "sql_source": "llm", "sql_cache_key": cache_key}
+
+
+async def _stage_query(inputs: Dict[str, Any], emit) -> Dict[str, Any]:
+    """Run the SQL; only SQL that returned rows is kept in the SQL cache."""
+    set_llm_prompt_name(inputs["prompt_name"])
+    key = inputs["sql_cache_key"]
+    try:
+        rows, executed_sql = await execute_sql_query(inputs["generated_sql"], inputs["column_list"])
+    except Exception:
+        if key:
+            forget_sql(key)
+        raise
+    if key:
+        if not rows:
+            forget_sql(key)
+        elif inputs["sql_source"] != "cache" or executed_sql != inputs["generated_sql"]:
+            remember_sql(key, executed_sql)
+    return {"rows": rows}
+
+
+async def _stage_table(inputs: Dict[str, Any], emit) -> Dict[str, Any]:
+    """Prepare display rows and send table data first (before streaming text)."""
+    intent_dict = inputs["intent"]
+    display_rows = _clean_rows_for_display(inputs["rows"])
+    data_columns = list(display_rows[0].keys()) if display_rows else []
+
+    if display_rows:
+        table_data_json = json.dumps({
+            "columns": data_columns,
+            "rows": display_rows,
+            "wantsSimplifiedNumbers": intent_dict.get("wants_simplified_numbers", True)
+        })
+        emit("table_ready", "completed", "Tabel data siap ditampilkan", details=table_data_json)
+    return {"data_rows": display_rows, "data_columns": data_columns}
+
+
+async def _stage_insight(inputs: Dict[str, Any], emit) -> Dict[str, Any]:
+    set_llm_prompt_name(inputs["prompt_name"])
+    request_id = inputs["request_id"]
+    intent_dict = inputs["intent"]
+
+    if not intent_dict.get("wants_text", True):
+        logger.info("User requested no text output (wants_text=False). Skipping insight generation.")
+        insight_text = "Berikut adalah data yang Anda minta."
+        # Emit final chunk to close stream
+        _emit_text_chunk(request_id, insight_text, is_final=True)
+        emit("insight", "completed", "Insight teks dilewati (sesuai permintaan)")
+        return {"insight_text": insight_text}
+
+    emit("insight", "in_progress", "Menghasilkan insight dari data...")
+    insight_text = await generate_insight(
+        table_name=inputs["table_name"], columns_list=inputs["column_list"], table_data=inputs["rows"],
+        user_query=inputs["completed_query"], instruction_prompt=inputs["instruction_prompt"],
+        intent=intent_dict,
+        stream=True if request_id else False,
+        stream_callback=_make_stream_callback(request_id),
+        prompt_name=inputs["prompt_name"], use_cache=not inputs["bypass_cache"]
+    )
+    _emit_text_chunk(request_id, "", is_final=True)
+    emit("insight", "completed", "Insight teks berhasil dibuat")
+    return {"insight_text": insight_text}
+
+
+async def _stage_chart(inputs: Dict[str, Any], emit) -> Dict[str, Any]:
+    rows, prompt_name = inputs["rows"], inputs["prompt_name"]
+    result = {"chart": None, "chart_type": None, "chart_library": None}
+
+    if not _should_generate_chart(prompt_name, inputs["completed_query"], rows):
+        emit("chart", "completed", "Chart tidak diperlukan untuk query ini")
+        return result
+
+    chart_type = _determine_chart_type(prompt_name, inputs["completed_query"])
+    emit("chart", "in_progress", f"Membuat chart tipe: {chart_type}...")
+    chart_json = await asyncio.to_thread(ChartGenerator.create_trend_chart, rows, chart_type)
+    if chart_json:
+        result.update({"chart": chart_json, "chart_type": chart_type, "chart_library": "plotly"})
+        emit("chart", "completed", f"Chart {chart_type} berhasil dibuat")
+    return result
+
+
+def _is_greeting(inputs: Dict[str, Any]) -> bool:
+    return inputs["prompt_name"] == GREETING_PROMPT_NAME
+
+
+INSIGHT_PIPELINE = PipelineExecutor(
+    inputs=("query", "chat_history", "request_id", "bypass_cache"),
+    stages=[
+        Stage("plan", _stage_plan,
+              inputs=("query", "chat_history"), outputs=("plan", "planning_mode")),
+        Stage("context", _stage_context,
+              inputs=("query", "chat_history", "plan"), outputs=("completed_query",),
+              step="context_completion", start_message="Memahami konteks pertanyaan...",
+              done_message=lambda out: f"Pertanyaan diproses: {out['completed_query']}"),
+        Stage("intent", _stage_intent,
+              inputs=("completed_query", "plan"), outputs=("intent",),
+              step="intent", start_message="Mengenali intent...", done_message="Intent berhasil dikenali"),
+        Stage("select", _stage_select,
+              inputs=("completed_query", "plan"), outputs=("table_name", "instruction_prompt", "prompt_name"),
+              step="table_selection", start_message="Memilih tabel dan prompt...",
+              done_message=lambda out: f"Tabel terpilih: {out['table_name']}"),
+        Stage("greeting", _stage_greeting,
+              inputs=("completed_query", "instruction_prompt", "prompt_name", "request_id"), outputs=("greeting_text",),
+              when=_is_greeting,
+              step="greeting", start_message="Memproses sapaan...", done_message="Respon sapaan berhasil dibuat"),
+        Stage("schema", _stage_schema,
+              inputs=("table_name", "prompt_name"), outputs=("column_list", "first_row"),
+              fields=DATA_FIELDS, when=lambda inputs: not _is_greeting(inputs),
+              step="schema", start_message="Mengambil skema data...", done_message="Skema data berhasil diambil"),
+        Stage("sql", _stage_sql,
+              inputs=("table_name", "column_list", "first_row", "completed_query", "instruction_prompt", "prompt_name",
+                      "bypass_cache"),
+              outputs=("generated_sql", "sql_source", "sql_cache_key"), fields=DATA_FIELDS,
+              step="sql", start_message="Membuat SQL query...",
+              done_message=lambda out: (
+                  "SQL query berhasil dibuat dari template" if out["sql_source"] == "template"
+                  else "SQL query diambil dari cache" if out["sql_source"] == "cache"
+                  else "SQL query berhasil dibuat"
+              )),
+        Stage("query", _stage_query,
+              inputs=("generated_sql", "column_list", "prompt_name", "sql_source", "sql_cache_key"), outputs=("rows",),
+              fields=DATA_FIELDS,
+              defaults={"rows": []},
+              step="query", start_message="Menjalankan query ke database...",
+              done_message=lambda out: f"Query berhasil - {len(out['rows'])} baris data ditemukan"),
+        Stage("table", _stage_table,
+              inputs=("rows", "intent"), outputs=("data_rows", "data_columns"),
+              fields={"dataRows"}, when=lambda inputs: inputs["intent"].get("wants_table", False),
+              defaults={"data_rows": [], "data_columns": []}),
+        Stage("insight", _stage_insight,
+              inputs=("table_name", "column_list", "rows", "completed_query", "instruction_prompt", "prompt_name",
+                      "intent", "request_id", "bypass_cache"),
+              outputs=("insight_text",), fields={"output"},
+              defaults={"insight_text": "Data berhasil diambil."}),
+        Stage("chart", _stage_chart,
+              inputs=("rows", "intent", "prompt_name", "completed_query"),
+              outputs=("chart", "chart_type", "chart_library"),
+              fields={"chart"}, when=lambda inputs: inputs["intent"].get("wants_chart", False),
+              step="chart", start_message="Memeriksa kelayakan chart..."),
+    ],
+)
+
+
+async def get_insight_logic(
+    query: str,
+    chat_history: Optional[str],
+    requested_fields: List[str],
+    request_id: Optional[str] = None,
+    experiment: Optional[str] = None,
+    bypass_cache: bool = False
+) -> Dict[str, Any]:
+    """
+    Main agent logic, run as the INSIGHT_PIPELINE stage graph:
+    plan -> context -> (intent || select) -> schema -> sql -> query -> (table || insight || chart),
+    with the greeting branch replacing the data stages for non-data questions.
+    In fused planning mode the plan stage answers context, intent and selection in one call.
+    `experiment` names a set of per-stage LLM profile overrides in settings.llm_experiments.
+    `bypass_cache` skips the SQL and insight cache lookups; fresh results still refresh the caches.
+    Requests for the same normalized question, chat history, fields, experiment and scheduler lane
+    arriving while one runs share that run; each request_id gets all its progress and text stream
+    events. The lane is part of the key because the run keeps the lane of the request that started it.
+    """
+    use_llm_experiment(experiment)
+    if not settings.insight_single_flight_enabled or bypass_cache:
+        return await _run_insight_pipeline(query, chat_history, requested_fields, request_id, bypass_cache)
+
+    key = flight_key(normalize_query(query), hashlib.sha256((chat_history or "").encode()).hexdigest(),
+                     sorted(requested_fields), experiment, bool(request_id), current_llm_lane())
+    fanout = _fanouts_by_key.get(key)
+    if fanout is not None:
+        logger.info(f"[SingleFlight] request {request_id} joins the running insight run for '{query}'")
         if request_id:
-            try:
-                from graphql_schema import emit_text_stream
-                emit_text_stream(request_id, "", is_final=True)
-            except ImportError:
-                pass
-        
-        emit("greeting", "completed", "Respon sapaan berhasil dibuat")
-        return { 
-            "output": str(greeting_response), 
-            "chart": None, 
-            "chart_type": None, 
-            "chart_library": None, 
-            "data_columns": [], 
-            "data_rows": [],
-            "intent": intent_dict
-        }
-
-    # Data Schema Preparation
-    emit("schema", "in_progress", "Mengambil skema data...")
-    column_list, first_row = get_schema_and_sample(table_name)
-    emit("schema", "completed", "Skema data berhasil diambil")
-
-
-    insight_text = ""
-    last_rows: List[Dict[str, Any]] = []
-    step_count = 0
-
-    agent_state = {"action": "Continue", "action_input": completed_query, "final_answer": ""}
-
-    while agent_state["action"] != "Final Answer":
-        if step_count >= MAX_AGENT_STEPS:
-            logger.warning(f"[Agentic] Reached MAX_AGENT_STEPS. Forcing final answer.")
-            agent_state["final_answer"] = insight_text or "Proses mencapai batas maksimal, tidak ada insight yang dapat dihasilkan."
-            break
+            fanout.attach(request_id)
+    else:
+        fanout = _EventFanout(request_id)
+        _fanouts_by_key[key] = fanout
+        if request_id:
+            _fanouts_by_request[request_id] = fanout
 
-        # If the insight already exists, do not process or reason further
-        if insight_text:
-            logger.debug("[Agentic] Insight text is ready. Bypassing agent thought process.")
-            agent_state = { "action": "Final Answer", "action_input": "", "final_answer": insight_text }
-            continue
+    async def run() -> Dict[str, Any]:
+        try:
+            return await _run_insight_pipeline(query, chat_history, requested_fields, request_id, bypass_cache)
+        finally:
+            _fanouts_by_key.pop(key, None)
+            _fanouts_by_request.pop(request_id, None)
 
-        action_input = agent_state.get("action_input") or completed_query
+    result, _ = await _insight_flights.run(key, run)
+    return dict(result)
 
-        emit("sql", "in_progress", "Membuat SQL query...")
-        generated_sql = await generate_and_validate_sql(
-            table_name=table_name, columns_list=column_list, first_row=first_row,
-            user_query=action_input, instruction_prompt=instruction_prompt
-        )
-        emit("sql", "completed", "SQL query berhasil dibuat")
-
-        emit("query", "in_progress", "Menjalankan query ke database...")
-        rows = await execute_sql_query(generated_sql, column_list)
-        emit("query", "completed", f"Query berhasil - {len(rows)} baris data ditemukan")
-        # Create a copy for chart generation (without summary row)
-        last_rows = list(rows)
-
-        # Clean rows for display (remove empty columns like category_l3/l4 if they are null)
-        display_rows = _clean_rows_for_display(rows)
-
-        # Send table data first if requested (before streaming text)
-        if "dataRows" in requested_fields and intent_dict.get("wants_table", False) and display_rows:
-            data_cols = list(display_rows[0].keys()) if display_rows else []
-            table_data_json = json.dumps({
-                "columns": data_cols,
-                "rows": display_rows,
-                "wantsSimplifiedNumbers": intent_dict.get("wants_simplified_numbers", True)
-            })
-            emit("table_ready", "completed", "Tabel data siap ditampilkan", details=table_data_json)
-
-        if "output" in requested_fields:
-            if intent_dict.get("wants_text", True):
-                emit("insight", "in_progress", "Menghasilkan insight dari data...")
-                
-                # Define streaming callback
-                async def stream_callback(chunk: str):
-                    try:
-                        from graphql_schema import emit_text_stream
-                        emit_text_stream(request_id, chunk, is_final=False)
-                    except ImportError:
-                        pass
-                
-                insight_text = await generate_insight(
-                    table_name=table_name, columns_list=column_list, table_data=rows,
-                    user_query=action_input, instruction_prompt=instruction_prompt,
-                    intent=intent_dict,
-                    stream=True if request_id else False,
-                    stream_callback=stream_callback if request_id else None
-                )
-                
-                # Emit final chunk
-                if request_id:
-                    try:
-                        from graphql_schema import emit_text_stream
-                        emit_text_stream(request_id, "", is_final=True)
-                    except ImportError:
-                        pass
-                
-                emit("insight", "completed", "Insight teks berhasil dibuat")
-            else:
-                logger.info("User requested no text output (wants_text=False). Skipping insight generation.")
-                insight_text = "Berikut adalah data yang Anda minta."
-                
-                # Emit final chunk to close stream
-                if request_id:
-                    try:
-                        from graphql_schema import emit_text_stream
-                        emit_text_stream(request_id, insight_text, is_final=True)
-                    except ImportError:
-                        pass
-                emit("insight", "completed", "Insight teks dilewati (sesuai permintaan)")
-        else:
-            insight_text = "Data berhasil diambil."
-        
-        step_count += 1
-
-    final_output = agent_state.get("final_answer") or insight_text
-
-
-    chart_json, chart_library, chart_type = None, None, None
-    if "chart" in requested_fields and intent_dict.get("wants_chart", False):
-        emit("chart", "in_progress", "Memeriksa kelayakan chart...")
-        if _should_generate_chart(prompt_name_for_chart, completed_query, last_rows):
-            chart_type = _determine_chart_type(prompt_name_for_chart, completed_query)
-            emit("chart", "in_progress", f"Membuat chart tipe: {chart_type}...")
-            chart_json = ChartGenerator.create_trend_chart(last_rows, chart_type)
-            if chart_json:
-                chart_library = "plotly"
-                emit("chart", "completed", f"Chart {chart_type} berhasil dibuat")
-        else:
-            emit("chart", "completed", "Chart tidak diperlukan untuk query ini")
-
-    data_rows_to_send, data_columns_to_send = [], []
-    if "dataRows" in requested_fields and intent_dict.get("wants_table", False) and last_rows:
-        cleaned_last_rows = _clean_rows_for_display(last_rows)
-        data_rows_to_send = cleaned_last_rows
-        if "dataColumns" in requested_fields and cleaned_last_rows:
-            data_columns_to_send = list(cleaned_last_rows[0].keys())
+
+async def _run_insight_pipeline(query: str, chat_history: Optional[str], requested_fields: List[str],
+                                request_id: Optional[str], bypass_cache: bool) -> Dict[str, Any]:
+    def emit(step: str, status: str, message: str, details: Optional[str] = None):
+        _send_event(request_id, "emit_progress", step, status, message, details)
+
+    t0 = time.monotonic()
+    ctx, timings = await INSIGHT_PIPELINE.run(
+        inputs={"query": query, "chat_history": chat_history, "request_id": request_id, "bypass_cache": bypass_cache},
+        requested_fields=requested_fields,
+        emit=emit,
+    )
+    total = time.monotonic() - t0
+    logger.info(
+        f"[Timing] get_insight_logic {total:.2f}s (planning={ctx['planning_mode']}) | "
+        + ", ".join(f"{name}={elapsed:.2f}s" for name, elapsed in timings.items())
+    )
+
+    if ctx.get("prompt_name") == GREETING_PROMPT_NAME:
+        final_output = ctx["greeting_text"]
+    else:
+        final_output = ctx["insight_text"]
+
+    data_columns_to_send = ctx["data_columns"] if "dataColumns" in requested_fields else []
 
     return {
         "output": str(final_output),
-        "chart": chart_json,
-        "chart_type": chart_type,
-        "chart_library": chart_library,
+        "chart": ctx["chart"],
+        "chart_type": ctx["chart_type"],
+        "chart_library": ctx["chart_library"],
         "data_columns": data_columns_to_send,
-        "data_rows": data_rows_to_send,
-        "intent": intent_dict
+        "data_rows": ctx["data_rows"],
+        "intent": ctx["intent"],
+        "planning_mode": ctx["planning_mode"],
+        "sql_source": ctx["sql_source"],
+        "stage_timings": timings,
     }
 
 async def get_topic_logic(chat_history: str) -> str:
@@ -672,17 +1055,15 @@ async def get_intent_logic(query: str) -> Dict[str, bool]:
     """
     logger.info(f"Recognizing intent for query: '{query}'")
 
-    raw_response = await telkomllm_main_agent(
-        agent_prompt=recognize_components_prompt.format(user_query=query),
+    raw_response = await telkomllm_recognize_intent(
+        prompt=recognize_components_prompt,
         user_query=query
     )
-    parsed_intent = _safe_json_loads(raw_response)
-
-    required_keys = ["wants_text", "wants_chart", "wants_table"]
+    parsed_intent = parse_llm_output(raw_response, IntentOutput)
 
-    if parsed_intent and all(k in parsed_intent for k in required_keys):
+    if parsed_intent:
         logger.info(f"Intent recognized: {parsed_intent}")
-        return parsed_intent
+        return parsed_intent.model_dump()
 
     logger.warning("Failed to parse intent from LLM, using fallback defaults.")
     return {
@@ -693,6 +1074,30 @@ async def get_intent_logic(query: str) -> Dict[str, bool]:
     }
 
 
-async def health_check() -> Dict[str, str]:
-    """Return a simple status indicator for health checks."""
-    return {"status": "ok"}
\ No newline at end of file
+async def health_check() -> Dict[str, Any]:
+    """Return a simple status indicator for health checks, with the LLM circuit breaker state."""
+    breaker = get_llm_breaker_stats()
+    return {"status": "ok", "llm_circuit": breaker["state"], "llm_retry_after": breaker["retry_after"]}
+
+
+async def get_metrics(api_key: APIKey = Depends(get_api_key)) -> Dict[str, Any]:
+    """
+    Return in-process LLM call histograms and routing/fast-path counters.
+    Registered as the /metrics endpoint; it requires the API key like every other endpoint.
+    """
+    from cache_warmup import get_warmup_stats
+    return {
+        "llm": get_llm_metrics(),
+        "llm_scheduler": get_llm_scheduler_stats(),
+        "llm_breaker": get_llm_breaker_stats(),
+        "llm_endpoints": get_endpoint_stats(),
+        "llm_budgets": get_token_budget_stats(),
+        "prompt_router": get_prompt_router_stats(),
+        "context_fast_path": get_context_fast_path_stats(),
+        "sql_stream": get_sql_stream_stats(),
+        "sql_cache": get_sql_cache_stats(),
+        "insight_cache": get_insight_cache_stats(),
+        "llm_cache": get_llm_cache_stats(),
+        "single_flight": {"llm": get_llm_single_flight_stats(), "insight": _insight_flights.stats()},
+        "warmup": get_warmup_stats(),
+    }
\ No newline at end of file
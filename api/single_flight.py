@@ -0,0 +1,54 @@
+# app/single_flight.py
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+def flight_key(*parts: Any) -> str:
+    """Hash identifying identical calls."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class SingleFlight:
+    """
+    At most one running call per key: a caller arriving while the call for its key runs awaits
+    that call instead of starting its own. The call runs as a task, so a cancelled caller does
+    not cancel it for the others.
+    """
+
+    def __init__(self):
+        self.in_flight: Dict[str, asyncio.Task] = {}
+        self.started = 0
+        self.joined = 0
+
+    def is_running(self, key: str) -> bool:
+        return key in self.in_flight
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Result of fn() or of the running call with the same key, and whether it was shared."""
+        task = self.in_flight.get(key)
+        shared = task is not None
+        if task is None:
+            task = asyncio.ensure_future(self._run(key, fn))
+            task.add_done_callback(_retrieve_exception)
+            self.in_flight[key] = task
+            self.started += 1
+        else:
+            self.joined += 1
+        return await asyncio.shield(task), shared
+
+    async def _run(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            return await fn()
+        finally:
+            self.in_flight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"in_flight": len(self.in_flight), "started": self.started, "joined": self.joined}
+
+
+def _retrieve_exception(task: asyncio.Task) -> None:
+    # Mark the failure as seen; every caller still waiting gets it raised
+    if not task.cancelled():
+        task.exception()
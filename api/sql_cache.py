@@ -0,0 +1,160 @@
+# app/sql_cache.py
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from loguru import logger
+
+from config import settings
+from llm_cache import get_llm_cache, invalidate_llm_cache, write_behind
+
+CacheKey = Tuple[str, str, str, str]
+
+# Stage name of the SQL entries in the on-disk cache shared by the workers (see llm_cache.py)
+SHARED_STAGE = "sql"
+
+
+def normalize_query(query: str) -> str:
+    """Case, unicode form, whitespace and trailing punctuation do not change the SQL of a question."""
+    text = unicodedata.normalize("NFKC", query or "").lower()
+    return re.sub(r"\s+", " ", text).strip().rstrip("?!. ")
+
+
+def data_version(db_path: str, columns_list: List[str]) -> str:
+    """
+    Hash of the table columns and the database file state. A rebuild by insert_xlsx_to_db, in this
+    or another worker, changes the file and so every key built after it.
+    """
+    try:
+        st = os.stat(db_path)
+        file_state = f"{st.st_mtime_ns}:{st.st_size}"
+    except OSError:
+        file_state = "missing"
+    return hashlib.sha1(f"{file_state}|{','.join(columns_list)}".encode()).hexdigest()[:16]
+
+
+class SQLCache:
+    """LRU cache of generated SQL with a time to live per entry."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: "OrderedDict[CacheKey, Tuple[float, str]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.shared_hits = 0
+
+    def get(self, key: CacheKey) -> Optional[str]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                del self.entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: CacheKey, sql: str) -> None:
+        with self.lock:
+            self.entries[key] = (time.monotonic(), sql)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key: CacheKey) -> None:
+        with self.lock:
+            if self.entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> int:
+        with self.lock:
+            count = len(self.entries)
+            self.entries.clear()
+            self.invalidations += count
+            return count
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "shared_hits": self.shared_hits,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+_cache: Optional[SQLCache] = None
+
+
+def get_sql_cache() -> SQLCache:
+    global _cache
+    if _cache is None:
+        _cache = SQLCache(settings.sql_cache_max_entries, settings.sql_cache_ttl)
+    return _cache
+
+
+def sql_cache_key(user_query: str, prompt_name: str, table_name: str, columns_list: List[str]) -> CacheKey:
+    return (normalize_query(user_query), prompt_name or "", table_name,
+            data_version(settings.database_api_path, columns_list))
+
+
+def _shared_key(key: CacheKey) -> str:
+    return hashlib.sha256(json.dumps([SHARED_STAGE, *key]).encode()).hexdigest()
+
+
+def lookup_sql(key: CacheKey) -> Optional[str]:
+    """SQL cached for key by this worker, else SQL that ran successfully in any worker (on-disk cache)."""
+    cache = get_sql_cache()
+    sql = cache.get(key)
+    shared = get_llm_cache()
+    if sql is None and shared is not None:
+        sql = shared.get(_shared_key(key))
+        if sql is not None:
+            cache.shared_hits += 1
+            cache.put(key, sql)
+    return sql
+
+
+def remember_sql(key: CacheKey, sql: str) -> None:
+    """Cache SQL that returned rows, here and for the other workers."""
+    get_sql_cache().put(key, sql)
+    shared = get_llm_cache()
+    if shared is not None:
+        write_behind(shared.put, _shared_key(key), SHARED_STAGE, sql)
+
+
+def forget_sql(key: CacheKey) -> None:
+    """Drop the SQL of key everywhere, e.g. after it failed to run or returned no rows."""
+    get_sql_cache().discard(key)
+    shared = get_llm_cache()
+    if shared is not None:
+        write_behind(shared.discard, _shared_key(key))
+
+
+def invalidate_sql_cache(reason: str) -> None:
+    if _cache is not None:
+        count = _cache.clear()
+        logger.info(f"[SQLCache] dropped {count} entries ({reason})")
+    invalidate_llm_cache(SHARED_STAGE, reason)
+
+
+def get_sql_cache_stats() -> Dict[str, Any]:
+    return {"enabled": settings.sql_cache_enabled, **get_sql_cache().stats()}
@@ -0,0 +1,156 @@
+# app/sql_stream.py
+import re
+import time
+from typing import Any, Dict, Optional
+
+from llm_metrics import Histogram, LATENCY_BUCKETS
+
+# Start of the SQL in a completion: a code fence (preferred), or a line starting SQL-shaped text in
+# uppercase (SELECT ... FROM, WITH name AS (), so prose such as "With the table below" is skipped
+_FENCE_START = re.compile(r"^[ \t]*```[A-Za-z]*[ \t]*\r?\n", re.M)
+_SQL_START = re.compile(r"^[ \t]*(?=SELECT\b[^;`]*?\bFROM\b|WITH\s+(?:RECURSIVE\s+)?\w+\s+AS\s*\()", re.M)
+# Lines that may still turn out to start a statement once more of the completion arrives
+_SQL_CANDIDATE = re.compile(r"^[ \t]*(?:SELECT|WITH)\b", re.M)
+FENCE = "```"
+# Characters whose meaning depends on the next two characters ('', --, /*, */, ```)
+_LOOKAHEAD = "'\"`-/*"
+
+# Smoothing factor of the average text length the model writes after the statement
+TAIL_ALPHA = 0.2
+
+# Streamed SQL generation counters, reported by get_sql_stream_stats()
+_stats: Dict[str, Any] = {"streams": 0, "early_stops": 0, "tail_chars": None}
+_saved_seconds = Histogram(LATENCY_BUCKETS)
+
+
+class SQLStatementDetector:
+    """
+    Incremental detector of the first complete SQL statement in a streamed completion.
+    The statement ends at a top-level ';' or at a closing code fence; quotes and comments
+    are tracked so a ';' inside a literal does not end it. Each character is scanned once.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.start: Optional[int] = None
+        self.end: Optional[int] = None
+        self.fenced = False
+        self.first_chunk_at: Optional[float] = None
+        self.completed_at: Optional[float] = None
+        self._pos = 0
+        self._quote: Optional[str] = None
+        self._comment: Optional[str] = None
+
+    def feed(self, chunk: str) -> bool:
+        """Add a chunk of the completion; returns True once the statement is complete."""
+        if self.first_chunk_at is None:
+            self.first_chunk_at = time.perf_counter()
+        self.text += chunk
+        if self.end is None:
+            self._scan(final=False)
+            if self.end is not None:
+                self.completed_at = time.perf_counter()
+        return self.end is not None
+
+    def _find_start(self) -> None:
+        match = _FENCE_START.search(self.text, self._pos) or _SQL_START.search(self.text, self._pos)
+        if match is None:
+            # Search again from the first line that may still start a statement, or the unfinished line
+            candidate = _SQL_CANDIDATE.search(self.text, self._pos)
+            self._pos = candidate.start() if candidate else self.text.rfind("\n") + 1
+            return
+        self.fenced = match.group().lstrip().startswith(FENCE)
+        self.start = self._pos = match.end()
+
+    def _scan(self, final: bool) -> None:
+        if self.start is None:
+            self._find_start()
+            if self.start is None:
+                return
+        text, i = self.text, self._pos
+        while i < len(text):
+            ch = text[i]
+            if not final and i + 2 >= len(text) and ch in _LOOKAHEAD:
+                break
+            if self._quote:
+                if ch == self._quote:
+                    if text[i + 1:i + 2] == ch:
+                        i += 1
+                    else:
+                        self._quote = None
+            elif self._comment == "--":
+                if ch == "\n":
+                    self._comment = None
+            elif self._comment == "/*":
+                if text.startswith("*/", i):
+                    self._comment = None
+                    i += 1
+            elif text.startswith(FENCE, i):
+                self.end = i
+                return
+            elif ch == ";":
+                self.end = i + 1
+                return
+            elif ch in "'\"`":
+                self._quote = ch
+            elif text.startswith("--", i) or text.startswith("/*", i):
+                self._comment = text[i:i + 2]
+                i += 1
+            i += 1
+        self._pos = i
+
+    def finish(self) -> str:
+        """The first statement, or the best guess when the completion ended without a boundary."""
+        if self.end is None:
+            self._scan(final=True)
+        if self.start is None:
+            return self.text.strip()
+        end = self.end if self.end is not None else len(self.text)
+        return self.text[self.start:end].strip()
+
+    @property
+    def tail_chars(self) -> int:
+        """Length of the text after the statement (what the model wrote beyond it)."""
+        return len(self.text) - self.end if self.end is not None else 0
+
+
+def extract_sql_statement(text: Any) -> Any:
+    """First SQL statement of a complete completion; non-text results are returned unchanged."""
+    if not isinstance(text, str):
+        return text
+    detector = SQLStatementDetector()
+    detector.feed(text)
+    return detector.finish()
+
+
+def record_sql_generation(detector: SQLStatementDetector, streamed: bool, stopped_early: bool) -> Optional[float]:
+    """
+    Count a SQL generation and return the estimated generation time saved by stopping at the
+    statement end: the average tail of completions that ran to the end, at this stream's rate.
+    """
+    if streamed:
+        _stats["streams"] += 1
+    if not stopped_early:
+        tail = detector.tail_chars
+        previous = _stats["tail_chars"]
+        _stats["tail_chars"] = tail if previous is None else TAIL_ALPHA * tail + (1 - TAIL_ALPHA) * previous
+        return None
+
+    _stats["early_stops"] += 1
+    generated = detector.end - detector.start
+    elapsed = detector.completed_at - detector.first_chunk_at
+    if _stats["tail_chars"] is None or elapsed <= 0 or generated <= 0:
+        return None
+    saved = _stats["tail_chars"] * elapsed / generated
+    _saved_seconds.observe(saved)
+    return saved
+
+
+def get_sql_stream_stats() -> Dict[str, Any]:
+    """Return how often SQL streams stopped at the statement end and the estimated time saved."""
+    return {
+        "streams": _stats["streams"],
+        "early_stops": _stats["early_stops"],
+        "avg_tail_chars": round(_stats["tail_chars"], 1) if _stats["tail_chars"] is not None else None,
+        "saved_seconds": _saved_seconds.snapshot(),
+    }
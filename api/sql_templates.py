@@ -0,0 +1,252 @@
+# app/sql_templates.py
+import re
+from typing import Any, Dict, List, Optional
+
+from entity_extractor import extract_entities
+
+TABLE_NAME = "cfu_performance_data"
+LATEST_PERIOD = f"(SELECT MAX(period) FROM {TABLE_NAME})"
+LAST_6_PERIODS = f"(SELECT MIN(period) FROM (SELECT DISTINCT period FROM {TABLE_NAME} ORDER BY period DESC LIMIT 6))"
+METRIC_ORDER = ["REVENUE", "COE", "EBITDA", "EBIT", "EBT", "NET INCOME"]
+METRIC_ORDER_CASE = (
+    "CASE l2 " + " ".join(f"WHEN '{m}' THEN {i}" for i, m in enumerate(METRIC_ORDER, start=1)) + " ELSE 7 END"
+)
+
+DIVS: List[str] = ["DMT", "DWS", "TELIN", "TIF", "TSAT"]
+
+# Question types the templates cannot express; their presence sends the question to the LLM
+UNSUPPORTED_PATTERN = re.compile(
+    r"(?<!\w)(?:l3|l4|l5|l6|produk|product|prev(?:ious)? month|ytd|terakhir|last|wins|per produk|segmen|"
+    r"kenapa|mengapa|why|penyebab|proporsi|porsi|"
+    # Periods other than months and measures other than actuals, which the templates would silently drop
+    r"semester|kuartal|kuarter|triwulan|quarters?|q[1-4]|\d+\s*bulan|sejak|since|awal tahun|"
+    r"target|achievement|ach|capaian|pencapaian)(?!\w)"
+)
+# Period ranges ("Januari 2025 sampai Maret 2025"); only expressible when both ends are named periods
+RANGE_PATTERN = re.compile(r"(?<!\w)(?:sampai|hingga|s/d|until)(?!\w)")
+# Comparisons of separate periods ("Juli 2024 vs Juli 2025"); a range template would turn them into a trend
+COMPARISON_PATTERN = re.compile(r"(?<!\w)(?:vs|versus|dibanding(?:kan)?|bandingkan|perbandingan|compared?|comparison)(?!\w)")
+BREAKDOWN_PATTERN = re.compile(r"(?<!\w)(?:detail|breakdown|per unit|per div|per divisi|setiap unit|masing-masing)(?!\w)")
+
+
+def resolve_entities(query: str) -> Optional[Dict[str, Any]]:
+    """
+    Resolve division, metrics and periods from the query with the entity extractor.
+    Returns None when anything is ambiguous, so the caller falls back to the LLM.
+    """
+    text = re.sub(r"\s+", " ", (query or "").lower())
+    if UNSUPPORTED_PATTERN.search(text) or COMPARISON_PATTERN.search(text):
+        return None
+
+    entities = extract_entities(query)
+    if (
+        any(not c["weak"] for c in entities["categories"])
+        or entities["unresolved_months"]
+        or entities["years"]
+        or entities["relative_periods"]
+    ):
+        return None
+    if RANGE_PATTERN.search(text) and len(entities["periods"]) < 2:
+        return None
+
+    return {
+        "divs": [d for d in DIVS if d in entities["divs"]],
+        "cfu_wib": entities["cfu_wib"],
+        "breakdown": BREAKDOWN_PATTERN.search(text) is not None,
+        "metrics": [m for m in METRIC_ORDER if m in entities["metrics"]],
+        "periods": entities["periods"],
+    }
+
+
+class SqlTemplate:
+    """Parameterized version of the reference SQL pattern of one instruction prompt."""
+
+    def __init__(self, prompt_name: str, sql: str, period_mode: str, default_metrics: bool = True,
+                 fixed_metric: Optional[str] = None):
+        self.prompt_name = prompt_name
+        self.sql = sql
+        self.period_mode = period_mode          # "single" or "range"
+        self.default_metrics = default_metrics  # all six L2 metrics when none is named
+        self.fixed_metric = fixed_metric
+
+    def slots(self, entities: Dict[str, Any]) -> Optional[Dict[str, str]]:
+        """Named slot values for the resolved entities, or None when the template does not fit."""
+        divs, periods, metrics = entities["divs"], entities["periods"], entities["metrics"]
+
+        if len(divs) > 1 or (divs and entities["cfu_wib"]) or (not divs and not entities["cfu_wib"]):
+            return None
+        if divs:
+            div_select, div_filter, div_group = "div", f"AND div = '{divs[0]}'", "div, "
+        elif entities["breakdown"]:
+            div_select, div_filter, div_group = "div", "", "div, "
+        else:
+            div_select, div_filter, div_group = "'CFU WIB' AS div", "", ""
+
+        if self.period_mode == "single":
+            if len(periods) > 1:
+                return None
+            period_filter = f"period = {periods[0]}" if periods else f"period = {LATEST_PERIOD}"
+        else:
+            if len(periods) == 1:
+                return None
+            period_filter = f"period BETWEEN {periods[0]} AND {periods[-1]}" if periods else f"period >= {LAST_6_PERIODS}"
+
+        if self.fixed_metric:
+            if metrics and metrics != [self.fixed_metric]:
+                return None
+            metrics = [self.fixed_metric]
+        elif not metrics:
+            if not self.default_metrics:
+                return None
+            metrics = METRIC_ORDER
+        metric_filter = f"l2 = '{metrics[0]}'" if len(metrics) == 1 else "l2 IN (" + ", ".join(f"'{m}'" for m in metrics) + ")"
+
+        return {
+            "table": TABLE_NAME,
+            "div_select": div_select,
+            "div_filter": div_filter,
+            "div_group": div_group,
+            "div_group_trailing": f", {div_group.rstrip(', ')}" if div_group else "",
+            "period_filter": period_filter,
+            "metric_filter": metric_filter,
+            "metric_order": METRIC_ORDER_CASE,
+        }
+
+    def render(self, entities: Dict[str, Any]) -> Optional[str]:
+        slots = self.slots(entities)
+        if slots is None:
+            return None
+        sql = self.sql.format(**slots)
+        return re.sub(r"\n\s*\n", "\n", sql).strip()
+
+
+# Reference patterns of lib/cfu_prompt.py as templates, keyed by prompt name
+SQL_TEMPLATES: Dict[str, SqlTemplate] = {
+    t.prompt_name: t for t in [
+        SqlTemplate(
+            "CFU Monthly Performance Analysis",
+            """
+SELECT
+    {div_select},
+    period,
+    l2,
+    l3,
+    l4,
+    SUM(real_mtd) AS real_mtd,
+    ROUND(AVG(ach_mtd), 2) AS ach_mtd,
+    ROUND(AVG(mom), 2) AS mom,
+    SUM(real_ytd) AS real_ytd,
+    ROUND(AVG(ach_ytd), 2) AS ach_ytd,
+    ROUND(AVG(yoy), 2) AS yoy
+FROM {table}
+WHERE {period_filter}
+    {div_filter}
+    AND {metric_filter}
+    AND l3 = '-'
+GROUP BY period, {div_group}l2, l3, l4
+ORDER BY {metric_order};
+""",
+            period_mode="single",
+        ),
+        SqlTemplate(
+            "CFU Trend Analysis",
+            """
+SELECT
+    {div_select},
+    period,
+    l2,
+    l3,
+    l4,
+    SUM(real_mtd) AS real_mtd
+FROM {table}
+WHERE {period_filter}
+    {div_filter}
+    AND {metric_filter}
+    AND l3 = '-'
+GROUP BY period, {div_group}l2, l3, l4
+ORDER BY period ASC, {metric_order};
+""",
+            period_mode="range",
+        ),
+        SqlTemplate(
+            "CFU Comparison Trend Analysis",
+            """
+SELECT
+    {div_select},
+    period,
+    l2,
+    l3,
+    l4,
+    SUM(real_mtd) AS real_mtd,
+    SUM(target_mtd) AS target_mtd,
+    SUM(prev_year) AS prev_year
+FROM {table}
+WHERE {period_filter}
+    {div_filter}
+    AND {metric_filter}
+    AND l3 = '-'
+GROUP BY period, {div_group}l2, l3, l4
+ORDER BY period ASC, {metric_order};
+""",
+            period_mode="range",
+        ),
+        SqlTemplate(
+            "CFU External Revenue Analysis",
+            """
+SELECT
+    {div_select},
+    period,
+    l3,
+    l4,
+    SUM(real_mtd) AS real_mtd,
+    SUM(real_ytd) AS real_ytd,
+    ROUND(AVG(ach_mtd), 2) AS ach_mtd,
+    ROUND(AVG(ach_ytd), 2) AS ach_ytd,
+    ROUND(AVG(mom), 2) AS mom,
+    ROUND(AVG(yoy), 2) AS yoy
+FROM {table}
+WHERE {period_filter}
+    {div_filter}
+    AND (l3 LIKE '%External%' OR l4 LIKE '%External%')
+    AND l5 = '-'
+GROUP BY period, {div_group}l3, l4
+ORDER BY real_mtd DESC;
+""",
+            period_mode="single", fixed_metric="REVENUE",
+        ),
+        SqlTemplate(
+            "CFU External Revenue Trend Analysis",
+            """
+SELECT
+    {div_select},
+    period,
+    SUM(real_mtd) AS real_mtd,
+    SUM(target_mtd) AS target_mtd,
+    SUM(prev_year) AS prev_year
+FROM {table}
+WHERE {period_filter}
+    {div_filter}
+    AND {metric_filter}
+    AND (l3 LIKE '%External%' OR l4 LIKE '%External%')
+    AND l5 = '-'
+GROUP BY period{div_group_trailing}
+ORDER BY period ASC;
+""",
+            period_mode="range", fixed_metric="REVENUE",
+        ),
+    ]
+}
+
+
+def render_sql_template(prompt_name: str, user_query: str) -> Optional[str]:
+    """
+    Fill the template of prompt_name from the entities in user_query.
+    Returns None when there is no template or the entities are not resolved with confidence.
+    """
+    template = SQL_TEMPLATES.get(prompt_name)
+    if template is None:
+        return None
+    entities = resolve_entities(user_query)
+    if entities is None:
+        return None
+    return template.render(entities)
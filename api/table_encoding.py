@@ -0,0 +1,63 @@
+# app/table_encoding.py
+import re
+from typing import Any, Dict, List, Optional
+
+SEPARATOR = "|"
+# Numbers at or above this magnitude (rupiah amounts) are sent as integers, smaller ones
+# keep ROUND_DECIMALS decimals
+INTEGER_THRESHOLD = 1e6
+ROUND_DECIMALS = 2
+
+
+def _format_value(value: Any) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, bool):
+        return str(value)
+    if isinstance(value, float):
+        if abs(value) >= INTEGER_THRESHOLD:
+            return str(int(round(value)))
+        text = f"{value:.{ROUND_DECIMALS}f}".rstrip("0").rstrip(".")
+        return "0" if text == "-0" else text
+    return str(value).replace(SEPARATOR, "/").replace("\n", " ")
+
+
+def _is_measure_column(rows: List[Dict[str, Any]], column: str) -> bool:
+    """Float columns are measures; text and integer columns (period, counts) describe the row."""
+    return any(isinstance(row.get(column), float) for row in rows)
+
+
+def prune_columns(columns: List[str], rows: List[Dict[str, Any]], *texts: Optional[str]) -> List[str]:
+    """
+    Keep the descriptive columns and the measure columns named in `texts` (instruction prompt,
+    question). All columns are kept when none of the measures is named.
+    """
+    mentioned = " ".join(t for t in texts if t).lower()
+    measures = [c for c in columns if _is_measure_column(rows, c)]
+    named = {c for c in measures if re.search(rf"\b{re.escape(c.lower())}\b", mentioned)}
+    if measures and not named:
+        return columns
+    return [c for c in columns if c not in measures or c in named]
+
+
+def encode_table(rows: List[Dict[str, Any]], columns: Optional[List[str]] = None) -> str:
+    """
+    Compact text form of query rows for the LLM: a header line and one '|'-separated line per
+    row, numbers rounded, and columns holding the same value on every row stated once.
+    """
+    if not rows:
+        return "(no rows)"
+    columns = columns or list(rows[0].keys())
+    formatted = [[_format_value(row.get(c)) for c in columns] for row in rows]
+
+    constant = []
+    if len(rows) > 1:
+        constant = [i for i in range(len(columns)) if all(r[i] == formatted[0][i] for r in formatted)]
+    varying = [i for i in range(len(columns)) if i not in constant] or list(range(len(columns)))
+
+    lines = [f'Columns separated by "{SEPARATOR}", one row per line ({len(rows)} rows).']
+    if constant and len(varying) < len(columns):
+        lines.append("Same on every row: " + ", ".join(f"{columns[i]}={formatted[0][i]}" for i in constant))
+    lines.append(SEPARATOR.join(columns[i] for i in varying))
+    lines.extend(SEPARATOR.join(r[i] for i in varying) for r in formatted)
+    return "\n".join(lines)
@@ -0,0 +1,92 @@
+# tests/conftest.py
+import json
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("X_API_KEY", "test")
+os.environ.setdefault("URL_CUSTOM_LLM", "http://127.0.0.1")
+os.environ.setdefault("TOKEN_CUSTOM_LLM", "test")
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+os.environ.setdefault("WARMUP_ENABLED", "false")
+
+from config import settings  # noqa: E402
+
+COLUMNS = ("div", "period", "l2", "l3", "l4", "l5", "l6", "real_mtd", "target_mtd", "prev_year", "ach_mtd", "mom",
+           "real_ytd", "ach_ytd", "yoy", "prev_month")
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Small cfu_performance_data table, set as settings.database_api_path."""
+    path = str(tmp_path / "cfu.db")
+    conn = sqlite3.connect(path)
+    conn.execute(f"CREATE TABLE cfu_performance_data ({', '.join(COLUMNS)})")
+    for period in (202501, 202502, 202503):
+        for div in ("DWS", "TELIN"):
+            conn.execute(
+                f"INSERT INTO cfu_performance_data VALUES ({', '.join('?' * len(COLUMNS))})",
+                (div, period, "REVENUE", "-", "-", "-", "-", 100.0 + period % 10, 110.0, 90.0, 95.0, 1.5,
+                 300.0, 97.0, 2.0, 99.0),
+            )
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(settings, "database_api_path", path)
+    return path
+
+
+class FakeLLM:
+    """Canned answers for the telkomllm_* functions used by routes, and the names of the calls made."""
+
+    def __init__(self):
+        self.calls = []
+        self.prompt = "CFU Trend Analysis"
+        self.answers = {
+            "telkomllm_main_agent": json.dumps({"action": "Continue", "action_input": "", "final_answer": ""}),
+            "telkomllm_recognize_intent": json.dumps({"wants_text": True, "wants_chart": False, "wants_table": True,
+                                                      "wants_simplified_numbers": True}),
+            "telkomllm_plan": "not json",
+            "telkomllm_select_table": lambda: json.dumps({"table_name": "cfu_performance_data", "prompt": self.prompt}),
+            "telkomllm_generate_sql": "SELECT div, period, l2, real_mtd FROM cfu_performance_data ORDER BY period;",
+            "telkomllm_fix_sql": "SELECT div, period, l2, real_mtd FROM cfu_performance_data ORDER BY period;",
+            "telkomllm_infer_sql": "Revenue DWS naik stabil.",
+            "telkomllm_greeting_and_general": "Halo! Ada yang bisa saya bantu?",
+        }
+
+    def function(self, name):
+        async def call(*args, stream=False, stream_callback=None, **kwargs):
+            self.calls.append(name)
+            answer = self.answers[name]
+            text = answer() if callable(answer) else answer
+            if stream and stream_callback:
+                await stream_callback(text)
+            return text
+        return call
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """Replace the LLM calls made by routes with FakeLLM answers."""
+    import routes
+
+    fake = FakeLLM()
+    for name in fake.answers:
+        monkeypatch.setattr(routes, name, fake.function(name))
+    return fake
+
+
+@pytest.fixture(autouse=True)
+def reset_caches(monkeypatch):
+    """Fresh in-process caches and learned token budgets for every test; budgets are never saved."""
+    import insight_cache
+    import llm_budget
+    import sql_cache
+
+    monkeypatch.setattr(sql_cache, "_cache", None)
+    monkeypatch.setattr(insight_cache, "_cache", None)
+    monkeypatch.setattr(llm_budget, "_budgets", None)
+    monkeypatch.setattr(llm_budget, "_last_save", None)
+    monkeypatch.setattr(settings, "planning_mode", "split")
@@ -0,0 +1,32 @@
+# tests/test_cache_warmup.py
+import asyncio
+
+import cache_warmup
+import llm_cache
+from config import settings
+
+
+def test_only_the_lease_holder_warms(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "_cache", None)
+    monkeypatch.setattr(settings, "llm_cache_enabled", True)
+    monkeypatch.setattr(settings, "llm_cache_path", str(tmp_path / "llm_cache.db"))
+
+    assert cache_warmup.hold_warmup_lease()
+    monkeypatch.setattr(cache_warmup, "WARMUP_OWNER", "other-host:1")
+    assert not cache_warmup.hold_warmup_lease()
+
+
+def test_every_worker_warms_without_the_shared_cache(monkeypatch):
+    monkeypatch.setattr(settings, "llm_cache_enabled", False)
+    assert cache_warmup.hold_warmup_lease()
+
+
+def test_run_warmup_reports_coverage(temp_db, fake_llm, monkeypatch):
+    fake_llm.prompt = "CFU Top Revenue Contributing Products Analysis"
+    monkeypatch.setattr(settings, "warmup_questions", ["Tampilkan produk penyumbang revenue terbesar unit DWS"])
+    monkeypatch.setattr(settings, "warmup_questions_path", None)
+
+    report = asyncio.run(cache_warmup.run_warmup("test"))
+
+    assert report["warmed"] == 1 and report["coverage"] == 1.0
+    assert report["results"][0]["sql_source"] == "llm"
@@ -0,0 +1,15 @@
+# tests/test_database.py
+from database import insert_xlsx_to_db
+from insight_cache import get_insight_cache
+from sql_cache import get_sql_cache
+
+
+def test_rebuild_drops_the_sql_and_insight_caches(tmp_path):
+    get_sql_cache().put(("q", "p", "t", "v"), "SELECT 1;")
+    get_insight_cache().put(("q", "p", "h", True), "insight")
+
+    insert_xlsx_to_db(str(tmp_path), str(tmp_path / "db" / "cfu.db"),
+                      [{"table_name": "cfu_performance_data", "sources": [{"file_name": "missing.xlsx"}]}])
+
+    assert get_sql_cache().stats()["entries"] == 0
+    assert get_insight_cache().stats()["entries"] == 0
@@ -0,0 +1,42 @@
+# tests/test_entity_extractor.py
+from entity_extractor import EntityExtractor, extract_entities
+
+VALID_VALUES = {
+    "DIV": ["DWS", "TELIN", "TSAT"],
+    "L2_Key_Metrics": ["REVENUE", "EBITDA", "NET INCOME"],
+    "HIERARCHY_REFERENCE": {"L3": ["External Revenue"], "L4": ["Data", "Voice Interconnection"]},
+}
+
+
+def test_divisions_metrics_and_aliases():
+    entities = extract_entities("revenue telkomsat dan DWS juli 2025")
+    assert entities["divs"] == ["TSAT", "DWS"]
+    assert entities["metrics"] == ["REVENUE"]
+    assert entities["periods"] == [202507]
+
+
+def test_relative_periods_resolve_against_the_reference_period():
+    entities = extract_entities("Laba bersih CFU WIB bulan lalu", reference_period=202501)
+    assert entities["cfu_wib"] and entities["metrics"] == ["NET INCOME"]
+    assert entities["relative_periods"] == ["previous_month"]
+    assert entities["periods"] == [202412]
+
+
+def test_months_without_a_year_and_bare_years_are_reported():
+    entities = extract_entities("revenue DWS Mei - Juli 2025 dan 2024")
+    assert entities["periods"] == [202507]
+    assert entities["unresolved_months"] == ["mei"]
+    assert entities["years"] == [2024]
+
+
+def test_longest_match_wins_and_single_common_words_are_weak():
+    extractor = EntityExtractor(VALID_VALUES)
+    categories = extractor.extract("external revenue dan data voice interconnection")["categories"]
+    assert [(c["value"], c["weak"]) for c in categories] == [
+        ("External Revenue", False), ("Data", True), ("Voice Interconnection", False),
+    ]
+
+
+def test_nya_suffix_is_stripped_from_known_entities():
+    extractor = EntityExtractor(VALID_VALUES)
+    assert extractor.extract("ebitdanya TELIN")["metrics"] == ["EBITDA"]
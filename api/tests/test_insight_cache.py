@@ -0,0 +1,63 @@
+# tests/test_insight_cache.py
+import asyncio
+import time
+
+import insight_cache
+from config import settings
+from insight_cache import (
+    InsightCache, get_insight_cache, insight_cache_key, invalidate_insight_cache, replay_chunks, replay_insight,
+)
+
+ROWS = [{"div": "DWS", "l2": "REVENUE", "real_mtd": 120.5}]
+
+
+def test_key_depends_on_rows_and_prompt_but_not_query_spelling():
+    key = insight_cache_key(ROWS, "instructions", "CFU Monthly", "Revenue DWS?", False)
+    assert key == insight_cache_key([dict(reversed(list(ROWS[0].items())))], "instructions", "CFU Monthly",
+                                    "  revenue dws ", False)
+    assert key != insight_cache_key(ROWS, "other instructions", "CFU Monthly", "Revenue DWS?", False)
+    assert key != insight_cache_key([{**ROWS[0], "real_mtd": 99}], "instructions", "CFU Monthly", "Revenue DWS?", False)
+    assert key != insight_cache_key(ROWS, "instructions", "CFU Monthly", "Revenue DWS?", True)
+
+
+def test_eviction_is_bounded_by_characters():
+    cache = InsightCache(max_chars=10, ttl=60)
+    cache.put(("a", "", "", False), "aaaa")
+    cache.put(("b", "", "", False), "bbbb")
+    cache.get(("a", "", "", False))
+    cache.put(("c", "", "", False), "cccc")
+    cache.put(("d", "", "", False), "x" * 11)
+
+    assert cache.get(("b", "", "", False)) is None and cache.get(("d", "", "", False)) is None
+    assert cache.get(("a", "", "", False)) == "aaaa"
+    assert cache.stats()["chars"] == 8 and cache.stats()["evictions"] == 1
+
+
+def test_entries_expire():
+    cache = InsightCache(max_chars=100, ttl=0)
+    cache.put(("a", "", "", False), "text")
+    time.sleep(0.001)
+    assert cache.get(("a", "", "", False)) is None
+    assert cache.stats()["expirations"] == 1 and cache.stats()["chars"] == 0
+
+
+def test_replay_keeps_the_text_intact(monkeypatch):
+    text = "**Revenue** DWS naik\n\n- MoM 5%  \n- YoY 7%\n"
+    chunks = replay_chunks(text, 2)
+    assert "".join(chunks) == text and len(chunks) == 5
+
+    monkeypatch.setattr(settings, "insight_cache_replay_delay", 0)
+    received = []
+
+    async def collect(chunk):
+        received.append(chunk)
+
+    asyncio.run(replay_insight(text, collect))
+    assert "".join(received) == text
+
+
+def test_invalidate_drops_all_entries(monkeypatch):
+    monkeypatch.setattr(insight_cache, "_cache", None)
+    get_insight_cache().put(("a", "", "", False), "text")
+    invalidate_insight_cache("test")
+    assert get_insight_cache().stats()["entries"] == 0
@@ -0,0 +1,53 @@
+# tests/test_llm_breaker.py
+import pytest
+
+from llm_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, LLMUnavailableError
+
+
+def make_breaker(**kwargs):
+    options = dict(window_seconds=60, min_calls=4, failure_rate=0.5, slow_call_seconds=10, slow_call_rate=0.8,
+                   open_seconds=30, half_open_calls=2)
+    options.update(kwargs)
+    return CircuitBreaker(**options)
+
+
+def test_opens_at_the_failure_rate_and_fails_fast():
+    breaker = make_breaker()
+    for success in (True, True, False):
+        breaker.record(success, 0.1)
+    assert breaker.state == CLOSED
+
+    breaker.record(False, 0.1)
+    assert breaker.state == OPEN
+    with pytest.raises(LLMUnavailableError) as error:
+        breaker.check()
+    assert error.value.status_code == 503 and "Retry-After" in error.value.headers
+
+
+def test_slow_calls_open_the_circuit():
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record(True, 20.0)
+    assert breaker.state == OPEN
+
+
+def test_half_open_trials_close_or_reopen_the_circuit():
+    breaker = make_breaker(open_seconds=0)
+    for _ in range(4):
+        breaker.record(False)
+    assert breaker.state == OPEN
+
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    breaker.before_call()
+    with pytest.raises(LLMUnavailableError):
+        breaker.before_call()
+    breaker.record(True, 0.1)
+    breaker.record(True, 0.1)
+    assert breaker.state == CLOSED
+
+    for _ in range(4):
+        breaker.record(False)
+    breaker.before_call()
+    breaker.record(False)
+    assert breaker.state == OPEN
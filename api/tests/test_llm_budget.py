@@ -0,0 +1,120 @@
+# tests/test_llm_budget.py
+import asyncio
+import json
+import os
+import threading
+
+import llm_budget
+import llm_engine
+from config import settings
+from llm_budget import TokenBudgets, flush_token_budgets, save_token_budgets
+
+
+def make_budgets(**kwargs):
+    options = dict(window=10, min_samples=3, percentile=1.0, headroom=0.5, min_tokens=8)
+    options.update(kwargs)
+    return TokenBudgets(**options)
+
+
+def test_budget_is_learned_after_min_samples_and_capped():
+    budgets = make_budgets()
+    for tokens in (10, 20):
+        budgets.observe("plan", "p", tokens)
+    assert budgets.budget("plan", "p", 1000) == 1000
+
+    budgets.observe("plan", "p", 40)
+    assert budgets.budget("plan", "p", 1000) == 60
+    assert budgets.budget("plan", "p", 50) == 50
+
+
+def written_files(directory):
+    return sorted(name for name in os.listdir(directory) if not name.endswith(".lock"))
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "budgets.json")
+    budgets = make_budgets()
+    for tokens in (10, 20, 40):
+        budgets.observe("plan", "p", tokens)
+    budgets.save(path)
+
+    loaded = make_budgets()
+    loaded.load(path)
+    assert loaded.budget("plan", "p", 1000) == 60
+    assert written_files(tmp_path) == ["budgets.json"]
+
+
+def test_saves_of_all_workers_are_merged(tmp_path):
+    path = str(tmp_path / "budgets.json")
+    workers = [make_budgets(window=4) for _ in range(8)]
+
+    def run(worker, tokens):
+        for _ in range(3):
+            worker.observe("plan", "p", tokens)
+            worker.observe(f"plan-{tokens}", "p", tokens)
+            worker.save(path)
+
+    threads = [threading.Thread(target=run, args=(worker, i)) for i, worker in enumerate(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    with open(path) as f:
+        samples = {entry["stage"]: entry["completion_tokens"] for entry in json.load(f)["samples"]}
+    assert all(samples[f"plan-{i}"] == [i, i, i] for i in range(8))
+    assert len(samples["plan"]) == 4
+    assert written_files(tmp_path) == ["budgets.json"]
+
+
+def test_save_runs_in_a_worker_thread_on_the_loop(tmp_path, monkeypatch):
+    path = str(tmp_path / "budgets.json")
+    monkeypatch.setattr(settings, "llm_budget_path", path)
+    budgets = make_budgets()
+    budgets.observe("plan", "p", 10)
+    monkeypatch.setattr(llm_budget, "_budgets", budgets)
+    monkeypatch.setattr(llm_budget, "_last_save", 0.0)
+
+    async def main():
+        save_token_budgets(force=True)
+        assert llm_budget._saves
+        await flush_token_budgets()
+
+    asyncio.run(main())
+    assert os.path.exists(path)
+
+
+def test_streamed_sql_uses_the_learned_budget_and_retries_a_cut_off(monkeypatch):
+    budgets = make_budgets()
+    for tokens in (10, 10, 10):
+        budgets.observe("generate_sql", "p", tokens)
+    payloads, chunks = [], []
+
+    async def stream_call(url, token, payload, callback, stage=None):
+        payloads.append(payload)
+        await callback("SELECT div")
+        return "SELECT div"
+
+    async def call(url, token, payload, stage=None):
+        payloads.append(payload)
+        return "SELECT div FROM t;"
+
+    finishes = iter([("length", 15), ("stop", 6)])
+    monkeypatch.setattr(llm_engine, "get_token_budgets", lambda: budgets)
+    monkeypatch.setattr(llm_engine, "get_llm_prompt_name", lambda: "p")
+    monkeypatch.setattr(llm_engine, "make_streaming_api_call", stream_call)
+    monkeypatch.setattr(llm_engine, "make_async_api_call", call)
+    monkeypatch.setattr(llm_engine, "get_last_completion", lambda: next(finishes))
+    monkeypatch.setattr(llm_engine, "save_token_budgets", lambda force=False: None)
+
+    async def on_chunk(chunk):
+        chunks.append(chunk)
+        return False
+
+    result = asyncio.run(llm_engine._call_stage("generate_sql", "prompt", stream=True, stream_callback=on_chunk))
+
+    assert result == "SELECT div FROM t;"
+    assert payloads[0]["max_tokens"] == 15 and payloads[0]["stream"] is True
+    assert payloads[1]["max_tokens"] == settings.llm_stage_profiles["generate_sql"]["max_tokens"]
+    assert payloads[1]["stream"] is False
+    assert budgets.stats()["generate_sql/p"]["truncation_retries"] == 1
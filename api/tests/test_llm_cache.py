@@ -0,0 +1,74 @@
+# tests/test_llm_cache.py
+import asyncio
+import time
+
+import llm_cache
+from llm_cache import LLMResponseCache, cache_key, flush_llm_cache_writes, write_behind
+
+
+def make_cache(tmp_path, **kwargs):
+    return LLMResponseCache(str(tmp_path / "llm_cache.db"), kwargs.pop("ttl", 3600), kwargs.pop("max_bytes", 1 << 20))
+
+
+def test_cache_key_ignores_max_tokens():
+    payload = {"model": "m", "messages": [{"role": "system", "content": "x"}], "temperature": 0}
+    assert cache_key("plan", {**payload, "max_tokens": 10}) == cache_key("plan", {**payload, "max_tokens": 99})
+    assert cache_key("plan", payload) != cache_key("intent", payload)
+
+
+def test_put_get_discard(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("k", "plan", "value")
+    assert cache.get("k") == "value"
+    cache.discard("k")
+    assert cache.get("k") is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_expired_entries_miss_and_are_compacted(tmp_path):
+    cache = make_cache(tmp_path, ttl=10)
+    cache.put("old", "plan", "value")
+    cache._conn().execute("UPDATE llm_cache SET created = ?", (time.time() - 60,))
+    assert cache.get("old") is None
+    assert cache.compact() == 1
+
+
+def test_compact_drops_least_recently_used_above_max_bytes(tmp_path):
+    cache = make_cache(tmp_path, max_bytes=10)
+    for i, key in enumerate(("a", "b", "c")):
+        cache.put(key, "plan", "12345")
+        cache._conn().execute("UPDATE llm_cache SET accessed = ? WHERE key = ?", (i, key))
+    assert cache.compact() == 1
+    assert cache.get("a") is None and cache.get("c") == "12345"
+
+
+def test_write_behind_runs_off_the_event_loop(tmp_path):
+    cache = make_cache(tmp_path)
+
+    async def main():
+        write_behind(cache.put, "k", "plan", "value")
+        assert llm_cache._writes
+        await flush_llm_cache_writes()
+
+    asyncio.run(main())
+    assert cache.get("k") == "value"
+    assert not llm_cache._writes
+
+
+def test_write_behind_without_loop_writes_inline(tmp_path):
+    cache = make_cache(tmp_path)
+    write_behind(cache.put, "k", "plan", "value")
+    assert cache.get("k") == "value"
+
+
+def test_lease_is_held_by_one_owner_until_it_expires(tmp_path):
+    cache = make_cache(tmp_path)
+    assert cache.acquire_lease("job", "worker-1", ttl=60)
+    assert not cache.acquire_lease("job", "worker-2", ttl=60)
+    assert cache.acquire_lease("job", "worker-1", ttl=60)
+
+    cache._conn().execute("UPDATE llm_lease SET expires = ?", (time.time() - 1,))
+    assert cache.acquire_lease("job", "worker-2", ttl=60)
+
+    cache.release_lease("job", "worker-2")
+    assert cache.acquire_lease("job", "worker-1", ttl=60)
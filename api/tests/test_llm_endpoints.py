@@ -0,0 +1,69 @@
+# tests/test_llm_endpoints.py
+import asyncio
+
+import httpx
+
+from config import settings
+from llm_endpoints import EWMA, LEAST_OUTSTANDING, Endpoint, EndpointPool, parse_endpoints
+
+
+def test_parse_endpoints_shares_a_single_token():
+    endpoints = parse_endpoints("http://a, http://b", "token")
+    assert [(e.url, e.token) for e in endpoints] == [("http://a", "token"), ("http://b", "token")]
+    endpoints = parse_endpoints("http://a,http://b", "t1,t2")
+    assert [e.token for e in endpoints] == ["t1", "t2"]
+
+
+def test_least_outstanding_picks_the_idle_replica():
+    a, b = Endpoint("http://a", ""), Endpoint("http://b", "")
+    pool = EndpointPool([a, b], LEAST_OUTSTANDING)
+    a.start()
+    assert pool.pick() is b
+
+
+def test_ewma_prefers_the_faster_replica():
+    a, b = Endpoint("http://a", ""), Endpoint("http://b", "")
+    a.observe(True, 2.0)
+    b.observe(True, 0.1)
+    assert EndpointPool([a, b], EWMA).pick() is b
+
+
+def test_failing_replica_is_ejected_and_retries_avoid_tried_replicas():
+    a, b = Endpoint("http://a", ""), Endpoint("http://b", "")
+    pool = EndpointPool([a, b], LEAST_OUTSTANDING)
+    assert pool.pick(exclude={"http://a"}) is b
+
+    for _ in range(settings.llm_endpoint_eject_failures):
+        a.observe(False, 0.1)
+    assert a.ejected
+    assert all(pool.pick() is b for _ in range(3))
+    assert pool.due_for_probe() == []
+
+    a.readmit()
+    assert not a.ejected
+
+
+def test_retry_goes_to_another_replica(monkeypatch):
+    import llm_breaker
+    import llm_endpoints
+    import llm_engine
+    import llm_scheduler
+
+    hosts = []
+
+    def handler(request):
+        hosts.append(request.url.host)
+        if len(hosts) == 1:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"choices": [{"message": {"content": "ok"}, "finish_reason": "stop"}]})
+
+    monkeypatch.setattr(llm_breaker, "_breaker", None)
+    monkeypatch.setattr(llm_scheduler, "_scheduler", None)
+    monkeypatch.setattr(llm_endpoints, "_pools", {})
+    monkeypatch.setattr(settings, "llm_retry_base_delay", 0.001)
+    monkeypatch.setattr(llm_engine, "get_llm_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+    result = asyncio.run(llm_engine.make_async_api_call("http://a,http://b", "token", {"model": "m"}))
+
+    assert result == "ok"
+    assert len(hosts) == 2 and hosts[0] != hosts[1]
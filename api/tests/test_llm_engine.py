@@ -0,0 +1,120 @@
+# tests/test_llm_engine.py
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import llm_breaker
+import llm_endpoints
+import llm_engine
+import llm_scheduler
+
+
+@pytest.fixture
+def mock_llm(monkeypatch):
+    """Serve LLM requests from handler(request) -> httpx.Response, with fresh breaker, scheduler and pools."""
+    state = {"handler": None, "requests": []}
+
+    def handle(request):
+        state["requests"].append(request)
+        return state["handler"](request)
+
+    monkeypatch.setattr(llm_breaker, "_breaker", None)
+    monkeypatch.setattr(llm_scheduler, "_scheduler", None)
+    monkeypatch.setattr(llm_endpoints, "_pools", {})
+    monkeypatch.setattr(llm_engine, "_attempt_latency", {})
+    monkeypatch.setattr(llm_engine, "get_llm_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(handle)))
+    return state
+
+
+def completion(content, finish_reason="stop"):
+    return httpx.Response(200, json={"choices": [{"message": {"content": content}, "finish_reason": finish_reason}],
+                                     "usage": {"completion_tokens": 3}})
+
+
+def test_one_pooled_client_is_shared_until_closed(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_engine.settings, "llm_budget_path", str(tmp_path / "budgets.json"))
+
+    async def main():
+        client = await llm_engine.init_llm_client()
+        shared = llm_engine.get_llm_client() is client
+        await llm_engine.close_llm_client()
+        return shared, client.is_closed
+
+    assert asyncio.run(main()) == (True, True)
+
+
+def test_non_streaming_call_returns_the_completion(mock_llm):
+    mock_llm["handler"] = lambda request: completion("hello")
+
+    result = asyncio.run(llm_engine.make_async_api_call("http://llm", "token", {"model": "m", "messages": []}))
+
+    assert result == "hello"
+    assert json.loads(mock_llm["requests"][0].content)["model"] == "m"
+
+
+def test_transient_failures_are_retried(mock_llm, monkeypatch):
+    monkeypatch.setattr(llm_engine.settings, "llm_retry_base_delay", 0.001)
+    responses = iter([httpx.Response(503), completion("recovered")])
+    mock_llm["handler"] = lambda request: next(responses)
+
+    result = asyncio.run(llm_engine.make_async_api_call("http://llm", "token", {"model": "m"}, stage="plan"))
+
+    assert result == "recovered"
+    assert len(mock_llm["requests"]) == 2
+
+
+def test_client_errors_are_not_retried(mock_llm):
+    mock_llm["handler"] = lambda request: httpx.Response(400, text="bad request")
+
+    result = asyncio.run(llm_engine.make_async_api_call("http://llm", "token", {"model": "m"}, stage="plan"))
+
+    assert result == {"error": "API call failed with status 400"}
+    assert len(mock_llm["requests"]) == 1
+
+
+def test_slow_routing_call_is_hedged(mock_llm, monkeypatch):
+    monkeypatch.setattr(llm_engine, "_hedge_delay", lambda stage: 0.01)
+    calls = {"count": 0}
+
+    async def handler(request):
+        calls["count"] += 1
+        if calls["count"] == 1:
+            await asyncio.sleep(1.0)
+            return completion("slow")
+        return completion("fast")
+
+    mock_llm["handler"] = handler
+
+    result = asyncio.run(llm_engine.make_async_api_call("http://llm", "token", {"model": "m"}, stage="plan"))
+
+    assert result == "fast"
+    assert calls["count"] == 2
+
+
+def test_stage_profile_and_experiment_overrides(monkeypatch):
+    monkeypatch.setattr(llm_engine.settings, "llm_experiments",
+                        {"small-router": {"select_table": {"model": "small", "url": "http://small"}}})
+
+    async def main():
+        default = llm_engine.get_stage_profile("select_table")
+        llm_engine.use_llm_experiment("small-router")
+        return default, llm_engine.get_stage_profile("select_table"), llm_engine.get_stage_profile("intent")
+
+    default, experiment, other_stage = asyncio.run(main())
+
+    assert default["model"] == llm_engine.settings.llm_default_model and default["url"] == llm_engine.URL_CUSTOM_LLM
+    assert (experiment["model"], experiment["url"]) == ("small", "http://small")
+    assert experiment["max_tokens"] == llm_engine.settings.llm_stage_profiles["select_table"]["max_tokens"]
+    assert other_stage["model"] == llm_engine.settings.llm_default_model
+
+
+def test_stage_profile_is_sent_with_the_call(mock_llm):
+    mock_llm["handler"] = lambda request: completion('{"wants_text": true}')
+
+    asyncio.run(llm_engine._call_stage("intent", "prompt"))
+
+    body = json.loads(mock_llm["requests"][0].content)
+    assert body["max_tokens"] <= llm_engine.settings.llm_stage_profiles["intent"]["max_tokens"]
+    assert body["temperature"] == 0 and body["messages"][0]["content"] == "prompt"
@@ -0,0 +1,54 @@
+# tests/test_llm_metrics.py
+import asyncio
+
+import pytest
+
+from llm_metrics import (
+    Histogram, LATENCY_BUCKETS, get_llm_metrics, instrument_llm_call, note_completion, note_request, note_response,
+    reset_llm_metrics, set_llm_prompt_name,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    reset_llm_metrics()
+    yield
+    reset_llm_metrics()
+
+
+def test_histogram_quantiles_stay_inside_the_observed_range():
+    histogram = Histogram(LATENCY_BUCKETS)
+    for value in (0.2, 0.3, 0.4, 3.0):
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 4 and snapshot["max"] == 3.0
+    assert 0.1 <= snapshot["p50"] <= 0.5
+    assert snapshot["p99"] <= 3.0
+    assert Histogram(LATENCY_BUCKETS).quantile(0.5) == 0.0
+
+
+def test_instrumented_calls_are_aggregated_per_series():
+    @instrument_llm_call
+    async def telkomllm_plan(fail=False):
+        note_request({"model": "m", "messages": [{"content": "x" * 40}], "max_tokens": 100})
+        if fail:
+            raise RuntimeError("down")
+        note_response(200, "y" * 8)
+        note_completion("stop", 3)
+        return "ok"
+
+    async def main():
+        set_llm_prompt_name("CFU Trend Analysis")
+        await telkomllm_plan()
+        with pytest.raises(RuntimeError):
+            await telkomllm_plan(fail=True)
+
+    asyncio.run(main())
+
+    metrics = get_llm_metrics()
+    stats = metrics["functions"]["telkomllm_plan"]
+    assert stats["statuses"] == {"200": 1, "RuntimeError": 1}
+    assert stats["max_tokens"] == 100
+    assert stats["prompt_tokens"]["count"] == 2
+    series = metrics["series"][0]
+    assert (series["prompt_name"], series["model"]) == ("CFU Trend Analysis", "m")
@@ -0,0 +1,38 @@
+# tests/test_llm_output.py
+import time
+
+from llm_output import IntentOutput, SelectionOutput, extract_json_object, parse_llm_output, response_format
+
+
+def test_extracts_the_first_object_from_noisy_text():
+    text = 'Sure {not json} here: ```json\n{"a": "brace } in a string \\" quote", "b": {"c": 1}}\n``` {"d": 2}'
+    assert extract_json_object(text) == {"a": 'brace } in a string " quote', "b": {"c": 1}}
+
+
+def test_unclosed_or_missing_objects_return_none():
+    assert extract_json_object('{"a": 1') is None
+    assert extract_json_object("no json here") is None
+    assert extract_json_object(None) is None
+    assert extract_json_object({"a": 1}) == {"a": 1}
+
+
+def test_extraction_stays_fast_on_long_noisy_output():
+    text = "{ prose " * 20000 + '{"a": 1}'
+    t0 = time.perf_counter()
+    assert extract_json_object(text) == {"a": 1}
+    assert time.perf_counter() - t0 < 1.0
+
+
+def test_parse_validates_against_the_stage_model():
+    parsed = parse_llm_output('{"table_name": "t", "prompt": "p"}', SelectionOutput)
+    assert (parsed.table_name, parsed.prompt) == ("t", "p")
+    assert parse_llm_output('{"wants_text": true}', IntentOutput) is None
+
+
+def test_response_format_per_json_mode():
+    assert response_format("intent", "off") is None
+    assert response_format("generate_sql", "json_object") is None
+    assert response_format("intent", "json_object") == {"type": "json_object"}
+    schema = response_format("select_table", "json_schema")
+    assert schema["json_schema"]["name"] == "SelectionOutput"
+    assert response_format("intent", "yaml") is None
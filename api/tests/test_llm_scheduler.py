@@ -0,0 +1,75 @@
+# tests/test_llm_scheduler.py
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from config import settings
+from llm_scheduler import BACKGROUND_LANE, INTERACTIVE_LANE, LLMScheduler, lane_for_stage, use_llm_lane
+
+
+def make_scheduler(max_concurrency=1, deadlines=None):
+    return LLMScheduler(max_concurrency=max_concurrency,
+                        lane_quotas={INTERACTIVE_LANE: max_concurrency, BACKGROUND_LANE: max_concurrency},
+                        lane_priorities={INTERACTIVE_LANE: 0, BACKGROUND_LANE: 1},
+                        queue_deadlines=deadlines or {})
+
+
+def test_interactive_waiters_go_before_background_ones():
+    scheduler, order = make_scheduler(), []
+
+    async def call(lane, name):
+        async with scheduler.slot(lane):
+            order.append(name)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        holder = asyncio.ensure_future(call(INTERACTIVE_LANE, "first"))
+        await asyncio.sleep(0)
+        await asyncio.gather(call(BACKGROUND_LANE, "background"), call(INTERACTIVE_LANE, "interactive"), holder)
+
+    asyncio.run(main())
+    assert order == ["first", "interactive", "background"]
+    assert scheduler.stats()["active"] == 0
+
+
+def test_lane_quota_caps_concurrent_calls():
+    scheduler = LLMScheduler(max_concurrency=4, lane_quotas={BACKGROUND_LANE: 1},
+                             lane_priorities={INTERACTIVE_LANE: 0, BACKGROUND_LANE: 1}, queue_deadlines={})
+    peak = {"active": 0, "max": 0}
+
+    async def call():
+        async with scheduler.slot(BACKGROUND_LANE):
+            peak["active"] += 1
+            peak["max"] = max(peak["max"], peak["active"])
+            await asyncio.sleep(0.01)
+            peak["active"] -= 1
+
+    async def main():
+        await asyncio.gather(*(call() for _ in range(3)))
+
+    asyncio.run(main())
+    assert peak["max"] == 1
+
+
+def test_waiting_past_the_lane_deadline_is_rejected_with_429():
+    scheduler = make_scheduler(deadlines={BACKGROUND_LANE: 0.01})
+
+    async def main():
+        async with scheduler.slot(INTERACTIVE_LANE):
+            with pytest.raises(HTTPException) as error:
+                await scheduler.acquire(BACKGROUND_LANE)
+            return error.value.status_code
+
+    assert asyncio.run(main()) == 429
+    assert scheduler.stats()["lanes"][BACKGROUND_LANE]["rejected"] == 1
+
+
+def test_forced_lane_overrides_the_stage_lane():
+    async def main():
+        before = lane_for_stage("generate_sql")
+        use_llm_lane(BACKGROUND_LANE)
+        return before, lane_for_stage("generate_sql")
+
+    assert asyncio.run(main()) == (INTERACTIVE_LANE, BACKGROUND_LANE)
+    assert lane_for_stage(settings.llm_background_stages[0]) == BACKGROUND_LANE
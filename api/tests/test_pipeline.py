@@ -0,0 +1,104 @@
+# tests/test_pipeline.py
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from pipeline import PipelineExecutor, Stage
+
+
+def stage(name, inputs, outputs, log, delay=0.0, **kwargs):
+    async def fn(values, emit):
+        log.append(("start", name))
+        await asyncio.sleep(delay)
+        log.append(("end", name))
+        return {k: f"{name}:{k}" for k in outputs}
+    return Stage(name, fn, inputs=inputs, outputs=outputs, **kwargs)
+
+
+def run(executor, fields=("a",), events=None):
+    emit = (lambda *args: events.append(args)) if events is not None else (lambda *args: None)
+    return asyncio.run(executor.run({"q": "query"}, fields, emit))
+
+
+def test_independent_stages_run_concurrently():
+    log = []
+    executor = PipelineExecutor([
+        stage("first", ["q"], ["x"], log, delay=0.01),
+        stage("second", ["q"], ["y"], log, delay=0.01),
+        stage("join", ["x", "y"], ["z"], log),
+    ], inputs=["q"])
+
+    ctx, timings = run(executor)
+
+    assert log[:2] == [("start", "first"), ("start", "second")]
+    assert ctx["z"] == "join:z"
+    assert set(timings) == {"first", "second", "join"}
+
+
+def test_skipped_stage_uses_defaults_and_skips_its_dependents():
+    log = []
+    executor = PipelineExecutor([
+        stage("chart", ["q"], ["chart"], log, fields={"chart"}, defaults={"chart": None}),
+        stage("after_chart", ["chart"], ["done"], log, defaults={"done": "default"}),
+        stage("text", ["q"], ["output"], log, when=lambda inputs: inputs["q"] == "query"),
+    ], inputs=["q"])
+
+    ctx, _ = run(executor, fields=["output"])
+
+    assert ctx["chart"] is None and ctx["done"] == "default"
+    assert ctx["output"] == "text:output"
+    assert ("start", "chart") not in log and ("start", "after_chart") not in log
+
+
+def test_progress_events_are_emitted():
+    events = []
+    executor = PipelineExecutor([
+        stage("sql", ["q"], ["sql"], [], step="sql", start_message="start",
+              done_message=lambda out: f"done {out['sql']}"),
+    ], inputs=["q"])
+
+    run(executor, events=events)
+
+    assert events == [("sql", "in_progress", "start"), ("sql", "completed", "done sql:sql")]
+
+
+def test_invalid_graphs_are_rejected():
+    with pytest.raises(ValueError):
+        PipelineExecutor([stage("a", ["missing"], ["x"], [])], inputs=["q"])
+    with pytest.raises(ValueError):
+        PipelineExecutor([stage("a", ["q"], ["x"], []), stage("b", ["q"], ["x"], [])], inputs=["q"])
+
+
+def test_failure_cancels_running_stages():
+    log = []
+
+    async def fail(values, emit):
+        raise RuntimeError("boom")
+
+    executor = PipelineExecutor([
+        stage("slow", ["q"], ["x"], log, delay=1.0),
+        Stage("failing", fail, inputs=["q"], outputs=["y"]),
+    ], inputs=["q"])
+
+    with pytest.raises(RuntimeError):
+        run(executor)
+    assert ("end", "slow") not in log
+
+
+def test_stage_timeout_is_a_504():
+    executor = PipelineExecutor([stage("slow", ["q"], ["x"], [], delay=1.0, timeout=0.01)], inputs=["q"])
+
+    with pytest.raises(HTTPException) as error:
+        run(executor)
+    assert error.value.status_code == 504
+
+
+def test_missing_outputs_are_an_error():
+    async def incomplete(values, emit):
+        return {}
+
+    executor = PipelineExecutor([Stage("bad", incomplete, inputs=["q"], outputs=["x"])], inputs=["q"])
+
+    with pytest.raises(RuntimeError, match="did not produce outputs"):
+        run(executor)
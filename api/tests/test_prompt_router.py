@@ -0,0 +1,43 @@
+# tests/test_prompt_router.py
+import asyncio
+
+import pytest
+
+import routes
+from config import settings
+from prompt_router import PromptRouter, tokenize
+
+
+@pytest.fixture
+def router():
+    return PromptRouter(settings.prompt_config)
+
+
+def test_period_words_are_not_routing_terms():
+    assert tokenize("trend revenue DWS 6 bulan terakhir") == ["trend", "revenue", "dws"]
+
+
+@pytest.mark.parametrize("query", ["trend revenue DWS 6 bulan terakhir", "trend ebitda TIF 6 bulan terakhir"])
+def test_trend_questions_are_not_routed_to_margin_prompt(router, query):
+    top_name, confident, _, _ = router.route(query)
+    assert not (confident and top_name == "CFU EBITDA Margin Trend 3 Months Analysis")
+
+
+def test_shadow_mode_always_uses_llm_selection(fake_llm, monkeypatch):
+    monkeypatch.setattr(settings, "prompt_router_mode", "shadow")
+    fake_llm.prompt = "CFU Trend Analysis"
+
+    _, _, prompt_name = asyncio.run(routes.select_table_and_prompt("Bagaimana tren profit margin selama 3 bulan terakhir?"))
+
+    assert prompt_name == "CFU Trend Analysis"
+    assert fake_llm.calls == ["telkomllm_select_table"]
+
+
+def test_on_mode_uses_confident_local_match(fake_llm, monkeypatch):
+    monkeypatch.setattr(settings, "prompt_router_mode", "on")
+    monkeypatch.setattr(settings, "prompt_router_shadow_rate", 0.0)
+
+    _, _, prompt_name = asyncio.run(routes.select_table_and_prompt("Bagaimana tren profit margin selama 3 bulan terakhir?"))
+
+    assert prompt_name == "CFU EBITDA Margin Trend 3 Months Analysis"
+    assert fake_llm.calls == []
@@ -0,0 +1,30 @@
+# tests/test_prompts.py
+import re
+
+import pytest
+
+from config import settings
+from lib.cfu_prompt import valid_values_str
+from lib.prompt import agent_prompt, generate_insight_prompt, generate_sql_prompt, greeting_and_general_prompt
+
+PLACEHOLDER = re.compile(r"\{[a-z_]+\}")
+
+
+@pytest.mark.parametrize("template", [agent_prompt, generate_insight_prompt, generate_sql_prompt,
+                                      greeting_and_general_prompt])
+def test_per_request_values_come_after_the_static_instructions(template):
+    placeholders = PLACEHOLDER.findall(template)
+    first = PLACEHOLDER.search(template).start()
+    assert len(template) - first < 300
+    if template is not agent_prompt:
+        assert placeholders[-1] == "{user_query}"
+
+
+def test_instruction_prompts_start_with_the_shared_reference():
+    prompts = [entry["instruction_prompt"] for entry in settings.prompt_config
+               if "Task:" in entry["instruction_prompt"]]
+    assert prompts
+    shared = valid_values_str.strip()
+    for prompt in prompts:
+        assert prompt.lstrip().startswith(shared)
+        assert prompt.index("CRITICAL USER MAPPING") < prompt.index("Task:")
@@ -0,0 +1,30 @@
+# tests/test_query_classifier.py
+import pytest
+
+from query_classifier import get_context_fast_path_stats, is_self_contained, record_context_decision
+
+
+@pytest.mark.parametrize("query", [
+    "Bagaimana performansi revenue DWS bulan Juli 2025?",
+    "Tampilkan EBITDA CFU WIB tahun ini",
+])
+def test_first_turn_questions_naming_an_entity_are_self_contained(query):
+    assert is_self_contained(query, None)
+
+
+@pytest.mark.parametrize("query, history", [
+    ("Bagaimana performansi revenue DWS bulan Juli 2025?", "user: halo"),
+    ("kalau untuk TELIN bagaimana?", None),
+    ("revenue DWS", None),
+    ("Tolong jelaskan sesuatu yang menarik", None),
+])
+def test_follow_ups_short_or_entityless_questions_need_the_llm(query, history):
+    assert not is_self_contained(query, history)
+
+
+def test_fast_path_stats():
+    before = get_context_fast_path_stats()
+    record_context_decision(True)
+    record_context_decision(False)
+    after = get_context_fast_path_stats()
+    assert after["fast_path"] == before["fast_path"] + 1 and after["llm"] == before["llm"] + 1
@@ -0,0 +1,152 @@
+# tests/test_routes.py
+import asyncio
+import json
+
+import routes
+
+FIELDS = ["output", "dataRows", "dataColumns", "intent"]
+
+
+def test_greeting_branch_runs_through_insight_pipeline(temp_db, fake_llm):
+    fake_llm.prompt = routes.GREETING_PROMPT_NAME
+
+    result = asyncio.run(routes.get_insight_logic("halo apa kabar", None, FIELDS))
+
+    assert result["output"] == "Halo! Ada yang bisa saya bantu?"
+    assert "telkomllm_greeting_and_general" in fake_llm.calls
+    assert "telkomllm_generate_sql" not in fake_llm.calls
+
+
+def test_data_branch_returns_rows_and_insight(temp_db, fake_llm):
+    fake_llm.prompt = "CFU Top Revenue Contributing Products Analysis"
+
+    result = asyncio.run(routes.get_insight_logic("Tampilkan produk penyumbang revenue terbesar unit DWS", None, FIELDS))
+
+    assert result["output"] == "Revenue DWS naik stabil."
+    assert result["sql_source"] == "llm"
+    assert len(result["data_rows"]) == 6
+
+
+def test_failed_sql_is_not_cached_and_the_fix_is(temp_db, fake_llm, tmp_path, monkeypatch):
+    import llm_cache
+    from sql_cache import get_sql_cache, lookup_sql, sql_cache_key
+
+    monkeypatch.setattr(llm_cache, "_cache", None)
+    monkeypatch.setattr(routes.settings, "llm_cache_enabled", True)
+    monkeypatch.setattr(routes.settings, "llm_cache_path", str(tmp_path / "llm_cache.db"))
+    fake_llm.prompt = "CFU Top Revenue Contributing Products Analysis"
+    fake_llm.answers["telkomllm_generate_sql"] = "SELECT missing_column FROM cfu_performance_data;"
+    query = "Tampilkan produk penyumbang revenue terbesar unit DWS"
+
+    async def main():
+        result = await routes.get_insight_logic(query, None, FIELDS)
+        await llm_cache.flush_llm_cache_writes()
+        return result
+
+    result = asyncio.run(main())
+
+    assert len(result["data_rows"]) == 6
+    columns = routes.get_schema_and_sample("cfu_performance_data")[0]
+    key = sql_cache_key(query, fake_llm.prompt, "cfu_performance_data", columns)
+    get_sql_cache().clear()
+    assert lookup_sql(key) == fake_llm.answers["telkomllm_fix_sql"]
+    assert get_sql_cache().stats()["shared_hits"] == 1
+
+
+def test_live_request_does_not_join_a_warmup_run(temp_db, fake_llm, monkeypatch):
+    from llm_scheduler import BACKGROUND_LANE, use_llm_lane
+
+    monkeypatch.setattr(routes.settings, "sql_cache_enabled", False)
+    monkeypatch.setattr(routes.settings, "insight_cache_enabled", False)
+    fake_llm.prompt = "CFU Top Revenue Contributing Products Analysis"
+    query = "Tampilkan produk penyumbang revenue terbesar unit DWS"
+
+    async def warmup():
+        use_llm_lane(BACKGROUND_LANE)
+        return await routes.get_insight_logic(query, None, FIELDS)
+
+    async def main():
+        return await asyncio.gather(warmup(), routes.get_insight_logic(query, None, FIELDS),
+                                    routes.get_insight_logic(query, None, FIELDS))
+
+    results = asyncio.run(main())
+
+    assert all(len(r["data_rows"]) == 6 for r in results)
+    assert fake_llm.calls.count("telkomllm_generate_sql") == 2
+
+
+def test_intent_and_table_selection_run_concurrently(temp_db, fake_llm, monkeypatch):
+    events = []
+
+    def slow(name):
+        answer = fake_llm.function(name)
+
+        async def call(*args, **kwargs):
+            events.append(("start", name))
+            await asyncio.sleep(0.02)
+            events.append(("end", name))
+            return await answer(*args, **kwargs)
+        return call
+
+    for name in ("telkomllm_recognize_intent", "telkomllm_select_table"):
+        monkeypatch.setattr(routes, name, slow(name))
+    fake_llm.prompt = "CFU Top Revenue Contributing Products Analysis"
+
+    asyncio.run(routes.get_insight_logic("Tampilkan produk penyumbang revenue terbesar unit DWS", None, FIELDS))
+
+    assert [kind for kind, _ in events] == ["start", "start", "end", "end"]
+
+
+def test_fused_planning_replaces_context_intent_and_selection(temp_db, fake_llm, monkeypatch):
+    monkeypatch.setattr(routes.settings, "planning_mode", "fused")
+    fake_llm.answers["telkomllm_plan"] = json.dumps({
+        "completed_query": "Tampilkan produk penyumbang revenue terbesar unit DWS",
+        "wants_text": True, "wants_chart": False, "wants_table": True,
+        "table_name": "cfu_performance_data", "prompt": "CFU Top Revenue Contributing Products Analysis",
+    })
+
+    result = asyncio.run(routes.get_insight_logic("kalau produk DWS?", "user: revenue DWS", FIELDS))
+
+    assert len(result["data_rows"]) == 6
+    assert "telkomllm_plan" in fake_llm.calls
+    for name in ("telkomllm_main_agent", "telkomllm_recognize_intent", "telkomllm_select_table"):
+        assert name not in fake_llm.calls
+
+
+def test_invalid_fused_plan_falls_back_to_split_planning(temp_db, fake_llm, monkeypatch):
+    monkeypatch.setattr(routes.settings, "planning_mode", "fused")
+    fake_llm.prompt = "CFU Top Revenue Contributing Products Analysis"
+
+    result = asyncio.run(routes.get_insight_logic("kalau produk DWS?", "user: revenue DWS", FIELDS))
+
+    assert len(result["data_rows"]) == 6
+    assert {"telkomllm_plan", "telkomllm_recognize_intent", "telkomllm_select_table"} <= set(fake_llm.calls)
+
+
+def test_results_over_the_row_budget_are_summarized():
+    rows = [{"div": div, "period": 202500 + month, "real_mtd": float(month * (i + 1))}
+            for i, div in enumerate(("DWS", "TELIN", "TSAT")) for month in range(1, 11)]
+
+    assert routes._reduce_rows_for_insight(rows, 60) is None
+    sections = dict(routes._reduce_rows_for_insight(rows, 9))
+
+    assert [r["real_mtd"] for r in sections["Top 3 rows by real_mtd"]] == [30.0, 27.0, 24.0]
+    assert [r["real_mtd"] for r in sections["Bottom 3 rows by real_mtd"]] == [2.0, 2.0, 1.0]
+    subtotals = sections["Subtotals by div (rows = number of rows in the group)"]
+    assert [(r["div"], r["real_mtd"], r["rows"]) for r in subtotals] == [("TSAT", 165.0, 10), ("TELIN", 110.0, 10),
+                                                                          ("DWS", 55.0, 10)]
+    assert sections["Total of all 30 rows"][0]["real_mtd"] == 330.0
+
+
+def test_metrics_endpoint_requires_the_api_key():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    app = FastAPI()
+    app.add_api_route("/metrics", routes.get_metrics, methods=["GET"])
+    client = TestClient(app)
+
+    assert client.get("/metrics").status_code in (401, 403)
+    assert client.get("/metrics", headers={"x-api-key": "wrong"}).status_code == 403
+    response = client.get("/metrics", headers={"x-api-key": routes.settings.x_api_key})
+    assert response.status_code == 200 and "llm" in response.json()
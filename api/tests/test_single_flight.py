@@ -0,0 +1,58 @@
+# tests/test_single_flight.py
+import asyncio
+
+import pytest
+
+from single_flight import SingleFlight, flight_key
+
+
+def test_flight_key_is_stable():
+    assert flight_key("a", {"x": 1, "y": 2}) == flight_key("a", {"y": 2, "x": 1})
+    assert flight_key("a", 1) != flight_key("a", 2)
+
+
+def test_concurrent_calls_share_one_run():
+    flights, calls = SingleFlight(), []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def main():
+        return await asyncio.gather(flights.run("k", fn), flights.run("k", fn))
+
+    assert asyncio.run(main()) == [("result", False), ("result", True)]
+    assert len(calls) == 1
+    assert flights.stats() == {"in_flight": 0, "started": 1, "joined": 1}
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_run():
+    flights = SingleFlight()
+
+    async def fn():
+        await asyncio.sleep(0.02)
+        return "result"
+
+    async def main():
+        first = asyncio.ensure_future(flights.run("k", fn))
+        second = asyncio.ensure_future(flights.run("k", fn))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == ("result", True)
+
+
+def test_failure_is_raised_to_every_caller():
+    flights = SingleFlight()
+
+    async def fn():
+        await asyncio.sleep(0)
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(flights.run("k", fn), flights.run("k", fn), return_exceptions=True)
+
+    assert all(isinstance(r, ValueError) for r in asyncio.run(main()))
+    assert not flights.is_running("k")
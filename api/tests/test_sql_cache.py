@@ -0,0 +1,59 @@
+# tests/test_sql_cache.py
+import time
+
+import llm_cache
+from config import settings
+from sql_cache import (
+    SQLCache, data_version, forget_sql, get_sql_cache, invalidate_sql_cache, lookup_sql, normalize_query,
+    remember_sql, sql_cache_key,
+)
+
+
+def test_normalize_query_ignores_case_spacing_and_trailing_punctuation():
+    assert normalize_query("  Revenue   DWS Juli 2025?! ") == normalize_query("revenue dws juli 2025")
+
+
+def test_keys_change_with_the_database_file(temp_db):
+    key = sql_cache_key("revenue DWS", "p", "cfu_performance_data", ["div"])
+    with open(temp_db, "ab") as f:
+        f.write(b"\0")
+    assert sql_cache_key("revenue DWS", "p", "cfu_performance_data", ["div"]) != key
+    assert data_version(temp_db, ["div"]) != data_version(temp_db, ["div", "period"])
+
+
+def test_lru_eviction_and_ttl():
+    cache = SQLCache(max_entries=2, ttl=60)
+    for name in ("a", "b"):
+        cache.put((name, "", "", ""), name)
+    cache.get(("a", "", "", ""))
+    cache.put(("c", "", "", ""), "c")
+    assert cache.get(("b", "", "", "")) is None and cache.get(("a", "", "", "")) == "a"
+
+    cache.ttl = 0
+    time.sleep(0.001)
+    assert cache.get(("a", "", "", "")) is None
+    assert cache.stats()["evictions"] == 1 and cache.stats()["expirations"] == 1
+
+
+def test_invalidation_drops_all_entries():
+    get_sql_cache().put(("q", "p", "t", "v"), "SELECT 1;")
+    invalidate_sql_cache("test")
+    assert get_sql_cache().get(("q", "p", "t", "v")) is None
+
+
+def test_sql_is_shared_through_the_disk_cache_until_forgotten(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "_cache", None)
+    monkeypatch.setattr(settings, "llm_cache_enabled", True)
+    monkeypatch.setattr(settings, "llm_cache_path", str(tmp_path / "llm_cache.db"))
+    key = ("q", "p", "t", "v")
+
+    remember_sql(key, "SELECT 1;")
+    get_sql_cache().clear()
+    assert lookup_sql(key) == "SELECT 1;"
+
+    forget_sql(key)
+    assert lookup_sql(key) is None
+
+    remember_sql(key, "SELECT 1;")
+    invalidate_sql_cache("test")
+    assert lookup_sql(key) is None
@@ -0,0 +1,48 @@
+# tests/test_sql_stream.py
+import pytest
+
+from sql_stream import SQLStatementDetector, extract_sql_statement
+
+
+def feed_in_chunks(text, size=3):
+    detector = SQLStatementDetector()
+    for i in range(0, len(text), size):
+        if detector.feed(text[i:i + size]):
+            break
+    return detector
+
+
+def test_statement_ends_at_the_first_top_level_semicolon():
+    detector = feed_in_chunks("Berikut query:\nSELECT a FROM t WHERE b = 'x;y' -- c;\n AND d = 1; penjelasan panjang")
+    assert detector.end is not None
+    assert detector.finish() == "SELECT a FROM t WHERE b = 'x;y' -- c;\n AND d = 1;"
+
+
+def test_statement_ends_at_the_closing_fence():
+    detector = feed_in_chunks("```sql\nSELECT a /* ; */ FROM t\n```\nThe query selects a.")
+    assert detector.finish() == "SELECT a /* ; */ FROM t"
+    assert detector.tail_chars > 0
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("With the table below, here is the query:\n```sql\nSELECT 1;\n```", "SELECT 1;"),
+    ("Select the columns first.\nWith this query:\nSELECT a\nFROM t;\nDone.", "SELECT a\nFROM t;"),
+    ("with x as (select 1) is the idea.\n```\nWITH x AS (SELECT 1) SELECT * FROM x;\n```",
+     "WITH x AS (SELECT 1) SELECT * FROM x;"),
+])
+def test_prose_preamble_is_not_taken_for_sql(text, expected):
+    assert extract_sql_statement(text) == expected
+    assert feed_in_chunks(text, size=2).finish() == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("WITH x AS (SELECT 1) SELECT * FROM x", "WITH x AS (SELECT 1) SELECT * FROM x"),
+    ("no sql at all", "no sql at all"),
+])
+def test_completion_without_a_boundary(text, expected):
+    assert extract_sql_statement(text) == expected
+
+
+def test_non_text_results_pass_through():
+    error = {"error": "timeout"}
+    assert extract_sql_statement(error) is error
@@ -0,0 +1,56 @@
+# tests/test_sql_templates.py
+import sqlite3
+
+import pytest
+
+from sql_templates import render_sql_template, resolve_entities
+
+
+def test_percentage_columns_stay_numeric(temp_db):
+    sql = render_sql_template("CFU Monthly Performance Analysis", "Bagaimana performansi Revenue DWS Maret 2025?")
+    assert sql is not None
+    assert "PRINTF" not in sql
+
+    conn = sqlite3.connect(temp_db)
+    conn.row_factory = sqlite3.Row
+    rows = [dict(r) for r in conn.execute(sql)]
+    conn.close()
+    assert rows
+    for column in ("ach_mtd", "mom", "ach_ytd", "yoy"):
+        assert isinstance(rows[0][column], float)
+
+
+def test_range_template_covers_named_periods():
+    sql = render_sql_template("CFU Trend Analysis", "Bagaimana trend Revenue unit DWS Januari 2025 sampai Maret 2025?")
+    assert "period BETWEEN 202501 AND 202503" in sql
+
+
+def test_comparison_questions_fall_through_to_llm():
+    for query in (
+        "Revenue DWS Juli 2024 vs Juli 2025",
+        "Revenue DWS Juli 2025 dibanding Juli 2024",
+        "Bandingkan Revenue DWS Juli 2024 dan Juli 2025",
+    ):
+        assert render_sql_template("CFU Trend Analysis", query) is None
+
+
+@pytest.mark.parametrize("query", [
+    "Bagaimana performa revenue DWS semester 1?",
+    "trend revenue DWS 12 bulan",
+    "trend EBITDA TELIN kuartal 3",
+    "Revenue DWS Q2 2025",
+    "Revenue DWS sejak Maret 2025",
+    "Revenue DWS sampai Maret 2025",
+    "Revenue DWS awal tahun sampai Maret 2025",
+    "Berapa target revenue DWS Juli 2025?",
+    "Berapa achievement revenue DWS Juli 2025?",
+])
+def test_unresolved_period_or_measure_qualifiers_fall_through_to_llm(query):
+    assert resolve_entities(query) is None
+
+
+def test_external_revenue_matches_the_reference_query():
+    sql = render_sql_template("CFU External Revenue Analysis", "External revenue DWS Juli 2025")
+    assert "l2" not in sql
+    assert "(l3 LIKE '%External%' OR l4 LIKE '%External%')" in sql and "period = 202507" in sql
+    assert render_sql_template("CFU External Revenue Analysis", "External EBITDA DWS Juli 2025") is None
@@ -0,0 +1,27 @@
+# tests/test_table_encoding.py
+from table_encoding import encode_table, prune_columns
+
+ROWS = [
+    {"div": "DWS", "period": 202501, "real_mtd": 1234567.89, "ach_mtd": 97.456, "note": "a|b"},
+    {"div": "DWS", "period": 202502, "real_mtd": 2345678.12, "ach_mtd": None, "note": "c"},
+]
+
+
+def test_rows_are_encoded_compactly():
+    text = encode_table(ROWS)
+    lines = text.splitlines()
+    assert lines[0] == 'Columns separated by "|", one row per line (2 rows).'
+    assert lines[1] == "Same on every row: div=DWS"
+    assert lines[2] == "period|real_mtd|ach_mtd|note"
+    assert lines[3] == "202501|1234568|97.46|a/b"
+    assert lines[4] == "202502|2345678|-|c"
+
+
+def test_empty_result():
+    assert encode_table([]) == "(no rows)"
+
+
+def test_prune_keeps_descriptive_and_named_measure_columns():
+    columns = list(ROWS[0])
+    assert prune_columns(columns, ROWS, "Tampilkan ach_mtd DWS") == ["div", "period", "ach_mtd", "note"]
+    assert prune_columns(columns, ROWS, "Tampilkan performa DWS", None) == columns